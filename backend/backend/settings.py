@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # Third-party
     "rest_framework",
@@ -111,6 +112,9 @@ DATABASES = {
         "PORT": os.environ.get("DB_PORT", "5432"),
         "CONN_MAX_AGE": 60,                 # persistent connections
         "OPTIONS": {"sslmode": "require"},  # Supabase requires TLS
+        # .iterator() (rekap) streams through server-side cursors; set to 1 when
+        # connecting through a transaction-mode pooler (Supavisor port 6543).
+        "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "0") == "1",
     }
 }
 
@@ -182,3 +186,39 @@ CACHES = {
 # --- Preview encoding (optional) ---
 PREVIEW_IMAGE_MAX_WIDTH = int(os.environ.get("PREVIEW_IMAGE_MAX_WIDTH", "1200"))
 PREVIEW_IMAGE_QUALITY   = int(os.environ.get("PREVIEW_IMAGE_QUALITY", "75"))
+
+# --- Preview rendering pool (documents/rendering.py) ---
+# Workers=0 renders inline in the request thread (dev / debugging).
+PREVIEW_RENDER_WORKERS = int(os.environ.get("PREVIEW_RENDER_WORKERS", "2"))
+PREVIEW_RENDER_QUEUE_MAX = int(os.environ.get("PREVIEW_RENDER_QUEUE_MAX", "16"))
+PREVIEW_RENDER_TIMEOUT = float(os.environ.get("PREVIEW_RENDER_TIMEOUT", "20"))
+PREVIEW_RENDER_RETRY_AFTER = int(os.environ.get("PREVIEW_RENDER_RETRY_AFTER", "2"))
+PREVIEW_RENDER_MP_CONTEXT = os.environ.get("PREVIEW_RENDER_MP_CONTEXT", "spawn")
+
+# --- Approval stamp for supporting documents ---
+# embed:   burn "DISETUJUI + timestamp" into the stored file after approval (Celery `stamp` queue)
+# overlay: approval is metadata only; the stamp is composited at preview/download time
+STAMP_MODE = os.environ.get("STAMP_MODE", "embed").strip().lower()
+
+# --- Attachment text for search (documents/page_text.py) ---
+# Scanned attachments (no PDF text layer) are OCR'd with local Tesseract in the
+# Celery `parse` queue (without a broker: only by `index_attachment_text`);
+# needs pytesseract + the tesseract binary, else skipped.
+SUPPORTING_TEXT_OCR = os.environ.get("SUPPORTING_TEXT_OCR", "1").strip().lower() in ("1", "true", "yes")
+SUPPORTING_TEXT_OCR_LANG = os.environ.get("SUPPORTING_TEXT_OCR_LANG", "eng")
+SUPPORTING_TEXT_OCR_WIDTH = int(os.environ.get("SUPPORTING_TEXT_OCR_WIDTH", "1700"))
+SUPPORTING_TEXT_OCR_MAX_PAGES = int(os.environ.get("SUPPORTING_TEXT_OCR_MAX_PAGES", "20"))  # per attachment
+
+# --- Merged "full packet" PDFs (DocumentViewSet.packet) ---
+# Cached outside MEDIA_ROOT (not publicly aliased); served by Nginx through an
+# `internal` location when the prefix is set, e.g. /_protected/packets/.
+PACKET_CACHE_DIR = Path(os.environ.get("PACKET_CACHE_DIR", str(BASE_DIR / "packet_cache")))
+PACKET_ACCEL_REDIRECT_PREFIX = os.environ.get("PACKET_ACCEL_REDIRECT_PREFIX", "")
+# Authenticated attachment downloads (sdoc_download) hand MEDIA_ROOT files to
+# Nginx the same way when set, e.g. /media/.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+
+# --- Dashboard stats (DocumentViewSet.stats) ---
+# Invalidated on every Document save/delete; the TTL only bounds staleness
+# from bulk queryset updates that bypass save().
+DOCUMENT_STATS_TTL = int(os.environ.get("DOCUMENT_STATS_TTL", "300"))
@@ -18,3 +18,32 @@ def parse_job(job_id: str, tmp_path: str, user_id: int, title: str, company: str
 		except Exception:
 			pass
 	return {"ok": True}
+
+
+@shared_task(queue="stamp", ignore_result=True)
+def stamp_supporting_doc_job(sdoc_id: int, job_id: str | None = None, total: int = 1):
+	# One attachment per task so the worker pool stamps a batch in parallel
+	from documents.views import _stamp_approved_supporting_doc, _stamp_progress_tick
+
+	try:
+		_stamp_approved_supporting_doc(sdoc_id)
+	finally:
+		_stamp_progress_tick(job_id, total)
+	return {"ok": True, "sdoc_id": sdoc_id}
+
+
+@shared_task(queue="parse", ignore_result=True)
+def index_supporting_doc_text_job(sdoc_id: int):
+	# Text layer / OCR of an attachment for full-text search (content_text)
+	from documents.views import _index_supporting_doc_text
+
+	return {"ok": _index_supporting_doc_text(sdoc_id), "sdoc_id": sdoc_id}
+
+
+@shared_task(queue="packet", ignore_result=True)
+def build_packet_job(doc_id: int, job_id: str | None = None):
+	# Merged recap + attachments PDF, cached on disk by attachment-set version
+	from documents.views import _build_document_packet
+
+	path = _build_document_packet(doc_id, job_id)
+	return {"ok": bool(path), "path": path}
@@ -12,8 +12,10 @@ from documents.views import (
     UserSettingsView,
     PaymentProofViewSet,
     sdoc_preview,
+    sdoc_download,
     payment_proof_preview,
     rekap_view,
+    search_view,
     kebun_outline_view,
     kebun_blocks_view,
     kebun_blocks_meta_view,
@@ -45,6 +47,7 @@ urlpatterns = [
     path('api/parse-and-store/', parse_and_store_view, name='parse_and_store'),
     path('api/progress/<str:job_id>/', progress_view, name='progress_view'),
     path('api/rekap/<str:company_code>/<str:rekap_key>/', rekap_view, name='rekap'),
+    path('api/search/', search_view, name='search'),
     path('api/login/', login_view, name='login'),  # <-- add this route
     path("api/auth/login/start/", otp_login_start, name="otp_login_start"),
     path("api/auth/login/verify/", otp_login_verify, name="otp_login_verify"),
@@ -58,6 +61,7 @@ urlpatterns = [
     path('api/me/', user_info),  # <-- add user_info endpoint
     path("api/user-settings/", UserSettingsView.as_view(), name="user_settings"),
     path("api/sdoc/<int:pk>/preview", sdoc_preview, name="sdoc_preview"),
+    path("api/sdoc/<int:pk>/download", sdoc_download, name="sdoc_download"),
     path("api/payment-proof/<int:pk>/preview", payment_proof_preview, name="payment_proof_preview"),
 
     # NEW: kebun outline (GeoJSON)
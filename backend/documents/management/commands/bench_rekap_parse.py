@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.rekap import (
+    _ID_MONTHS,
+    parse_keterangan,
+    parse_keterangan_batch,
+    parse_liter,
+    parse_tanggal_masuk,
+    shorten_keterangan_bbm,
+)
+
+
+def synthetic_keterangan(n: int, unique_ratio: float, seed: int = 42) -> list[str]:
+    """`n` BBM-like KETERANGAN strings, about `unique_ratio` of them distinct."""
+    rnd = random.Random(seed)
+    templates = [
+        "PO Pembayaran Solar {lt} liter tgl {d}/{m}/{y}",
+        "pembayaran   solar {lt} ltr {d} {bulan} {yyyy} unit {unit}",
+        "BBM {lt}L kendaraan {unit} - {d}-{m}-{yy}",
+        "Pembayaran solar armada {unit} periode {d} {bulan} {yyyy} sebanyak {lt} liter "
+        "untuk operasional proyek di lokasi {unit} (lanjutan)",
+        "Solar {lt} l tgl 31/02/{y} dikirim {d}/{m}/{y}",
+        "Biaya BBM operasional {unit}",
+    ]
+    distinct = []
+    for _ in range(max(1, int(n * unique_ratio))):
+        d, m, y = rnd.randint(1, 28), rnd.randint(1, 12), rnd.randint(2024, 2026)
+        lt = rnd.choice([str(rnd.randint(10, 999)), f"{rnd.randint(1, 9)}.{rnd.randint(0, 999):03d}", "12,5"])
+        distinct.append(rnd.choice(templates).format(
+            lt=lt, d=d, m=m, y=y, yy=y % 100, yyyy=y,
+            bulan=_ID_MONTHS[m], unit=f"TR-{rnd.randint(1, 300):03d}",
+        ))
+    return [rnd.choice(distinct) for _ in range(n)]
+
+
+def _per_row(texts):
+    # What iter_rekap_rows did before batching: three parsers per row.
+    return (
+        [parse_tanggal_masuk(t) for t in texts],
+        [parse_liter(t) for t in texts],
+        [shorten_keterangan_bbm(t) for t in texts],
+    )
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-row vs batch KETERANGAN parsing for rekap (no database needed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50_000)
+        parser.add_argument("--unique-ratio", type=float, default=0.2,
+                            help="Share of distinct strings (1.0 = all different)")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **opts):
+        if opts["rows"] <= 0 or not (0 < opts["unique_ratio"] <= 1):
+            raise CommandError("--rows harus > 0 dan --unique-ratio di (0, 1].")
+        texts = synthetic_keterangan(opts["rows"], opts["unique_ratio"])
+        self.stdout.write(f"{len(texts)} baris, {len(set(texts))} keterangan unik")
+
+        def best_of(fn):
+            best, result = None, None
+            for _ in range(opts["repeat"]):
+                parse_keterangan.cache_clear()
+                start = time.perf_counter()
+                result = fn(texts)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            return best, result
+
+        per_row_s, expected = best_of(_per_row)
+        batch_s, got = best_of(parse_keterangan_batch)
+        if tuple(got) != expected:
+            raise CommandError("Hasil batch berbeda dengan parser per baris.")
+
+        self.stdout.write(f"  per baris : {per_row_s * 1000:8.1f} ms")
+        self.stdout.write(f"  batch     : {batch_s * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Speedup {per_row_s / batch_s:.1f}x (hasil identik)"))
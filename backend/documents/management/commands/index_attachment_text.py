@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from documents.models import SupportingDocument
+from documents.page_text import file_text, needs_ocr
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill SupportingDocument.content_text for search: PDF text layer inline, "
+        "scanned attachments are queued for OCR (Celery `parse` queue, or OCR'd here without a broker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", help="Only this company code (ttu, asn, ...)")
+        parser.add_argument("--no-ocr", action="store_true", help="Only read text layers; skip OCR")
+
+    def handle(self, *args, **opts):
+        # Lazy: views pulls in the whole app (and Celery) at import time.
+        from documents.views import _enqueue_text_index
+
+        qs = SupportingDocument.objects.filter(content_text="").exclude(file="")
+        if opts["company"]:
+            qs = qs.filter(main_document__company=opts["company"].lower().strip())
+
+        done = scanned = 0
+        for pk, name in qs.order_by("pk").values_list("pk", "file").iterator(chunk_size=500):
+            sdoc = SupportingDocument(pk=pk, file=name)
+            try:
+                text = file_text(sdoc.file.path)
+            except Exception as e:
+                self.stderr.write(f"  sdoc={pk}: {e}")
+                continue
+            if needs_ocr(text):
+                scanned += 1
+                if not opts["no_ocr"]:
+                    _enqueue_text_index([pk], ocr_inline=True)
+                continue
+            SupportingDocument.objects.filter(pk=pk).update(content_text=text)
+            done += 1
+            if done % 500 == 0:
+                self.stdout.write(f"  {done} lampiran...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Text indexed: {done} lampiran, {scanned} hasil scan "
+            f"({'dilewati' if opts['no_ocr'] else 'OCR diantrikan'})."
+        ))
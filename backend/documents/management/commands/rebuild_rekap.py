@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from documents.models import Document, RekapEntry
+from documents.rekap import iter_rekap_rows_many
+
+
+class Command(BaseCommand):
+    help = "Rebuild RekapEntry facts from paid + archived documents (backfill / after REKAP_CONFIG changes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", help="Only this company code (ttu, asn, ...)")
+        parser.add_argument("--chunk-size", type=int, default=200)
+
+    def handle(self, *args, **opts):
+        qs = Document.objects.filter(archived=True, status="sudah_dibayar")
+        stale = RekapEntry.objects.exclude(document__archived=True, document__status="sudah_dibayar")
+        if opts["company"]:
+            company = opts["company"].lower().strip()
+            qs = qs.filter(company=company)
+            stale = stale.filter(company=company)
+
+        deleted, _ = stale.delete()
+        done = 0
+        chunk: list[Document] = []
+        for doc in qs.order_by("pk").iterator(chunk_size=opts["chunk_size"]):
+            chunk.append(doc)
+            if len(chunk) >= opts["chunk_size"]:
+                done += self._rebuild(chunk)
+                chunk = []
+                self.stdout.write(f"  {done} dokumen...")
+        if chunk:
+            done += self._rebuild(chunk)
+
+        total = RekapEntry.objects.filter(document__in=qs).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rekap rebuilt: {done} dokumen, {total} baris (stale removed: {deleted})."
+        ))
+
+    def _rebuild(self, docs: list[Document]) -> int:
+        # Keterangan of the whole chunk is parsed in one batch.
+        entries = [
+            RekapEntry.from_row(doc, row)
+            for doc, row in iter_rekap_rows_many((doc, doc.doc_type, doc.parsed_json) for doc in docs)
+        ]
+        with transaction.atomic():
+            RekapEntry.objects.filter(document__in=docs).delete()
+            RekapEntry.objects.bulk_create(entries, batch_size=1000)
+        return len(docs)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:24
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_stamped_at(apps, schema_editor):
+    # Until now approval stamped the file synchronously, so every approved
+    # attachment already carries the stamp.
+    SupportingDocument = apps.get_model("documents", "SupportingDocument")
+    SupportingDocument.objects.filter(status="disetujui", approved_at__isnull=False).update(
+        stamped_at=F("approved_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0050_alter_paymentproof_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supportingdocument',
+            name='stamped_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_stamped_at, migrations.RunPython.noop),
+    ]
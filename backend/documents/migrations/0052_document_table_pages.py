@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0051_supportingdocument_stamped_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='table_pages',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
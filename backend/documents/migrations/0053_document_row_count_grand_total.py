@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:02
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of documents.utils.recalc_totals / summarize_parsed as of this
+# migration (grand total = sum of every section's PENGIRIMAN column).
+def _idr_to_int(text) -> int:
+    nums = re.sub(r"[^0-9]", "", str(text))
+    return int(nums) if nums else 0
+
+
+def summarize(parsed) -> tuple[int, int]:
+    """(row_count, grand_total); blank rows are not counted."""
+    rows = 0
+    grand = 0
+    for sec in parsed if isinstance(parsed, list) else []:
+        if not isinstance(sec, dict):
+            continue
+        tbl = sec.get("table") or []
+        for r in tbl[1:]:
+            if any(str(v or "").strip() for v in r):
+                rows += 1
+        if tbl and "PENGIRIMAN" in tbl[0]:
+            idx = tbl[0].index("PENGIRIMAN")
+            grand += sum(_idr_to_int(r[idx]) for r in tbl[1:] if len(r) > idx)
+    return rows, grand
+
+
+def backfill_summary(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    batch = []
+    for doc in Document.objects.only("id", "parsed_json").iterator(chunk_size=200):
+        doc.row_count, doc.grand_total = summarize(doc.parsed_json)
+        batch.append(doc)
+        if len(batch) >= 200:
+            Document.objects.bulk_update(batch, ["row_count", "grand_total"])
+            batch = []
+    if batch:
+        Document.objects.bulk_update(batch, ["row_count", "grand_total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0052_document_table_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='grand_total',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
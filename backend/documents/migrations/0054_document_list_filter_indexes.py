@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0053_document_row_count_grand_total'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['company', 'archived', 'status', 'created_at'], name='doc_company_arch_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['doc_type', 'company', 'created_at'], name='doc_type_company_created_idx'),
+        ),
+    ]
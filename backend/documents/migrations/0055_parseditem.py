@@ -0,0 +1,105 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:32
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of documents.utils.iter_parsed_items as of this migration.
+ITEM_COLUMNS = {
+    "ref_code": "REF_CODE",
+    "keterangan": "KETERANGAN",
+    "dibayar_ke": "DIBAYAR KE",
+    "bank": "BANK",
+    "amount": "PENGIRIMAN",
+    "pay_ref": "PAY_REF",
+}
+
+
+def _idr_to_int(text) -> int:
+    nums = re.sub(r"[^0-9]", "", str(text))
+    return int(nums) if nums else 0
+
+
+def iter_parsed_items(parsed):
+    """One dict per non-blank table row; missing columns give ''/0."""
+    for s_idx, sec in enumerate(parsed if isinstance(parsed, list) else []):
+        if not isinstance(sec, dict):
+            continue
+        tbl = sec.get("table") or []
+        if len(tbl) < 2:
+            continue
+        headers = [str(h or "").strip().upper() for h in tbl[0]]
+        idx = {key: headers.index(col) if col in headers else None for key, col in ITEM_COLUMNS.items()}
+        for r_idx, row in enumerate(tbl[1:]):
+            if not any(str(v or "").strip() for v in row):
+                continue
+
+            def cell(key):
+                i = idx[key]
+                return str(row[i] or "").strip() if i is not None and i < len(row) else ""
+
+            yield {
+                "section_index": s_idx,
+                "row_index": r_idx,
+                "ref_code": cell("ref_code"),
+                "keterangan": cell("keterangan"),
+                "dibayar_ke": cell("dibayar_ke"),
+                "bank": cell("bank"),
+                "amount_int": _idr_to_int(cell("amount")),
+                "pay_ref": cell("pay_ref"),
+            }
+
+
+def backfill_items(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    ParsedItem = apps.get_model("documents", "ParsedItem")
+    batch = []
+    for doc in Document.objects.only("id", "parsed_json").iterator(chunk_size=200):
+        for row in iter_parsed_items(doc.parsed_json):
+            batch.append(ParsedItem(
+                document_id=doc.pk,
+                section_index=row["section_index"],
+                row_index=row["row_index"],
+                ref_code=row["ref_code"][:12],
+                keterangan=row["keterangan"],
+                dibayar_ke=row["dibayar_ke"][:255],
+                bank=row["bank"][:255],
+                amount_int=row["amount_int"],
+                pay_ref=row["pay_ref"][:100],
+            ))
+        if len(batch) >= 1000:
+            ParsedItem.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ParsedItem.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0054_document_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section_index', models.IntegerField()),
+                ('row_index', models.IntegerField()),
+                ('ref_code', models.CharField(blank=True, db_index=True, max_length=12)),
+                ('keterangan', models.TextField(blank=True)),
+                ('dibayar_ke', models.CharField(blank=True, max_length=255)),
+                ('bank', models.CharField(blank=True, max_length=255)),
+                ('amount_int', models.BigIntegerField(default=0)),
+                ('pay_ref', models.CharField(blank=True, max_length=100)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='documents.document')),
+            ],
+            options={
+                'ordering': ['document', 'section_index', 'row_index'],
+                'constraints': [models.UniqueConstraint(fields=('document', 'section_index', 'row_index'), name='parseditem_doc_sec_row_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0055_parseditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentCodeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(max_length=50)),
+                ('company', models.CharField(max_length=50)),
+                ('period', models.PositiveIntegerField(help_text='YYYYMM')),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doc_type', 'company', 'period'), name='doccodecounter_type_company_period_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0056_documentcodecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='parsed_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
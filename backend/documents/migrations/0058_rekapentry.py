@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0057_document_parsed_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RekapEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rekap_key', models.CharField(max_length=32)),
+                ('company', models.CharField(max_length=50)),
+                ('tanggal_pengajuan', models.DateField()),
+                ('tanggal_masuk', models.DateField(blank=True, null=True)),
+                ('section_index', models.IntegerField()),
+                ('row_index', models.IntegerField()),
+                ('ref_code', models.CharField(blank=True, max_length=12)),
+                ('keterangan', models.TextField(blank=True)),
+                ('dibayar_ke', models.CharField(blank=True, max_length=255)),
+                ('liters', models.IntegerField(default=0)),
+                ('nominal', models.BigIntegerField(default=0)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rekap_entries', to='documents.document')),
+            ],
+            options={
+                'ordering': ['tanggal_pengajuan', 'document', 'section_index', 'row_index'],
+                'indexes': [models.Index(fields=['rekap_key', 'company', 'tanggal_pengajuan'], name='rekap_key_company_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('document', 'rekap_key', 'section_index', 'row_index'), name='rekapentry_doc_key_row_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:02
+
+import copy
+import re
+
+from django.db import migrations
+
+# Frozen copy of documents.utils.parse_idr / recalc_totals / summarize_parsed
+# as of this migration; later edits there must not change what it does.
+_DECIMALS_RE = re.compile(r",\s*\d{1,2}\s*$")
+_NEGATIVE_RE = re.compile(r"^\(\s*[\d.,\s]+\)$")
+_NOTE_RE = re.compile(r"\([^)]*\)")
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+
+def parse_idr(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    s = str(value).strip().lower().replace("rp", "").replace("idr", "").strip()
+    if not s:
+        return 0
+    wrapped = bool(_NEGATIVE_RE.match(s))
+    neg = wrapped or s.startswith("-")
+    s = s[1:-1] if wrapped else _NOTE_RE.sub(" ", s)
+    digits = _NON_DIGIT_RE.sub("", _DECIMALS_RE.sub("", s.strip()))
+    if not digits:
+        return 0
+    return -int(digits) if neg else int(digits)
+
+
+def _int_to_idr(n: int) -> str:
+    return f"{n:,}".replace(",", ".")
+
+
+def row_amounts(sec) -> list[int] | None:
+    """PENGIRIMAN int per data row (None without that column)."""
+    tbl = sec.get("table") or []
+    if not tbl:
+        return None
+    try:
+        idx = tbl[0].index("PENGIRIMAN")
+    except ValueError:
+        return None
+    return [parse_idr(r[idx]) if len(r) > idx else 0 for r in tbl[1:]]
+
+
+def recalc_totals(parsed: list) -> list:
+    grand = 0
+    for sec in parsed:
+        if not isinstance(sec, dict) or "grand_total" in sec:
+            continue
+        sec.pop("amounts", None)
+        amounts = row_amounts(sec)
+        if amounts is None:
+            continue
+        subtotal = sum(amounts)
+        sec["subtotal"] = _int_to_idr(subtotal)
+        grand += subtotal
+    if parsed and isinstance(parsed[-1], dict) and "grand_total" in parsed[-1]:
+        parsed[-1]["grand_total"] = _int_to_idr(grand)
+    else:
+        parsed.append({"grand_total": _int_to_idr(grand)})
+    return parsed
+
+
+def item_amounts(parsed: list) -> dict:
+    """(section_index, row_index) → ParsedItem.amount_int."""
+    out = {}
+    for s_idx, sec in enumerate(parsed):
+        if not isinstance(sec, dict):
+            continue
+        tbl = sec.get("table") or []
+        if len(tbl) < 2:
+            continue
+        headers = [str(h or "").strip().upper() for h in tbl[0]]
+        if "PENGIRIMAN" not in headers:
+            continue
+        idx = headers.index("PENGIRIMAN")
+        for r_idx, row in enumerate(tbl[1:]):
+            out[(s_idx, r_idx)] = parse_idr(str(row[idx] or "").strip() if idx < len(row) else "")
+    return out
+
+
+def reparse_amounts(apps, schema_editor):
+    """
+    Recompute subtotals / grand_total with parse_idr (decimals like ',00' are
+    no longer glued onto the integer part, and negatives keep their sign),
+    plus the ints derived from them.
+    """
+    Document = apps.get_model("documents", "Document")
+    ParsedItem = apps.get_model("documents", "ParsedItem")
+    docs, items = [], []
+    for doc in Document.objects.only("id", "parsed_json", "grand_total").iterator(chunk_size=200):
+        if not isinstance(doc.parsed_json, list) or not doc.parsed_json:
+            continue
+        parsed = recalc_totals(copy.deepcopy(doc.parsed_json))
+        if parsed == doc.parsed_json:
+            continue
+        doc.parsed_json = parsed
+        doc.grand_total = parse_idr(parsed[-1]["grand_total"])
+        docs.append(doc)
+
+        amounts = item_amounts(parsed)
+        for item in ParsedItem.objects.filter(document_id=doc.id).only(
+            "id", "section_index", "row_index", "amount_int"
+        ):
+            amount = amounts.get((item.section_index, item.row_index), item.amount_int)
+            if amount != item.amount_int:
+                item.amount_int = amount
+                items.append(item)
+
+        if len(docs) >= 200:
+            Document.objects.bulk_update(docs, ["parsed_json", "grand_total"])
+            ParsedItem.objects.bulk_update(items, ["amount_int"], batch_size=500)
+            docs, items = [], []
+    Document.objects.bulk_update(docs, ["parsed_json", "grand_total"])
+    ParsedItem.objects.bulk_update(items, ["amount_int"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0058_rekapentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(reparse_amounts, migrations.RunPython.noop),
+    ]
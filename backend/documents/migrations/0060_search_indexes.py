@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def backfill_item_company(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    ParsedItem = apps.get_model("documents", "ParsedItem")
+    for doc in Document.objects.only("id", "parsed_json").iterator(chunk_size=200):
+        titles = {
+            s_idx: str(sec.get("company") or "").strip()[:200]
+            for s_idx, sec in enumerate(doc.parsed_json or [])
+            if isinstance(sec, dict) and sec.get("company")
+        }
+        for s_idx, title in titles.items():
+            ParsedItem.objects.filter(document_id=doc.id, section_index=s_idx).update(company=title)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0059_reparse_amounts'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='parseditem',
+            name='company',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.RunPython(backfill_item_company, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='parseditem',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('keterangan', 'dibayar_ke', 'bank', 'company', config='simple'), name='parseditem_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parseditem',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('keterangan', name='gin_trgm_ops'), name='parseditem_ket_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parseditem',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('dibayar_ke', name='gin_trgm_ops'), name='parseditem_dibayar_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportingdocument',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('title', name='gin_trgm_ops'), name='sdoc_title_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportingdocument',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('company_name', name='gin_trgm_ops'), name='sdoc_company_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:53
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0060_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supportingdocument',
+            name='content_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='supportingdocument',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('content_text', config='simple'), name='sdoc_content_search_idx'),
+        ),
+    ]
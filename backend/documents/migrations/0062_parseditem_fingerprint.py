@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:57
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of documents.utils.payment_fingerprint as of this migration.
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PAYEE_NOISE = {"pt", "cv", "ud", "tbk", "persero", "bpk", "bapak", "ibu", "sdr", "an"}
+_KETERANGAN_STOPWORDS = {
+    "dan", "untuk", "dari", "yang", "atas", "dengan", "ke", "di", "no", "nomor",
+    "rp", "bayar", "pembayaran", "biaya", "tagihan", "invoice", "inv", "tgl", "tanggal",
+}
+
+
+def payment_fingerprint(dibayar_ke: str, amount: int, keterangan: str) -> str:
+    if not amount or amount <= 0:
+        return ""
+    payee = " ".join(t for t in _TOKEN_RE.findall((dibayar_ke or "").lower()) if t not in _PAYEE_NOISE)
+    tokens = sorted({
+        t for t in _TOKEN_RE.findall((keterangan or "").lower())
+        if t not in _KETERANGAN_STOPWORDS and (len(t) >= 3 or t.isdigit())
+    })
+    if not payee and not tokens:
+        return ""
+    raw = f"{payee}|{int(amount)}|{' '.join(tokens)}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    ParsedItem = apps.get_model("documents", "ParsedItem")
+    batch = []
+    for item in ParsedItem.objects.only("id", "dibayar_ke", "amount_int", "keterangan").iterator(chunk_size=2000):
+        item.fingerprint = payment_fingerprint(item.dibayar_ke, item.amount_int, item.keterangan)
+        if item.fingerprint:
+            batch.append(item)
+        if len(batch) >= 1000:
+            ParsedItem.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    if batch:
+        ParsedItem.objects.bulk_update(batch, ["fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0061_supportingdocument_content_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parseditem',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=24),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='parseditem',
+            index=models.Index(condition=models.Q(('fingerprint', ''), _negated=True), fields=['fingerprint'], name='parseditem_fingerprint_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0062_parseditem_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supportingdocument',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:02
+
+from django.db import migrations
+
+
+def strip_section_amounts(apps, schema_editor):
+    # Per-row ints live in ParsedItem.amount_int; sections no longer carry them.
+    Document = apps.get_model("documents", "Document")
+    docs = Document.objects.filter(parsed_json__contains=[{}]).only("id", "parsed_json")
+    for doc in docs.iterator(chunk_size=500):
+        parsed = doc.parsed_json
+        if not isinstance(parsed, list):
+            continue
+        touched = False
+        for sec in parsed:
+            if isinstance(sec, dict) and "amounts" in sec:
+                del sec["amounts"]
+                touched = True
+        if touched:
+            Document.objects.filter(pk=doc.pk).update(parsed_json=parsed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0063_supportingdocument_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_section_amounts, migrations.RunPython.noop),
+    ]
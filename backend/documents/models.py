@@ -4,13 +4,25 @@
 import os
 import random
 import string
+from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
-from documents.utils import recalc_totals
+from documents.rekap import iter_rekap_rows
+from documents.utils import (
+    iter_parsed_items,
+    payment_fingerprint,
+    recalc_totals,
+    summarize_parsed,
+)
 
 
 # ---------------------------------------------------------------------
@@ -30,6 +42,23 @@ def validate_file_extension(value):
         raise ValidationError("File harus PDF, Word, Excel, PNG, JPG, atau JPEG.")
 
 
+# Cached dashboard stats (DocumentViewSet.stats) are keyed by this counter;
+# bumping it invalidates every cached variant at once.
+STATS_VERSION_KEY = "documents:stats:version"
+
+
+def bump_document_stats_version():
+    def _bump():
+        try:
+            cache.incr(STATS_VERSION_KEY)
+        except ValueError:
+            cache.set(STATS_VERSION_KEY, 1, None)
+        except Exception:
+            pass  # cache down: entries expire on their own
+
+    transaction.on_commit(_bump)
+
+
 PREFIX_MAP = {
     "pembayaran_pekerjaan": "PP",
     "penggantian_kas_kantor": "KK",
@@ -95,6 +124,26 @@ class Document(models.Model):
     archived_at = models.DateTimeField(null=True, blank=True)
 
     parsed_json = models.JSONField(blank=True, null=True)
+    # Number of leading recap (table) pages in `file`; the rest are attachments
+    table_pages = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Summary of parsed_json, kept in sync by save() so list views can skip it
+    row_count = models.PositiveIntegerField(default=0, editable=False)
+    grand_total = models.BigIntegerField(default=0, editable=False)
+    # Bumped whenever parsed_json changes; cell patches must send the version they read
+    parsed_version = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Directory / home list filters (see DocumentViewSet.get_queryset)
+            models.Index(
+                fields=["company", "archived", "status", "created_at"],
+                name="doc_company_arch_status_idx",
+            ),
+            models.Index(
+                fields=["doc_type", "company", "created_at"],
+                name="doc_type_company_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.document_code or "(new)"
@@ -115,30 +164,396 @@ class Document(models.Model):
         # Default: prefix + monthly running number
         prefix = PREFIX_MAP.get(self.doc_type, PREFIX_MAP["default"])
         yymm = now.strftime("%y%m")
-        latest = (
+        seq = DocumentCodeCounter.next_value(
+            self.doc_type,
+            self.company,
+            now.year * 100 + now.month,
+            seed=lambda: self._max_sequence_in_month(now),
+        )
+        code = f"{prefix}-{comp}-{yymm}-{seq:04d}"
+        return code, seq
+
+    def _max_sequence_in_month(self, now):
+        # Seed for a fresh counter row; range (not extract) on created_at so
+        # the (doc_type, company, created_at) index applies.
+        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return (
             Document.objects.filter(
                 doc_type=self.doc_type,
                 company=self.company,
-                created_at__year=now.year,
-                created_at__month=now.month,
+                created_at__gte=start,
+                created_at__lt=end,
             )
             .aggregate(models.Max("sequence_no"))
             .get("sequence_no__max")
             or 0
         )
-        seq = latest + 1
-        code = f"{prefix}-{comp}-{yymm}-{seq:04d}"
-        return code, seq
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._parsed_dirty = set()  # loaded: nothing edited yet
+        # None = archived/status deferred (e.g. .only(...)): reading them here
+        # would refetch every row.
+        deferred = instance.get_deferred_fields()
+        instance._loaded_in_rekap = None if {"archived", "status"} & deferred else instance.in_rekap
+        return instance
+
+    def __setattr__(self, name, value):
+        # Assigning parsed_json (serializer update, views) = every section may
+        # have changed. In-place edits say which ones via mark_sections_changed.
+        if name == "parsed_json" and "_parsed_dirty" in self.__dict__:
+            self.__dict__["_parsed_dirty"] = None
+        super().__setattr__(name, value)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A reload (incl. a deferred parsed_json being fetched) is not an edit.
+        dirty = self.__dict__.get("_parsed_dirty")
+        super().refresh_from_db(using, fields, from_queryset)
+        if "_parsed_dirty" in self.__dict__:
+            reloaded = fields is None or "parsed_json" in fields
+            self.__dict__["_parsed_dirty"] = set() if reloaded else dirty
+
+    def mark_sections_changed(self, sections):
+        """Record in-place edits of these parsed_json sections for the next save()."""
+        dirty = self.__dict__.get("_parsed_dirty")
+        if dirty is not None:
+            dirty.update(sections)
+
+    @property
+    def in_rekap(self) -> bool:
+        """Paid + archived documents are what the rekaps report on."""
+        return bool(self.archived and self.status == "sudah_dibayar")
+
+    def _parsed_changes(self, update_fields):
+        """
+        (changed?, sections to recompute or None for all). Nothing is hashed:
+        a loaded document only counts as changed when parsed_json was assigned
+        or sections were marked; an explicit update_fields=["parsed_json"]
+        after unmarked in-place edits recomputes everything.
+        """
+        if update_fields is not None and "parsed_json" not in update_fields:
+            return False, set()
+        dirty = self.__dict__.get("_parsed_dirty")  # missing on new instances
+        if self._state.adding or dirty is None:
+            return True, None
+        if not dirty:
+            return update_fields is not None, None
+        return True, dirty
 
     def save(self, *args, **kwargs):
-        # Always recalc totals from raw values before saving
-        if self.parsed_json:
-            self.parsed_json = recalc_totals(self.parsed_json)
+        update_fields = kwargs.get("update_fields")
+        # e.g. save(update_fields=["approved_at"]) skips all of it
+        parsed_changed, sections = self._parsed_changes(update_fields)
+        if parsed_changed:
+            # Only the changed sections are reparsed; the rest keep their subtotal.
+            if self.parsed_json:
+                self.parsed_json = recalc_totals(self.parsed_json, sections)
+            self.row_count, self.grand_total = summarize_parsed(self.parsed_json)
+            if self.pk:
+                self.parsed_version += 1
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "row_count", "grand_total", "parsed_version"}
+        if kwargs.get("update_fields"):
+            # auto_now only touches saved fields; updated_at backs the API ETags
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
         if not self.document_code:
             self.document_code, self.sequence_no = self._generate_next_code()
         elif self.revision_no and not self.document_code.endswith(f"-R{self.revision_no}"):
             self.document_code += f"-R{self.revision_no}"
-        super().save(*args, **kwargs)
+        loaded_in_rekap = getattr(self, "_loaded_in_rekap", False)
+        if loaded_in_rekap is None:
+            rekap_changed = update_fields is None or bool(
+                {"archived", "status", "parsed_json"} & set(update_fields)
+            )
+        else:
+            rekap_changed = self.in_rekap != loaded_in_rekap or (self.in_rekap and parsed_changed)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if parsed_changed:
+                self.sync_items(sections)
+            if rekap_changed:
+                self.sync_rekap()
+        self._loaded_in_rekap = self.in_rekap
+        self._parsed_dirty = set()
+        bump_document_stats_version()
+
+    def sync_items(self, sections=None):
+        """
+        Bring this document's ParsedItem rows (of `sections`, default all) in
+        line with parsed_json, writing only rows that were added, removed or
+        changed.
+        """
+        items = ParsedItem.objects.filter(document=self)
+        if sections is not None:
+            items = items.filter(section_index__in=sections)
+        existing = {(item.section_index, item.row_index): item for item in items}
+        to_create, to_update = [], []
+        for row in iter_parsed_items(self.parsed_json, sections):
+            new = ParsedItem.from_row(self, row)
+            old = existing.pop((new.section_index, new.row_index), None)
+            if old is None:
+                to_create.append(new)
+            elif any(getattr(old, f) != getattr(new, f) for f in ParsedItem.SYNCED_FIELDS):
+                for f in ParsedItem.SYNCED_FIELDS:
+                    setattr(old, f, getattr(new, f))
+                to_update.append(old)
+        if existing:
+            ParsedItem.objects.filter(pk__in=[item.pk for item in existing.values()]).delete()
+        if to_update:
+            ParsedItem.objects.bulk_update(to_update, ParsedItem.SYNCED_FIELDS)
+        if to_create:
+            ParsedItem.objects.bulk_create(to_create)
+
+    def sync_rekap(self):
+        """Rebuild this document's RekapEntry facts (none unless paid + archived)."""
+        RekapEntry.objects.filter(document=self).delete()
+        if not self.in_rekap:
+            return
+        RekapEntry.objects.bulk_create(
+            RekapEntry.from_row(self, row) for row in iter_rekap_rows(self.doc_type, self.parsed_json)
+        )
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_document_stats_version()
+        return result
+
+
+# ---------------------------------------------------------------------
+# Model: DocumentCodeCounter (monthly running numbers for document_code)
+# ---------------------------------------------------------------------
+class DocumentCodeCounter(models.Model):
+    doc_type = models.CharField(max_length=50)
+    company = models.CharField(max_length=50)
+    period = models.PositiveIntegerField(help_text="YYYYMM")
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["doc_type", "company", "period"],
+                name="doccodecounter_type_company_period_uniq",
+            ),
+        ]
+
+    @classmethod
+    def next_value(cls, doc_type: str, company: str, period: int, seed=None) -> int:
+        """
+        Atomically take the next number for (doc_type, company, period).
+        The row is locked (SELECT ... FOR UPDATE) for the increment, so
+        parallel ingestions never get the same value. A missing row is
+        created from `seed()` (the highest number already used).
+        """
+        key = {"doc_type": doc_type, "company": company, "period": period}
+        with transaction.atomic():
+            counter = cls.objects.select_for_update().filter(**key).first()
+            if counter is None:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(**key, last_value=seed() if seed else 0)
+                except IntegrityError:
+                    pass  # created concurrently; lock theirs instead
+                counter = cls.objects.select_for_update().get(**key)
+            counter.last_value += 1
+            counter.save(update_fields=["last_value"])
+            return counter.last_value
+
+    def __str__(self):
+        return f"{self.doc_type}/{self.company}/{self.period}: {self.last_value}"
+
+
+# ---------------------------------------------------------------------
+# Model: ParsedItem (row-level mirror of Document.parsed_json)
+# ---------------------------------------------------------------------
+class ParsedItem(models.Model):
+    """
+    One row of a document's parsed tables. parsed_json stays the editing
+    format; these rows are rebuilt by Document.save() for indexed lookups.
+    """
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="items",
+    )
+    section_index = models.IntegerField()
+    row_index = models.IntegerField()
+    ref_code = models.CharField(max_length=12, blank=True, db_index=True)
+    keterangan = models.TextField(blank=True)
+    dibayar_ke = models.CharField(max_length=255, blank=True)
+    bank = models.CharField(max_length=255, blank=True)
+    amount_int = models.BigIntegerField(default=0)
+    pay_ref = models.CharField(max_length=100, blank=True)
+    company = models.CharField(max_length=200, blank=True)  # section title (vendor / category)
+    # payment_fingerprint(dibayar_ke, amount_int, keterangan): same value = possible double payment
+    fingerprint = models.CharField(max_length=24, blank=True, editable=False)
+
+    # Columns derived from the parsed row (everything but the position)
+    SYNCED_FIELDS = [
+        "ref_code", "keterangan", "dibayar_ke", "bank", "amount_int", "pay_ref", "company", "fingerprint",
+    ]
+    DUPLICATE_MATCHES_MAX = 5  # per row in find_duplicates()
+
+    # Full-text document of a row. Queries must use this exact expression so
+    # Postgres can match it to parseditem_search_idx.
+    SEARCH_VECTOR = SearchVector("keterangan", "dibayar_ke", "bank", "company", config="simple")
+
+    class Meta:
+        ordering = ["document", "section_index", "row_index"]
+        indexes = [
+            GinIndex(
+                SearchVector("keterangan", "dibayar_ke", "bank", "company", config="simple"),
+                name="parseditem_search_idx",
+            ),
+            # pg_trgm: fuzzy / partial matches ("BK 1234", misspelled vendors)
+            GinIndex(OpClass("keterangan", name="gin_trgm_ops"), name="parseditem_ket_trgm_idx"),
+            GinIndex(OpClass("dibayar_ke", name="gin_trgm_ops"), name="parseditem_dibayar_trgm_idx"),
+            models.Index(
+                fields=["fingerprint"],
+                name="parseditem_fingerprint_idx",
+                condition=~models.Q(fingerprint=""),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["document", "section_index", "row_index"],
+                name="parseditem_doc_sec_row_uniq",
+            ),
+        ]
+
+    @classmethod
+    def from_row(cls, document, row: dict) -> "ParsedItem":
+        return cls(
+            document=document,
+            section_index=row["section_index"],
+            row_index=row["row_index"],
+            ref_code=row["ref_code"][:12],
+            keterangan=row["keterangan"],
+            dibayar_ke=row["dibayar_ke"][:255],
+            bank=row["bank"][:255],
+            amount_int=row["amount_int"],
+            pay_ref=row["pay_ref"][:100],
+            company=row["company"][:200],
+            fingerprint=payment_fingerprint(row["dibayar_ke"], row["amount_int"], row["keterangan"]),
+        )
+
+    @classmethod
+    def find_duplicates(cls, document, sections=None) -> list[dict]:
+        """
+        Rows of `document` whose fingerprint also appears on another row
+        (another packet, or twice in this one), with up to
+        DUPLICATE_MATCHES_MAX matches each (newest first) and `match_count`,
+        the total. Rejected documents don't count. The cap is applied in SQL
+        per fingerprint, so a common invoice never pulls its whole history;
+        parsed_json is never scanned.
+        """
+        mine = cls.objects.filter(document=document).exclude(fingerprint="")
+        if sections is not None:
+            mine = mine.filter(section_index__in=sections)
+        mine = list(mine.values("section_index", "row_index", "ref_code", "fingerprint"))
+        if not mine:
+            return []
+        partition = {"partition_by": F("fingerprint")}
+        by_fp: dict[str, list[dict]] = {}
+        totals: dict[str, int] = {}
+        for hit in (
+            cls.objects.filter(fingerprint__in={row["fingerprint"] for row in mine})
+            .exclude(document__status="rejected")
+            .annotate(
+                rank=Window(RowNumber(), order_by=("-document__created_at", "section_index", "row_index"), **partition),
+                total=Window(Count("id"), **partition),
+            )
+            # +1: a row's own entry may be among the first hits of its fingerprint
+            .filter(rank__lte=cls.DUPLICATE_MATCHES_MAX + 1)
+            .order_by("fingerprint", "rank")
+            .values(
+                "fingerprint", "total", "document_id", "document__document_code", "document__status",
+                "section_index", "row_index", "ref_code",
+            )
+        ):
+            fp = hit.pop("fingerprint")
+            totals[fp] = hit.pop("total")
+            by_fp.setdefault(fp, []).append(hit)
+
+        flagged = []
+        for row in mine:
+            fp = row.pop("fingerprint")
+            matches = [
+                {
+                    "document_id": hit["document_id"],
+                    "document_code": hit["document__document_code"],
+                    "status": hit["document__status"],
+                    "section_index": hit["section_index"],
+                    "row_index": hit["row_index"],
+                    "ref_code": hit["ref_code"] or None,
+                }
+                for hit in by_fp.get(fp, [])
+                if (hit["document_id"], hit["section_index"], hit["row_index"])
+                != (document.pk, row["section_index"], row["row_index"])
+            ]
+            if matches:
+                row["ref_code"] = row["ref_code"] or None
+                row["matches"] = matches[: cls.DUPLICATE_MATCHES_MAX]
+                # every other row with this fingerprint (a rejected document's own row isn't counted)
+                row["match_count"] = totals[fp] - (document.status != "rejected")
+                flagged.append(row)
+        return flagged
+
+    def __str__(self):
+        return f"{self.document_id} S{self.section_index + 1}R{self.row_index + 1} {self.ref_code}"
+
+
+# ---------------------------------------------------------------------
+# Model: RekapEntry (derived rekap rows of paid + archived documents)
+# ---------------------------------------------------------------------
+class RekapEntry(models.Model):
+    """One row of a rekap (e.g. BBM), maintained by Document.sync_rekap()."""
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="rekap_entries",
+    )
+    rekap_key = models.CharField(max_length=32)
+    company = models.CharField(max_length=50)
+    tanggal_pengajuan = models.DateField()  # Document.created_at (local date)
+    tanggal_masuk = models.DateField(null=True, blank=True)
+    section_index = models.IntegerField()
+    row_index = models.IntegerField()
+    ref_code = models.CharField(max_length=12, blank=True)
+    keterangan = models.TextField(blank=True)
+    dibayar_ke = models.CharField(max_length=255, blank=True)
+    liters = models.IntegerField(default=0)
+    nominal = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["tanggal_pengajuan", "document", "section_index", "row_index"]
+        indexes = [
+            models.Index(
+                fields=["rekap_key", "company", "tanggal_pengajuan"],
+                name="rekap_key_company_date_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["document", "rekap_key", "section_index", "row_index"],
+                name="rekapentry_doc_key_row_uniq",
+            ),
+        ]
+
+    @classmethod
+    def from_row(cls, document, row: dict) -> "RekapEntry":
+        return cls(
+            document=document,
+            company=document.company,
+            tanggal_pengajuan=timezone.localdate(document.created_at),
+            **{**row, "ref_code": row["ref_code"][:12], "dibayar_ke": row["dibayar_ke"][:255]},
+        )
+
+    def __str__(self):
+        return f"{self.rekap_key} {self.document_id} S{self.section_index + 1}R{self.row_index + 1}"
 
 
 # ---------------------------------------------------------------------
@@ -185,20 +600,36 @@ class SupportingDocument(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
     approved_at = models.DateTimeField(blank=True, null=True)
+    # Set once the approval stamp has been burned into `file` (async, after approval)
+    stamped_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     # AI attachment metadata
     ai_auto_attached = models.BooleanField(default=False)
     ai_confidence = models.FloatField(blank=True, null=True)
     ai_low_confidence = models.BooleanField(default=False)
 
+    # Page text (text layer, or OCR for scans) captured at ingestion / upload
+    content_text = models.TextField(blank=True, default="", editable=False)
+
+    # Must match sdoc_content_search_idx (see ParsedItem.SEARCH_VECTOR)
+    SEARCH_VECTOR = SearchVector("content_text", config="simple")
+
     class Meta:
         ordering = ["supporting_doc_sequence"]
+        indexes = [
+            GinIndex(SearchVector("content_text", config="simple"), name="sdoc_content_search_idx"),
+            GinIndex(OpClass("title", name="gin_trgm_ops"), name="sdoc_title_trgm_idx"),
+            GinIndex(OpClass("company_name", name="gin_trgm_ops"), name="sdoc_company_trgm_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         # Auto-build identifier once both parts are known
         if not self.identifier and self.item_ref_code and self.supporting_doc_sequence:
             self.identifier = f"{self.item_ref_code}{self.supporting_doc_sequence:02d}"
+        if kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
         super().save(*args, **kwargs)
 
     def __str__(self):
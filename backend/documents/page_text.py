@@ -0,0 +1,96 @@
+# backend/documents/page_text.py
+"""
+Text captured from supporting-document pages for full-text search
+(SupportingDocument.content_text).
+
+Ingestion already calls `page.get_text()` for ALPHA/BETA marker detection;
+`page_text` is that same call, so keeping the text costs nothing extra.
+Scanned pages have no text layer: those are OCR'd later from the stored file
+(`ocr_file_text`, every page without a text layer, run from a Celery task or
+the index_attachment_text command, never inside a request) with Tesseract when
+pytesseract and the binary are installed, otherwise they simply stay empty.
+"""
+
+import logging
+import os
+import re
+
+import fitz
+from django.conf import settings
+
+from .rendering import open_image, rasterize_page
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_CHARS = 100_000  # tsvector input cap per attachment
+MIN_TEXT_CHARS = 20  # less than this on a page → treat as scanned
+
+_WS_RE = re.compile(r"\s+")
+
+
+def clean_text(text: str | None) -> str:
+    """Collapse whitespace, drop NULs and cap the size."""
+    return _WS_RE.sub(" ", (text or "").replace("\x00", " ")).strip()[:MAX_TEXT_CHARS]
+
+
+def page_text(pdf: fitz.Document, page_index: int) -> str:
+    """Text layer of one PDF page ('' if unreadable)."""
+    try:
+        return pdf.load_page(page_index).get_text("text") or ""
+    except Exception:
+        return ""
+
+
+def needs_ocr(text: str | None) -> bool:
+    return len(clean_text(text)) < MIN_TEXT_CHARS
+
+
+def file_text(path: str) -> str:
+    """Text layer of a stored PDF (all pages); '' for images."""
+    if os.path.splitext(path)[1].lower() != ".pdf":
+        return ""
+    pdf = fitz.open(path)
+    try:
+        return clean_text(" ".join(page_text(pdf, i) for i in range(pdf.page_count)))
+    finally:
+        pdf.close()
+
+
+def ocr_file_text(path: str) -> str:
+    """
+    Local Tesseract OCR of a stored attachment: every PDF page without a text
+    layer (up to SUPPORTING_TEXT_OCR_MAX_PAGES of them; pages with text keep
+    it), or the image. '' when OCR is disabled or pytesseract / tesseract is
+    missing.
+    """
+    if not getattr(settings, "SUPPORTING_TEXT_OCR", True):
+        return ""
+    try:
+        import pytesseract  # type: ignore
+    except Exception:
+        return ""
+    width = int(getattr(settings, "SUPPORTING_TEXT_OCR_WIDTH", 1700))
+    lang = getattr(settings, "SUPPORTING_TEXT_OCR_LANG", "eng")
+    try:
+        if os.path.splitext(path)[1].lower() != ".pdf":
+            return clean_text(pytesseract.image_to_string(open_image(path), lang=lang))
+
+        budget = int(getattr(settings, "SUPPORTING_TEXT_OCR_MAX_PAGES", 20))
+        parts, size = [], 0
+        pdf = fitz.open(path)
+        try:
+            for i in range(pdf.page_count):
+                text = page_text(pdf, i)
+                if needs_ocr(text) and budget > 0:
+                    budget -= 1
+                    text = pytesseract.image_to_string(rasterize_page(pdf, i, width), lang=lang)
+                parts.append(text)
+                size += len(text)
+                if size >= MAX_TEXT_CHARS:
+                    break
+        finally:
+            pdf.close()
+        return clean_text(" ".join(parts))
+    except Exception as e:
+        logger.warning("OCR failed for %s: %s", path, e)
+        return ""
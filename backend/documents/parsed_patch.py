@@ -0,0 +1,173 @@
+# backend/documents/parsed_patch.py
+"""
+Cell-level edits for Document.parsed_json (RFC 6902-style ops).
+
+Paths address a section, a data row (0-based, header excluded) and a column:
+
+    /<section>/<row>/<column>       e.g. /0/3/KETERANGAN or /0/3/4
+    /ref/<REF_CODE>/<column>        row looked up by its REF_CODE
+    /<section>/-                    end of the table (for "add")
+
+Supported ops: replace, add (insert a row before <row>, or append with "-"),
+remove (a row) and test (compare a cell; fails the whole patch on mismatch).
+"""
+
+from .utils import generate_unique_item_ref_code
+
+
+class PatchError(ValueError):
+    """Invalid op / path, or a failed "test" op."""
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _split(path) -> list[str]:
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise PatchError(f"Path tidak valid: {path!r}")
+    return [_unescape(t) for t in path[1:].split("/")]
+
+
+def _section(parsed: list, token: str) -> int:
+    try:
+        s = int(token)
+    except ValueError:
+        raise PatchError(f"Section tidak valid: {token!r}")
+    if not (0 <= s < len(parsed)) or not isinstance(parsed[s], dict) or not (parsed[s].get("table") or []):
+        raise PatchError(f"Section {token} tidak ditemukan.")
+    return s
+
+
+def _find_ref(parsed: list, ref_code: str) -> tuple[int, int]:
+    for s, sec in enumerate(parsed):
+        tbl = sec.get("table") if isinstance(sec, dict) else None
+        if not tbl or "REF_CODE" not in tbl[0]:
+            continue
+        ref_i = tbl[0].index("REF_CODE")
+        for r, row in enumerate(tbl[1:]):
+            if ref_i < len(row) and str(row[ref_i]) == ref_code:
+                return s, r
+    raise PatchError(f"REF_CODE {ref_code} tidak ditemukan.")
+
+
+def _column(headers: list, token: str) -> int:
+    if token.isdigit():
+        c = int(token)
+        if c < len(headers):
+            return c
+    else:
+        wanted = token.strip().upper()
+        for c, h in enumerate(headers):
+            if str(h).strip().upper() == wanted:
+                return c
+    raise PatchError(f"Kolom {token!r} tidak ditemukan.")
+
+
+def _resolve(parsed: list, tokens: list[str]) -> tuple[int, str, list[str]]:
+    """-> (section, row token, remaining tokens)."""
+    if tokens and tokens[0] == "ref":
+        if len(tokens) < 2:
+            raise PatchError("Path /ref membutuhkan REF_CODE.")
+        s, r = _find_ref(parsed, tokens[1])
+        return s, str(r), tokens[2:]
+    if len(tokens) < 2:
+        raise PatchError("Path harus berisi section dan baris.")
+    return _section(parsed, tokens[0]), tokens[1], tokens[2:]
+
+
+def _row(tbl: list, token: str) -> int:
+    try:
+        r = int(token)
+    except ValueError:
+        raise PatchError(f"Baris tidak valid: {token!r}")
+    if not (0 <= r < len(tbl) - 1):
+        raise PatchError(f"Baris {token} tidak ditemukan.")
+    return r
+
+
+def _as_row(headers: list, value) -> list[str]:
+    if isinstance(value, dict):
+        row = [""] * len(headers)
+        for key, v in value.items():
+            row[_column(headers, str(key))] = "" if v is None else str(v)
+        return row
+    if isinstance(value, list):
+        row = ["" if v is None else str(v) for v in value][: len(headers)]
+        return row + [""] * (len(headers) - len(row))
+    raise PatchError("Nilai baris harus berupa list atau object.")
+
+
+def _used_refs(parsed: list) -> set[str]:
+    used = set()
+    for sec in parsed:
+        tbl = sec.get("table") if isinstance(sec, dict) else None
+        if tbl and "REF_CODE" in tbl[0]:
+            ref_i = tbl[0].index("REF_CODE")
+            used.update(str(row[ref_i]) for row in tbl[1:] if ref_i < len(row))
+    return used
+
+
+def apply_ops(parsed: list, ops) -> tuple[list[dict], set[int]]:
+    """
+    Apply `ops` to `parsed` in place. Returns (changes, touched section
+    indexes). Changes are {"op", "section", "row"[, "column", "value"]}
+    with `value` the new cell (replace) or the full new row (add).
+    """
+    if not isinstance(ops, list) or not ops:
+        raise PatchError("ops harus berupa list yang tidak kosong.")
+
+    changes: list[dict] = []
+    touched: set[int] = set()
+    for op in ops:
+        if not isinstance(op, dict):
+            raise PatchError("Setiap op harus berupa object.")
+        kind = op.get("op")
+        s, row_token, rest = _resolve(parsed, _split(op.get("path")))
+        tbl = parsed[s]["table"]
+        headers = tbl[0]
+
+        if kind in ("replace", "test"):
+            r = _row(tbl, row_token)
+            if len(rest) != 1:
+                raise PatchError(f"Path {op.get('path')} harus menunjuk ke satu sel.")
+            c = _column(headers, rest[0])
+            row = tbl[r + 1]
+            while len(row) < len(headers):
+                row.append("")
+            value = "" if op.get("value") is None else str(op.get("value"))
+            if kind == "test":
+                if str(row[c]) != value:
+                    raise PatchError(f"Test gagal pada {op.get('path')}.")
+                continue
+            if str(row[c]) == value:
+                continue
+            row[c] = value
+            changes.append({"op": "replace", "section": s, "row": r, "column": headers[c], "value": value})
+
+        elif kind == "add":
+            if rest:
+                raise PatchError("add hanya untuk baris utuh.")
+            r = len(tbl) - 1 if row_token == "-" else int(row_token) if row_token.isdigit() else -1
+            if not (0 <= r <= len(tbl) - 1):
+                raise PatchError(f"Baris {row_token} tidak valid untuk add.")
+            row = _as_row(headers, op.get("value"))
+            if "REF_CODE" in headers:
+                ref_i = headers.index("REF_CODE")
+                if not row[ref_i].strip():
+                    row[ref_i] = generate_unique_item_ref_code(_used_refs(parsed))
+            tbl.insert(r + 1, row)
+            changes.append({"op": "add", "section": s, "row": r, "value": row})
+
+        elif kind == "remove":
+            if rest:
+                raise PatchError("remove hanya untuk baris utuh.")
+            r = _row(tbl, row_token)
+            del tbl[r + 1]
+            changes.append({"op": "remove", "section": s, "row": r})
+
+        else:
+            raise PatchError(f"Op tidak didukung: {kind!r}")
+
+        touched.add(s)
+    return changes, touched
@@ -0,0 +1,430 @@
+# backend/documents/rekap.py
+"""
+Rekap (recap) definitions and the row extraction behind them.
+
+Rows of paid + archived documents are classified once, when the document is
+saved, into RekapEntry facts (see Document.sync_rekap); rekap_view only runs
+an indexed range query over those. One compiled matcher classifies a row into
+every configured rekap at once, so adding rekap types does not add scans.
+
+The derived columns (tanggal masuk, liter, short keterangan) are parsed for a
+whole batch of rows at once: repeated KETERANGAN strings are parsed once, and
+large batches go through pandas `str.extract` / `str.replace` (see
+`parse_keterangan_batch`, benchmarked by `manage.py bench_rekap_parse`). The
+gain comes from parsing each distinct string once (memoization), not from
+pandas: with every string distinct the batch is no faster than per-row.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from .utils import parse_idr
+
+# --- Rekap configuration ----------------------------------------------------
+REKAP_CONFIG = {
+    "bbm": {
+        "label": "Rekap BBM",
+        # keywords in KETERANGAN / vendor text (lowercased comparisons)
+        "keywords": [
+            "po pembayaran solar",
+            "pembayaran solar",
+            "bbm",
+        ],
+        "doc_types": ["tagihan_pekerjaan"],  # QLOLA transaksi
+    },
+}
+
+
+_ID_MONTHS = {
+    1: "Januari",
+    2: "Februari",
+    3: "Maret",
+    4: "April",
+    5: "Mei",
+    6: "Juni",
+    7: "Juli",
+    8: "Agustus",
+    9: "September",
+    10: "Oktober",
+    11: "November",
+    12: "Desember",
+}
+
+
+def format_date_long_id(d):
+    """Format date/datetime as '7 Januari 2026'. Returns '-' for None."""
+    if not d:
+        return "-"
+    if isinstance(d, datetime):
+        d = d.date()
+    if isinstance(d, str):
+        # best-effort: accept ISO strings
+        try:
+            d = datetime.fromisoformat(d).date()
+        except Exception:
+            return d
+    try:
+        return f"{d.day} {_ID_MONTHS.get(d.month, str(d.month))} {d.year}"
+    except Exception:
+        return str(d)
+
+
+_MONTH_NAME_MAP = {
+    "jan": 1,
+    "januari": 1,
+    "feb": 2,
+    "februari": 2,
+    "mar": 3,
+    "maret": 3,
+    "apr": 4,
+    "april": 4,
+    "mei": 5,
+    "jun": 6,
+    "juni": 6,
+    "jul": 7,
+    "juli": 7,
+    "agu": 8,
+    "agustus": 8,
+    "sep": 9,
+    "september": 9,
+    "okt": 10,
+    "oktober": 10,
+    "nov": 11,
+    "november": 11,
+    "des": 12,
+    "desember": 12,
+}
+
+
+# Precompiled keterangan patterns (shared by the per-row and batch parsers).
+_DMY_RE = re.compile(r"(\d{1,2})[\/\-.](\d{1,2})[\/\-.](\d{2,4})")  # dd/mm/yyyy, dd-mm-yy, ...
+_D_MONTH_Y_RE = re.compile(r"(\d{1,2})\s*([A-Za-z]{3,10})\s*(\d{2,4})")  # 12 Oktober 2026
+_LITER_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:l|liter|ltr)\b")  # 200 l, 1.000 liter (lowercased)
+_WS_RE = re.compile(r"\s+")
+_SOLAR_RE = re.compile(r"(?i)\b(po\s*)?pembayaran\s+solar\b")
+
+KETERANGAN_MAX_LEN = 90
+# Below this many distinct strings the per-row parser beats pandas' fixed
+# overhead (single-document saves); above it the two are about even.
+BATCH_VECTORIZE_MIN = 256
+
+
+def parse_tanggal_masuk(text: str | None):
+    """Best-effort extract a date from a BBM 'keterangan' string."""
+    s = (text or "").strip()
+    if not s:
+        return None
+
+    # dd/mm/yyyy or dd-mm-yy etc
+    for m in _DMY_RE.finditer(s):
+        dd, mm, yy = m.group(1), m.group(2), m.group(3)
+        try:
+            d = int(dd)
+            mo = int(mm)
+            y = int(yy)
+            if y < 100:
+                y += 2000
+            return date(y, mo, d)
+        except Exception:
+            continue
+
+    # dd <monthname> yyyy (Indonesian)
+    m2 = _D_MONTH_Y_RE.search(s)
+    if m2:
+        try:
+            d = int(m2.group(1))
+            mon_raw = m2.group(2).lower()
+            y = int(m2.group(3))
+            if y < 100:
+                y += 2000
+            mo = _MONTH_NAME_MAP.get(mon_raw)
+            if mo:
+                return date(y, mo, d)
+        except Exception:
+            pass
+
+    return None
+
+
+def parse_liter(text: str | None) -> int:
+    """Best-effort extract liters from keterangan, returns int (0 if not found)."""
+    s = (text or "").lower()
+    if not s:
+        return 0
+
+    # e.g. "200 l", "200 liter", "200ltr", "1.000 L"
+    m = _LITER_RE.search(s)
+    if not m:
+        return 0
+    return _liter_from_number(m.group(1))
+
+
+def _liter_from_number(raw: str) -> int:
+    # Normalize Indonesian numeric formatting
+    # If "1.000" (thousands) and no comma, treat dots as thousands separators.
+    if raw.count(".") >= 1 and raw.count(",") == 0:
+        parts = raw.split(".")
+        if all(len(p) == 3 for p in parts[1:]):
+            raw = "".join(parts)
+
+    # If "1.234,5" -> "1234.5"
+    if raw.count(",") == 1 and raw.count(".") >= 1:
+        raw = raw.replace(".", "").replace(",", ".")
+    elif raw.count(",") == 1 and raw.count(".") == 0:
+        raw = raw.replace(",", ".")
+
+    try:
+        return int(round(float(raw)))
+    except Exception:
+        return 0
+
+
+def shorten_keterangan_bbm(text: str | None, max_len: int = KETERANGAN_MAX_LEN) -> str:
+    """Compact whitespace + shorten for recap display."""
+    s = _WS_RE.sub(" ", (text or "")).strip()
+    if not s:
+        return ""
+    # Light normalization (don't over-destroy info)
+    s = _SOLAR_RE.sub("Pembayaran Solar", s)
+    if len(s) > max_len:
+        return s[: max_len - 3].rstrip() + "..."
+    return s
+
+
+@lru_cache(maxsize=4096)
+def parse_keterangan(text: str) -> tuple:
+    """(tanggal_masuk, liters, short keterangan) for one KETERANGAN, memoized."""
+    return parse_tanggal_masuk(text), parse_liter(text), shorten_keterangan_bbm(text)
+
+
+def _full_year(year: pd.Series) -> pd.Series:
+    """Two-digit years are 20yy, as in `parse_tanggal_masuk`."""
+    return year.where(year >= 100, year + 2000)
+
+
+def _dates_from_parts(day, month, year) -> pd.Series:
+    """Vectorized date(year, month, day); NaT where the parts are not a valid date."""
+    return pd.to_datetime(
+        pd.DataFrame({"year": year, "month": month, "day": day}), errors="coerce"
+    )
+
+
+def _parse_keterangan_frame(texts: list[str]) -> list[tuple]:
+    """
+    `parse_keterangan` over distinct strings with pandas string ops; dates the
+    frame cannot represent exactly fall back to `parse_tanggal_masuk`, so the
+    results match the per-row parser.
+    """
+    s = pd.Series(texts, dtype=object)
+
+    # Short keterangan
+    short = (
+        s.str.replace(_WS_RE, " ", regex=True)
+        .str.strip()
+        .str.replace(_SOLAR_RE, "Pembayaran Solar", regex=True)
+    )
+    too_long = short.str.len() > KETERANGAN_MAX_LEN
+    short[too_long] = short[too_long].str[: KETERANGAN_MAX_LEN - 3].str.rstrip() + "..."
+
+    # Liters: extract the number once, normalize each distinct number once
+    raw_liters = s.str.lower().str.extract(_LITER_RE)[0]
+    liter_of = {raw: _liter_from_number(raw) for raw in raw_liters.dropna().unique()}
+    liters = raw_liters.map(liter_of).fillna(0).astype(int)
+
+    # Tanggal masuk: first dd/mm/yyyy, else dd <bulan> yyyy
+    dmy = s.str.extract(_DMY_RE)
+    has_dmy = dmy[0].notna()
+    tanggal = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    years = pd.Series(-1, index=s.index)  # -1: no date pattern
+    if has_dmy.any():
+        parts = dmy[has_dmy].astype(int)
+        years[has_dmy] = _full_year(parts[2])
+        tanggal[has_dmy] = _dates_from_parts(parts[0], parts[1], years[has_dmy])
+    named = s[~has_dmy].str.extract(_D_MONTH_Y_RE)
+    named = named[named[0].notna()]
+    if len(named):
+        years[named.index] = _full_year(named[2].astype(int))
+        month = named[1].str.lower().map(_MONTH_NAME_MAP)
+        named = named[month.notna()]
+        if len(named):
+            tanggal[named.index] = _dates_from_parts(
+                named[0].astype(int), month[named.index].astype(int), years[named.index]
+            )
+    tanggal_masuk = [None if pd.isna(t) else t.date() for t in tanggal]
+
+    # pandas assembles the parts as a %Y%m%d number, so it only agrees with
+    # date() for four-digit years (year 213 comes back as 2130), and NaT hides
+    # both invalid dates (the per-row parser moves on to the next match) and
+    # years outside its range. Those rows go through the per-row parser.
+    for i, year in enumerate(years.tolist()):
+        if year >= 0 and (not 1000 <= year <= 9999 or tanggal_masuk[i] is None):
+            tanggal_masuk[i] = parse_tanggal_masuk(texts[i])
+    return list(zip(tanggal_masuk, liters.tolist(), short.tolist()))
+
+
+def parse_keterangan_batch(texts) -> tuple[list, list[int], list[str]]:
+    """
+    Parse a column of KETERANGAN strings -> (tanggal_masuk, liters, short),
+    three lists aligned with `texts`. Each distinct string is parsed once.
+    """
+    texts = [str(t or "") for t in texts]
+    unique = list(dict.fromkeys(texts))
+    if len(unique) >= BATCH_VECTORIZE_MIN:
+        parsed = dict(zip(unique, _parse_keterangan_frame(unique)))
+    else:
+        parsed = {t: parse_keterangan(t) for t in unique}
+    rows = [parsed[t] for t in texts]
+    return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+
+class KeywordMatcher:
+    """
+    All rekap keywords compiled into one regex, so a row is classified into
+    every matching rekap in a single scan regardless of how many rekaps exist.
+
+    The alternation sits inside a lookahead, so a match is tried at every
+    position without consuming text (overlapping keywords are all found).
+    Longest keywords come first, and each keyword also implies every other
+    keyword contained in it; that covers the shorter keywords that share a
+    start position with a longer match.
+    """
+
+    def __init__(self, keywords: dict[str, set[str]]):
+        # keywords: lowercase keyword -> rekap keys it belongs to
+        ordered = sorted(keywords, key=len, reverse=True)
+        self._keys_for: dict[str, frozenset[str]] = {}
+        for kw in ordered:
+            keys = set()
+            for other in ordered:
+                if other in kw:
+                    keys |= keywords[other]
+            self._keys_for[kw] = frozenset(keys)
+        alternation = "|".join(re.escape(kw) for kw in ordered)
+        self._regex = re.compile(f"(?=({alternation}))") if ordered else None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "KeywordMatcher":
+        keywords: dict[str, set[str]] = {}
+        for key, conf in config.items():
+            for kw in conf["keywords"]:
+                kw = kw.lower()
+                if kw:
+                    keywords.setdefault(kw, set()).add(key)
+        return cls(keywords)
+
+    def classify(self, text: str) -> set[str]:
+        """Rekap keys whose keywords occur in `text` (compared lowercased)."""
+        found: set[str] = set()
+        if self._regex is None:
+            return found
+        for m in self._regex.finditer(text.lower()):
+            found |= self._keys_for[m.group(1)]
+        return found
+
+
+MATCHER = KeywordMatcher.from_config(REKAP_CONFIG)
+
+
+REKAP_COLUMNS = [
+    "Tanggal Pembayaran",
+    "Tanggal Masuk",
+    "Kode Dokumen",
+    "Keterangan",
+    "Dibayar ke",
+    "Jumlah Liter",
+    "Nominal",
+]
+
+
+def rekap_keys_for(doc_type: str) -> list[str]:
+    return [key for key, conf in REKAP_CONFIG.items() if doc_type in conf["doc_types"]]
+
+
+def _matched_rows(doc_type: str, parsed_json):
+    """(matching rekap keys, row dict with the raw keterangan) per classified row."""
+    keys = rekap_keys_for(doc_type)
+    if not keys:
+        return
+
+    for s_idx, sec in enumerate(parsed_json or []):
+        if not isinstance(sec, dict):
+            continue
+        tbl = sec.get("table") or []
+        if not tbl or len(tbl) < 2:
+            continue
+
+        header = [str(h or "") for h in tbl[0]]
+        header_lower = [h.strip().lower() for h in header]
+
+        try:
+            k_idx = header_lower.index("keterangan")
+        except ValueError:
+            # Without KETERANGAN we can't classify, skip this section
+            continue
+
+        ref_idx = header.index("REF_CODE") if "REF_CODE" in header else None
+        dby_idx = header_lower.index("dibayar ke") if "dibayar ke" in header_lower else None
+        bank_idx = header_lower.index("bank") if "bank" in header_lower else None
+        ship_idx = header_lower.index("pengiriman") if "pengiriman" in header_lower else None
+
+        def cell(row, idx):
+            return str(row[idx] or "") if idx is not None and idx < len(row) else ""
+
+        for r_idx, row in enumerate(tbl[1:]):
+            # skip rows that are completely empty
+            if not any(str(c or "").strip() for c in row):
+                continue
+
+            keterangan = cell(row, k_idx)
+            dibayar_ke = cell(row, dby_idx)
+            found = MATCHER.classify(" ".join([keterangan, dibayar_ke, cell(row, bank_idx)]))
+            matched = [key for key in keys if key in found]
+            if not matched:
+                continue
+
+            yield matched, {
+                "section_index": s_idx,
+                "row_index": r_idx,
+                "ref_code": cell(row, ref_idx),
+                "keterangan": keterangan,
+                "dibayar_ke": dibayar_ke,
+                "nominal": parse_idr(cell(row, ship_idx)),
+            }
+
+
+def iter_rekap_rows_many(documents):
+    """
+    `documents` is an iterable of (tag, doc_type, parsed_json). Yields
+    (tag, row) for every classified row, with the keterangan-derived columns
+    of all documents parsed in one `parse_keterangan_batch` call.
+    """
+    pending = [
+        (tag, keys, base)
+        for tag, doc_type, parsed_json in documents
+        for keys, base in _matched_rows(doc_type, parsed_json)
+    ]
+    if not pending:
+        return
+    tanggal, liters, short = parse_keterangan_batch(base["keterangan"] for _, _, base in pending)
+    for i, (tag, keys, base) in enumerate(pending):
+        row = {
+            **base,
+            "keterangan": short[i] or base["keterangan"],
+            "tanggal_masuk": tanggal[i],
+            "liters": liters[i],
+        }
+        for key in keys:
+            yield tag, {"rekap_key": key, **row}
+
+
+def iter_rekap_rows(doc_type: str, parsed_json):
+    """
+    Yield one dict per (rekap key, matching row) of a document's parsed tables:
+    rekap_key, section_index, row_index, ref_code, keterangan (shortened),
+    dibayar_ke, tanggal_masuk, liters, nominal.
+    """
+    for _, row in iter_rekap_rows_many([(None, doc_type, parsed_json)]):
+        yield row
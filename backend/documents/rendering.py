@@ -0,0 +1,281 @@
+# backend/documents/rendering.py
+"""
+Shared preview rendering for supporting documents / payment proofs.
+
+Rasterizing a PDF page with fitz and encoding WEBP (method=6) is CPU-heavy, so
+request threads hand the work to a small process pool and just wait on a
+future. Identical renders that are already in flight share one future
+(single-flight), and once the queue is full new work is refused with
+`RenderBusy` so the view can answer 503 + Retry-After instead of tying up every
+gunicorn worker.
+
+Everything that runs inside the pool is plain fitz/Pillow (no ORM), so the
+module is safe to import in spawned worker processes and can be reused
+synchronously from ingestion and stamping.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+from django.conf import settings
+from django.core.files import File
+
+logger = logging.getLogger(__name__)
+
+WEBP_QUALITY = 78
+JPEG_QUALITY = 80
+
+
+class RenderBusy(Exception):
+    """Raised when the render queue is full (or a render timed out)."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Preview renderer busy; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# ---------------------------------------------------------------------------
+# Pure helpers (run in the pool, or inline from ingestion/stamping)
+# ---------------------------------------------------------------------------
+
+def fit_width(img: Image.Image, width: int | None) -> Image.Image:
+    """Downscale to `width` (keeps aspect ratio). Never upscales."""
+    if width and img.width > width:
+        h = max(1, int(img.height * (width / float(img.width))))
+        img = img.resize((width, h), Image.LANCZOS)
+    return img
+
+
+def open_image(path: str) -> Image.Image:
+    img = Image.open(path)
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    return img
+
+
+def rasterize_page(pdf: fitz.Document, page_index: int, width: int) -> Image.Image:
+    """One page of an open PDF as a Pillow image ~`width` px wide."""
+    page = pdf.load_page(page_index)
+    zoom = width / max(1.0, float(page.rect.width))
+    zoom = max(0.2, min(6.0, zoom))
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+
+def rasterize_first_page(path: str, width: int) -> Image.Image:
+    """First page of a PDF (or the image itself) as a Pillow image ~`width` px wide."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext != ".pdf":
+        return fit_width(open_image(path), width)
+
+    pdf = fitz.open(path)
+    try:
+        return rasterize_page(pdf, 0, width)
+    finally:
+        pdf.close()
+
+
+def encode_image(img: Image.Image, fmt: str) -> tuple[bytes, str]:
+    """Encode to WEBP (falls back to JPEG) or JPEG. Returns (bytes, content_type)."""
+    buf = io.BytesIO()
+    if fmt == "webp":
+        try:
+            img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=6)
+            return buf.getvalue(), "image/webp"
+        except Exception:
+            buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+# ---------------------------------------------------------------------------
+# Approval stamp ("DISETUJUI" + timestamp), shared by file stamping and the
+# render-time overlay
+# ---------------------------------------------------------------------------
+
+STAMP_TEXT = "DISETUJUI"
+STAMP_COLOR_IMG = (0, 160, 0)  # RGB for Pillow
+STAMP_COLOR_PDF = (0, 0.62, 0)  # RGB floats 0..1 for PyMuPDF
+
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONT_REG = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+def draw_stamp(img: Image.Image, dt_str: str) -> Image.Image:
+    """Draw the approval stamp top-left on an RGB copy of `img`."""
+    im = img.convert("RGB")
+    draw = ImageDraw.Draw(im)
+
+    # scale font sizes with image width
+    big = max(24, int(im.width * 0.06))
+    small = max(14, int(big * 0.45))
+
+    try:
+        f_big = ImageFont.truetype(FONT_BOLD, big)
+        f_small = ImageFont.truetype(FONT_REG, small)
+    except Exception:
+        f_big = ImageFont.load_default()
+        f_small = ImageFont.load_default()
+
+    x = max(12, im.width // 80)
+    y = x
+
+    draw.text((x, y), STAMP_TEXT, fill=STAMP_COLOR_IMG, font=f_big)
+    draw.text((x, y + big + (x // 2)), dt_str, fill=STAMP_COLOR_IMG, font=f_small)
+    return im
+
+
+def stamp_pdf_pages(pdf: fitz.Document, dt_str: str):
+    """Insert the approval stamp on every page of an open PDF."""
+    for page in pdf:
+        w = float(page.rect.width)
+        fs_big = max(18.0, w * 0.05)  # roughly scales with page size
+        fs_small = max(10.0, fs_big * 0.45)
+
+        x = 36
+        y = 36
+        page.insert_text((x, y), STAMP_TEXT, fontsize=fs_big, color=STAMP_COLOR_PDF)
+        page.insert_text((x, y + fs_big + 2), dt_str, fontsize=fs_small, color=STAMP_COLOR_PDF)
+
+
+def write_stamped_copy(src: str, dst: str, dt_str: str):
+    """Write a stamped copy of a PDF/PNG/JPEG `src` to `dst` (src untouched)."""
+    ext = os.path.splitext(src)[1].lower()
+    if ext == ".pdf":
+        pdf = fitz.open(src)
+        try:
+            stamp_pdf_pages(pdf, dt_str)
+            pdf.save(dst, deflate=True)
+        finally:
+            pdf.close()
+        return
+    im = draw_stamp(open_image(src), dt_str)
+    if ext == ".png":
+        im.save(dst, format="PNG", optimize=True)
+    else:
+        im.save(dst, format="JPEG", quality=92, optimize=True)
+
+
+def render_preview_bytes(path: str, width: int, fmt: str, stamp: str | None = None) -> tuple[bytes, str]:
+    """Pool entry point: rasterize (+ optional stamp overlay) + encode in one go."""
+    img = rasterize_first_page(path, width)
+    if stamp:
+        img = draw_stamp(img, stamp)
+    return encode_image(img, fmt)
+
+
+def encode_preview_file(image_path: str, stem: str, max_w: int = 1200):
+    """
+    Encode a stored preview image (prefer WEBP, fallback JPEG).
+    Returns: (django.core.files.File, ext)
+    """
+    img = fit_width(open_image(image_path), max_w)
+    data, content_type = encode_image(img, "webp")
+    ext = ".webp" if content_type == "image/webp" else ".jpg"
+    return File(io.BytesIO(data), name=f"{stem}{ext}"), ext
+
+
+def preview_file_from_source(path: str, stem: str, max_w: int = 1200):
+    """Like encode_preview_file, but straight from the source PDF/image."""
+    img = rasterize_first_page(path, max_w)
+    data, content_type = encode_image(img, "webp")
+    ext = ".webp" if content_type == "image/webp" else ".jpg"
+    return File(io.BytesIO(data), name=f"{stem}{ext}"), ext
+
+
+def image_width(path: str) -> int:
+    """Pixel width from the image header (does not decode the pixels)."""
+    with Image.open(path) as img:
+        return int(img.width)
+
+
+# ---------------------------------------------------------------------------
+# Process pool + single-flight + admission control
+# ---------------------------------------------------------------------------
+
+_lock = threading.RLock()  # done-callbacks may fire inside the lock
+_executor: ProcessPoolExecutor | None = None
+_executor_pid: int | None = None
+_inflight: dict[tuple, "object"] = {}
+
+
+def _conf(name: str, default):
+    return getattr(settings, name, default)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # Caller holds _lock. Recreate after fork (gunicorn --preload) or breakage.
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        ctx = multiprocessing.get_context(_conf("PREVIEW_RENDER_MP_CONTEXT", "spawn"))
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, int(_conf("PREVIEW_RENDER_WORKERS", 2))),
+            mp_context=ctx,
+        )
+        _executor_pid = os.getpid()
+        _inflight.clear()
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _inflight.clear()
+
+
+def render_preview(
+    path: str,
+    width: int,
+    fmt: str,
+    *,
+    stamp: str | None = None,
+    timeout: float | None = None,
+) -> tuple[bytes, str]:
+    """
+    Render `path` to preview bytes via the shared pool (`stamp` = overlay text).
+
+    Raises RenderBusy when the queue is full or the render does not finish in
+    time (the render keeps running and later identical requests join it).
+    """
+    if int(_conf("PREVIEW_RENDER_WORKERS", 2)) <= 0:
+        return render_preview_bytes(path, width, fmt, stamp)
+
+    retry_after = int(_conf("PREVIEW_RENDER_RETRY_AFTER", 2))
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size, width, fmt, stamp)
+
+    with _lock:
+        fut = _inflight.get(key)
+        if fut is None:
+            if len(_inflight) >= int(_conf("PREVIEW_RENDER_QUEUE_MAX", 16)):
+                raise RenderBusy(retry_after)
+            fut = _get_executor().submit(render_preview_bytes, path, width, fmt, stamp)
+            _inflight[key] = fut
+            fut.add_done_callback(lambda _f, k=key: _forget(k, _f))
+
+    try:
+        return fut.result(timeout=timeout or float(_conf("PREVIEW_RENDER_TIMEOUT", 20)))
+    except FutureTimeout:
+        raise RenderBusy(retry_after)
+    except BrokenProcessPool:
+        logger.warning("preview render pool broke; recreating")
+        _reset_executor()
+        raise RenderBusy(retry_after)
+
+
+def _forget(key, fut):
+    with _lock:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
@@ -1,6 +1,8 @@
 """backend/documents/serializers.py – updated to surface SupportingDocument.identifier
 """
 
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
 
 from .models import Document, SupportingDocument, UserSettings, PaymentProof
@@ -19,23 +21,45 @@ class DocumentSerializer(serializers.ModelSerializer):
             "finished_draft_at",
             "paid_at",
             "archived_at",
+            "table_pages",
         )
 
 
+class DocumentListSerializer(DocumentSerializer):
+    """List payload: everything but parsed_json (use row_count / grand_total)."""
+
+    class Meta(DocumentSerializer.Meta):
+        fields = None
+        exclude = ("parsed_json",)
+
+
 class SupportingDocumentSerializer(serializers.ModelSerializer):
     # Expose concatenated identifier (read‑only)
     identifier = serializers.CharField(read_only=True)
     # Force URL serialization for files/images
     file = serializers.FileField(use_url=True)
     preview_image = serializers.ImageField(use_url=True, allow_null=True, required=False)
+    # Only when the approval stamp is composited at download time
+    # (STAMP_MODE=overlay); otherwise `file` is served by Nginx directly.
+    download_url = serializers.SerializerMethodField()
+
+    def get_download_url(self, obj):
+        if settings.STAMP_MODE != "overlay":
+            return None
+        if obj.status != "disetujui" or not obj.approved_at or obj.stamped_at:
+            return None
+        url = reverse("sdoc_download", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
 
     class Meta:
         model = SupportingDocument
-        fields = "__all__"
+        exclude = ("content_text",)  # search only; can be large
         read_only_fields = (
             "supporting_doc_sequence",
             "identifier",
             "approved_at",
+            "stamped_at",
             "created_at",
             "ai_auto_attached",
             "ai_confidence",
@@ -0,0 +1,234 @@
+# backend/documents/streaming.py
+"""
+Constant-memory streaming writers for StreamingHttpResponse bodies.
+
+`iter_zip` writes a ZIP archive into a write-only sink and yields the bytes as
+soon as they are produced, so neither the archive nor its members are ever
+held in memory (or spooled to disk) as a whole. `iter_csv` and `iter_xlsx`
+stream tabular exports row by row (XLSX is a ZIP of XML parts built on
+`iter_zip`, with inline strings so no shared-string table is kept).
+"""
+
+import csv
+import io
+import os
+import re
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+CHUNK_SIZE = 64 * 1024
+
+# Already-compressed payloads: deflating them again only burns CPU.
+STORED_EXTS = {".pdf", ".png", ".jpg", ".jpeg", ".webp", ".zip", ".docx", ".xlsx"}
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable write-only buffer; zipfile falls back to data descriptors."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zipinfo(arcname: str, size: int | None = None) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    ext = os.path.splitext(arcname)[1].lower()
+    info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTS else zipfile.ZIP_DEFLATED
+    if size is not None:
+        info.file_size = size
+    return info
+
+
+def iter_zip(entries, chunk_size: int = CHUNK_SIZE):
+    """
+    Stream a ZIP archive.
+
+    `entries` is any (lazy) iterable of (arcname, source) where source is a
+    filesystem path, bytes, or an iterable of byte chunks. Paths are copied in
+    `chunk_size` pieces.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for arcname, source in entries:
+            if isinstance(source, (bytes, bytearray)):
+                zf.writestr(_zipinfo(arcname, len(source)), bytes(source))
+                yield from _flush(sink)
+                continue
+
+            if not isinstance(source, (str, os.PathLike)):
+                # Iterable of byte chunks of unknown total size.
+                with zf.open(_zipinfo(arcname), mode="w", force_zip64=True) as dst:
+                    for chunk in source:
+                        dst.write(chunk)
+                        yield from _flush(sink)
+                yield from _flush(sink)
+                continue
+
+            with open(source, "rb") as src:
+                info = _zipinfo(arcname, os.fstat(src.fileno()).st_size)
+                with zf.open(info, mode="w") as dst:
+                    while True:
+                        chunk = src.read(chunk_size)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        yield from _flush(sink)
+            yield from _flush(sink)
+    # Central directory is written on close.
+    yield from _flush(sink)
+
+
+def _flush(sink: _Sink):
+    data = sink.drain()
+    if data:
+        yield data
+
+
+# ---------------------------------------------------------------------------
+# Tabular exports
+# ---------------------------------------------------------------------------
+
+class _Echo:
+    """csv.writer target that hands each formatted line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    """Stream CSV (UTF-8 with BOM so Excel detects the encoding)."""
+    writer = csv.writer(_Echo())
+    yield ("\ufeff" + writer.writerow(header)).encode("utf-8")
+    for row in rows:
+        yield writer.writerow(row).encode("utf-8")
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    "</Relationships>"
+)
+# Style 0: default, 1: bold header, 2: integer with thousands separator.
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="3" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    "</cellXfs></styleSheet>"
+)
+
+# Characters not allowed in XML 1.0 (control chars from OCR / GPT output).
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _col_letter(idx: int) -> str:
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _xlsx_row(r: int, values, cols: list[str], header: bool = False) -> str:
+    cells = []
+    for col, value in zip(cols, values):
+        ref = f"{col}{r}"
+        if value is None or value == "":
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or header:
+            text = escape(_XML_ILLEGAL.sub("", str(value)))
+            style = ' s="1"' if header else ""
+            cells.append(f'<c r="{ref}" t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>')
+        else:
+            cells.append(f'<c r="{ref}" s="2"><v>{value}</v></c>')
+    return f'<row r="{r}">{"".join(cells)}</row>'
+
+
+def _iter_sheet(header, rows, rows_per_chunk: int = 200):
+    cols = [_col_letter(i) for i in range(len(header))]
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        "<sheetData>" + _xlsx_row(1, header, cols, header=True)
+    ).encode("utf-8")
+    buf = []
+    for r, row in enumerate(rows, start=2):
+        buf.append(_xlsx_row(r, row, cols))
+        if len(buf) >= rows_per_chunk:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+    buf.append("</sheetData></worksheet>")
+    yield "".join(buf).encode("utf-8")
+
+
+def iter_xlsx(header, rows, sheet_name: str = "Sheet1"):
+    """
+    Stream a single-sheet XLSX workbook. Numbers become numeric cells (with a
+    thousands format), everything else inline strings.
+    """
+    sheet_name = escape(re.sub(r"[\[\]:*?/\\]", " ", sheet_name)[:31] or "Sheet1")
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+    entries = [
+        ("[Content_Types].xml", _XLSX_CONTENT_TYPES.encode("utf-8")),
+        ("_rels/.rels", _XLSX_ROOT_RELS.encode("utf-8")),
+        ("xl/workbook.xml", workbook.encode("utf-8")),
+        ("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS.encode("utf-8")),
+        ("xl/styles.xml", _XLSX_STYLES.encode("utf-8")),
+        ("xl/worksheets/sheet1.xml", _iter_sheet(header, rows)),
+    ]
+    return iter_zip(entries)
@@ -1,3 +1,550 @@
-from django.test import TestCase
+import copy
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import fitz
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Document, DocumentCodeCounter, ParsedItem, PaymentProof, SupportingDocument
+from .parsed_patch import PatchError, apply_ops
+from .rekap import _parse_keterangan_frame, parse_keterangan
+from .serializers import PaymentProofSerializer
+from .utils import parse_idr, recalc_totals
+from .views import _is_packet_of, _packet_path
+
+
+class DocumentBundleTests(TestCase):
+    """GET /api/documents/<id>/bundle/ costs the same queries for any attachment count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bundle", "bundle@example.com", "pw")
+        header = ["No", "KETERANGAN", "DIBAYAR KE", "BANK", "PENGIRIMAN", "REF_CODE"]
+        cls.doc = Document.objects.create(
+            title="Bundle",
+            company="ttu",
+            doc_type="tagihan_pekerjaan",
+            parsed_json=[{"company": "PT. A", "table": [header, ["1", "Servis truk", "CV Maju", "BCA", "1.000", "REF00000"]]}],
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_attachments(self, n):
+        start = SupportingDocument.objects.filter(main_document=self.doc).count()
+        for i in range(start, start + n):
+            SupportingDocument.objects.create(
+                main_document=self.doc,
+                item_ref_code=f"REF{i:05d}",
+                section_index=0,
+                row_index=i,
+                file=f"supporting_docs/s{i}.pdf",
+                content_text="not in the payload",
+            )
+            PaymentProof.objects.create(
+                main_document=self.doc,
+                section_index=0,
+                item_index=i,
+                file=f"payment_proofs/p{i}.pdf",
+            )
+
+    def _get_bundle(self, queries):
+        # document + supporting docs + payment proofs + duplicate lookup (2)
+        with self.assertNumQueries(queries):
+            resp = self.client.get(f"/api/documents/{self.doc.pk}/bundle/")
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_constant_query_count(self):
+        self._add_attachments(1)
+        data = self._get_bundle(5)
+        self.assertEqual(data["document"]["id"], self.doc.pk)
+        self.assertEqual(len(data["supporting_docs"]), 1)
+        self.assertEqual(len(data["payment_proofs"]), 1)
+        self.assertNotIn("content_text", data["supporting_docs"][0])
+        self.assertEqual(data["duplicates"], [])
+
+        self._add_attachments(10)
+        data = self._get_bundle(5)
+        self.assertEqual(len(data["supporting_docs"]), 11)
+        self.assertEqual(len(data["payment_proofs"]), 11)
+
+    def test_flags_duplicate_rows(self):
+        Document.objects.create(
+            title="Paid before",
+            company="ttu",
+            doc_type="tagihan_pekerjaan",
+            status="sudah_dibayar",
+            parsed_json=self.doc.parsed_json,
+        )
+        data = self._get_bundle(5)
+        self.assertEqual(len(data["duplicates"]), 1)
+        self.assertEqual(data["duplicates"][0]["row_index"], 0)
+
+    def test_by_code(self):
+        resp = self.client.get(f"/api/documents/by-code/{self.doc.document_code}/bundle/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["document"]["id"], self.doc.pk)
+        self.assertEqual(resp.data["supporting_docs"], [])
+
+    def test_requires_auth(self):
+        resp = APIClient().get(f"/api/documents/{self.doc.pk}/bundle/")
+        self.assertEqual(resp.status_code, 401)
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / 304 on the document, supporting-doc and payment-proof endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("etag", "etag@example.com", "pw")
+        cls.doc = Document.objects.create(title="ETag", company="ttu", doc_type="tagihan_pekerjaan", parsed_json=[])
+        cls.sdoc = SupportingDocument.objects.create(
+            main_document=cls.doc, item_ref_code="ETAG0001", file="supporting_docs/e.pdf"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):  # the validator (aggregate or page) only
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        return first["ETag"]
+
+    def test_document_detail(self):
+        url = f"/api/documents/{self.doc.pk}/"
+        etag = self._revalidate(url)
+        # update_fields saves still move updated_at
+        self.doc.approved_at = self.doc.created_at
+        self.doc.save(update_fields=["approved_at"])
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_document_list_page(self):
+        # The validator comes from the page itself: one query, no table-wide aggregate
+        url = "/api/documents/?page_size=1"
+        etag = self._revalidate(url)
+        self.doc.save(update_fields=["approved_at"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_document_by_code(self):
+        url = f"/api/documents/by-code/{self.doc.document_code}/"
+        etag = self._revalidate(url)
+        self.assertNotEqual(etag, self._revalidate(f"/api/documents/{self.doc.pk}/"))
+
+    def test_supporting_doc_list(self):
+        url = f"/api/supporting-docs/?main_document={self.doc.pk}"
+        etag = self._revalidate(url)
+        self.sdoc.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_payment_proof_list(self):
+        self._revalidate(f"/api/payment-proofs/?main_document={self.doc.pk}")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), STAMP_MODE="overlay", MEDIA_ACCEL_REDIRECT_PREFIX="")
+class SupportingDocDownloadTests(TestCase):
+    """/api/sdoc/<id>/download: login required, listed only when an overlay stamp is due."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("sdl", "sdl@example.com", "pw")
+        cls.doc = Document.objects.create(title="Download", company="ttu", doc_type="tagihan_pekerjaan", parsed_json=[])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        pdf = fitz.open()
+        pdf.new_page(width=200, height=200)
+        self.sdoc = SupportingDocument.objects.create(
+            main_document=self.doc,
+            item_ref_code="DL000001",
+            file=SimpleUploadedFile("nota.pdf", pdf.tobytes(), content_type="application/pdf"),
+        )
+        pdf.close()
+        self.url = f"/api/sdoc/{self.sdoc.pk}/download"
+
+    def _approve(self):
+        self.sdoc.status = "disetujui"
+        self.sdoc.approved_at = timezone.now()
+        self.sdoc.save(update_fields=["status", "approved_at"])
+
+    def _download_url(self):
+        resp = self.client.get(f"/api/supporting-docs/{self.sdoc.pk}/")
+        self.assertEqual(resp.status_code, 200)
+        return resp.data["download_url"]
+
+    def test_requires_auth(self):
+        self._approve()
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+
+    def test_download_url_only_for_overlay(self):
+        self.assertIsNone(self._download_url())  # not approved yet
+        self._approve()
+        self.assertTrue(self._download_url().endswith(self.url))
+        with self.settings(STAMP_MODE="embed"):
+            self.assertIsNone(self._download_url())
+
+    def test_serves_stamped_copy(self):
+        self._approve()
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        body = b"".join(resp.streaming_content)
+        self.assertNotEqual(body, self.sdoc.file.read())
+        with self.settings(MEDIA_ACCEL_REDIRECT_PREFIX="/media/"):
+            resp = self.client.get(self.url)
+        self.assertRegex(resp["X-Accel-Redirect"], r"^/media/stamped/\d+-[0-9a-f]+\.pdf$")
+
+
+class ParsedJsonPatchTests(TestCase):
+    """A full parsed_json PATCH is version-checked like /cells/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("patch", "patch@example.com", "pw")
+        header = ["No", "KETERANGAN", "DIBAYAR KE", "BANK", "PENGIRIMAN"]
+        cls.doc = Document.objects.create(
+            title="Patch",
+            company="ttu",
+            doc_type="tagihan_pekerjaan",
+            parsed_json=[{"company": "PT. A", "table": [header, ["1", "Servis", "CV Maju", "BCA", "1.000"]]}],
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/documents/{self.doc.pk}/"
+
+    def test_requires_current_version(self):
+        parsed = self.client.get(self.url).data["parsed_json"]
+        self.assertEqual(self.client.patch(self.url, {"parsed_json": parsed}, format="json").status_code, 400)
+        stale = self.client.patch(self.url, {"parsed_json": parsed, "version": 7}, format="json")
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.data["version"], 0)
+
+        resp = self.client.patch(self.url, {"parsed_json": parsed[:1], "version": 0}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["parsed_version"], 1)
+
+
+HEADER = ["No", "KETERANGAN", "DIBAYAR KE", "BANK", "PENGIRIMAN", "REF_CODE"]
+
+
+def _table(*rows):
+    return [{"company": "PT. A", "table": [list(HEADER), *[list(r) for r in rows]]}]
+
+
+class ApplyOpsTests(SimpleTestCase):
+    """parsed_patch.apply_ops on a bare parsed_json list."""
+
+    def test_add_and_remove_rows(self):
+        parsed = _table(["1", "Servis", "CV Maju", "BCA", "1.000", "REF00001"])
+        changes, touched = apply_ops(parsed, [
+            {"op": "add", "path": "/0/-", "value": {"KETERANGAN": "Ban", "PENGIRIMAN": "2.000"}},
+            {"op": "add", "path": "/0/0", "value": ["0", "Oli", "", "", "500", "REF00000"]},
+        ])
+        self.assertEqual(touched, {0})
+        rows = parsed[0]["table"][1:]
+        self.assertEqual([r[1] for r in rows], ["Oli", "Servis", "Ban"])
+        self.assertTrue(rows[2][5])  # REF_CODE generated for the appended row
+        self.assertEqual([c["op"] for c in changes], ["add", "add"])
+
+        apply_ops(parsed, [{"op": "remove", "path": "/ref/REF00001"}])
+        self.assertEqual([r[1] for r in parsed[0]["table"][1:]], ["Oli", "Ban"])
+
+    def test_failed_test_op_and_bad_paths(self):
+        parsed = _table(["1", "Servis", "CV Maju", "BCA", "1.000", "REF00001"])
+        for ops in (
+            [{"op": "test", "path": "/0/0/KETERANGAN", "value": "Lain"}],
+            [{"op": "remove", "path": "/0/5"}],
+            [{"op": "replace", "path": "/0/0/NOPE", "value": "x"}],
+            [{"op": "remove", "path": "/1/0"}],
+        ):
+            with self.assertRaises(PatchError):
+                apply_ops(parsed, ops)
+        with self.assertRaises(PatchError):
+            apply_ops(["not a section"], [{"op": "remove", "path": "/0/0"}])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CellsEndpointTests(TestCase):
+    """PATCH /api/documents/<id>/cells/ and PAY_REF writes from payment proofs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cells", "cells@example.com", "pw")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.doc = Document.objects.create(
+            title="Cells",
+            company="ttu",
+            doc_type="tagihan_pekerjaan",
+            parsed_json=_table(
+                ["1", "Servis", "CV Maju", "BCA", "1.000", "REF00001"],
+                ["2", "Ban", "CV Maju", "BCA", "2.000", "REF00002"],
+            ),
+        )
+        self.url = f"/api/documents/{self.doc.pk}/cells/"
+
+    def _cells(self, version, *ops):
+        return self.client.patch(self.url, {"version": version, "ops": list(ops)}, format="json")
+
+    def test_stale_version_conflicts(self):
+        resp = self._cells(0, {"op": "replace", "path": "/0/0/PENGIRIMAN", "value": "3.000"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["version"], 1)
+        self.assertEqual(resp.data["grand_total"], "5.000")
+
+        stale = self._cells(0, {"op": "replace", "path": "/0/1/KETERANGAN", "value": "Lost"})
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.data["version"], 1)
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.parsed_json[0]["table"][2][1], "Ban")
+
+    def test_add_and_remove_rows(self):
+        resp = self._cells(0, {"op": "add", "path": "/0/-", "value": {"KETERANGAN": "Oli", "PENGIRIMAN": "500"}})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["grand_total"], "3.500")
+        resp = self._cells(1, {"op": "remove", "path": "/ref/REF00001"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["grand_total"], "2.500")
+
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.parsed_version, 2)
+        self.assertEqual(
+            list(self.doc.items.values_list("keterangan", "amount_int")),
+            [("Ban", 2000), ("Oli", 500)],
+        )
+        self.assertEqual(self._cells(2, {"op": "remove", "path": "/0/9"}).status_code, 400)
+
+    def test_payment_proof_keeps_a_concurrent_cell_edit(self):
+        # A cells edit commits after the proof request resolved main_document
+        # but before PAY_REF is written back; it must survive.
+        validate = PaymentProofSerializer.validate
+
+        def racing_validate(serializer, attrs):
+            self._cells(0, {"op": "replace", "path": "/0/0/KETERANGAN", "value": "Servis besar"})
+            return validate(serializer, attrs)
+
+        with mock.patch.object(PaymentProofSerializer, "validate", racing_validate):
+            resp = self.client.post("/api/payment-proofs/", {
+                "main_document": self.doc.pk,
+                "section_index": 0,
+                "item_index": 0,
+                "file": SimpleUploadedFile("bukti.pdf", b"%PDF-1.4", content_type="application/pdf"),
+            })
+        self.assertEqual(resp.status_code, 201)
+
+        self.doc.refresh_from_db()
+        headers, row = self.doc.parsed_json[0]["table"][:2]
+        self.assertEqual(row[1], "Servis besar")
+        self.assertEqual(row[headers.index("PAY_REF")], resp.data["identifier"])
+        self.assertEqual(self.doc.parsed_version, 2)
+        # the client's version after the cell edit is stale now: 409, not a lost PAY_REF
+        self.assertEqual(self._cells(1, {"op": "replace", "path": "/0/1/BANK", "value": "BRI"}).status_code, 409)
+
+        proof = PaymentProof.objects.get(pk=resp.data["id"])
+        self.assertEqual(self.client.delete(f"/api/payment-proofs/{proof.pk}/").status_code, 204)
+        self.doc.refresh_from_db()
+        headers, row = self.doc.parsed_json[0]["table"][:2]
+        self.assertEqual((row[1], row[headers.index("PAY_REF")]), ("Servis besar", ""))
+
+
+class KeteranganFrameTests(SimpleTestCase):
+    """The pandas batch parser agrees with the per-row parser string for string."""
+
+    TEXTS = [
+        "PO Pembayaran Solar 200 liter tgl 12/03/2026",
+        "BBM 1.000 L unit TR-001 - 5-6-26",
+        "pembayaran   solar 12,5 ltr 21 Oktober 2025 unit TR-002",
+        "Solar 50 l tgl 31/02/2026 dikirim 01/03/2026",  # invalid first date
+        "Solar tgl 31/02/2026 lalu 3 Maret 2026",  # falls through to the month name
+        "8-5-213",  # three-digit year: pandas would read 2130
+        "8-13-0213",  # month 13, year 213: pandas would read 2131
+        "15 Februari 0213",
+        "21 Oktober 213",
+        "3 Mei 1500",  # outside pandas' datetime range
+        "1/1/9999",
+        "1/1/00",
+        "20 Foo 2026",  # unknown month name
+        "Biaya BBM operasional " + "x" * 120,
+        "",
+    ]
+
+    def test_matches_per_row(self):
+        self.assertEqual(_parse_keterangan_frame(self.TEXTS), [parse_keterangan(t) for t in self.TEXTS])
+
+
+class PacketCacheNameTests(SimpleTestCase):
+    """Stale-packet cleanup only touches the document's own `<code>-<hash>.pdf` files."""
+
+    def test_revision_packets_are_not_the_parents(self):
+        parent = Document(document_code="TTU-TP-2610-0001")
+        revision = Document(document_code="TTU-TP-2610-0001-R1")
+        parent_packet = _packet_path(parent, "0123456789abcdef" * 2)
+        revision_packet = _packet_path(revision, "fedcba9876543210" * 2)
+
+        self.assertTrue(_is_packet_of(parent, parent_packet))
+        self.assertFalse(_is_packet_of(parent, revision_packet))
+        self.assertTrue(_is_packet_of(revision, revision_packet))
+        self.assertFalse(_is_packet_of(parent, parent_packet.with_name("TTU-TP-2610-0001-x.pdf")))
+
+
+class DocumentCodeCounterTests(TestCase):
+    """Monthly running numbers behind PP-/KK-/... document codes."""
+
+    def _create(self, when):
+        with mock.patch("django.utils.timezone.now", return_value=when):
+            return Document.objects.create(
+                title="Kode", company="ttu", doc_type="pembayaran_pekerjaan", parsed_json=[]
+            )
+
+    def test_seeds_from_month_maximum(self):
+        october = datetime(2026, 10, 5, 9, tzinfo=dt_timezone.utc)
+        first = self._create(october)
+        self.assertEqual((first.document_code, first.sequence_no), ("PP-TTU-2610-0001", 1))
+
+        # Numbers taken before the counter row existed: the new row starts after them
+        Document.objects.filter(pk=first.pk).update(sequence_no=41)
+        DocumentCodeCounter.objects.all().delete()
+        second = self._create(october)
+        self.assertEqual((second.document_code, second.sequence_no), ("PP-TTU-2610-0042", 42))
+        self.assertEqual(DocumentCodeCounter.objects.get(period=202610).last_value, 42)
+
+    def test_new_month_starts_again(self):
+        for _ in range(2):
+            self._create(datetime(2026, 10, 31, 23, tzinfo=dt_timezone.utc))
+        november = self._create(datetime(2026, 11, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual((november.document_code, november.sequence_no), ("PP-TTU-2611-0001", 1))
+        self.assertEqual(
+            dict(DocumentCodeCounter.objects.values_list("period", "last_value")),
+            {202610: 2, 202611: 1},
+        )
+
+
+class ParsedItemSyncTests(TestCase):
+    """Document.save() keeps ParsedItem rows in line with parsed_json."""
+
+    def setUp(self):
+        self.doc = Document.objects.create(
+            title="Items",
+            company="ttu",
+            doc_type="tagihan_pekerjaan",
+            parsed_json=_table(
+                ["1", "Servis truk", "CV Maju", "BCA", "1.000", "REF00001"],
+                ["2", "Ganti oli", "CV Maju", "BCA", "2.000", "REF00002"],
+            ) + [{"company": "PT. B", "table": [list(HEADER), ["1", "Ban", "PT Karet", "BRI", "3.000", "REF00003"]]}],
+        )
+
+    def _items(self):
+        return {
+            (i.section_index, i.row_index): i
+            for i in ParsedItem.objects.filter(document=self.doc)
+        }
+
+    def test_create_update_delete(self):
+        items = self._items()
+        self.assertEqual(
+            {k: (i.ref_code, i.amount_int, i.company) for k, i in items.items()},
+            {(0, 0): ("REF00001", 1000, "PT. A"), (0, 1): ("REF00002", 2000, "PT. A"), (1, 0): ("REF00003", 3000, "PT. B")},
+        )
+
+        doc = Document.objects.get(pk=self.doc.pk)
+        section = doc.parsed_json[0]["table"]
+        section[1][1] = "Servis truk besar"  # update row 0
+        del section[2]  # delete row 1
+        doc.mark_sections_changed([0])
+        doc.save(update_fields=["parsed_json"])
+
+        after = self._items()
+        self.assertEqual(set(after), {(0, 0), (1, 0)})
+        self.assertEqual(after[(0, 0)].pk, items[(0, 0)].pk)
+        self.assertEqual(after[(0, 0)].keterangan, "Servis truk besar")
+        self.assertFalse(ParsedItem.objects.filter(pk=items[(0, 1)].pk).exists())
+        self.assertEqual(after[(1, 0)].pk, items[(1, 0)].pk)  # untouched section
+
+        doc = Document.objects.get(pk=self.doc.pk)
+        doc.parsed_json[1]["table"].append(["2", "Aki", "Toko Aki", "BCA", "500", "REF00004"])  # create
+        doc.mark_sections_changed([1])
+        doc.save(update_fields=["parsed_json"])
+
+        added = self._items()[(1, 1)]
+        self.assertEqual((added.ref_code, added.amount_int, added.company), ("REF00004", 500, "PT. B"))
+
+    def test_cleared_document_has_no_items(self):
+        self.doc.parsed_json = []
+        self.doc.save()
+        self.assertEqual(self._items(), {})
+
+
+class IncrementalRecalcTests(SimpleTestCase):
+    """recalc_totals(parsed, sections) matches a full recalculation for the edited sections."""
+
+    def _parsed(self):
+        sections = [
+            {"company": f"PT. {c}", "table": [list(HEADER), *[
+                [str(i + 1), f"Baris {i}", "CV Maju", "BCA", f"{(n + 1) * (i + 1) * 1000:,}".replace(",", "."), f"REF{n:03d}{i:02d}"]
+                for i in range(3)
+            ]]}
+            for n, c in enumerate("ABCD")
+        ]
+        return recalc_totals(sections)
+
+    def test_matches_full_recalc(self):
+        parsed = self._parsed()
+        parsed[1]["table"][2][4] = "-1.500"
+        parsed[3]["table"].append(["4", "Tambahan", "CV Maju", "BCA", "Rp 250.000 (transfer)", "REF00399"])
+        del parsed[2]["table"][1]
+
+        full = recalc_totals(copy.deepcopy(parsed))
+        incremental = recalc_totals(parsed, {1, 2, 3})
+        self.assertEqual(incremental, full)
+        self.assertEqual(full[-1], {"grand_total": "301.500"})
+
+    def test_unmarked_sections_keep_their_subtotal(self):
+        parsed = self._parsed()
+        parsed[0]["table"][1][4] = "9.000"  # edited but not reported
+        self.assertEqual(recalc_totals(parsed, {1})[0]["subtotal"], "6.000")
+        self.assertEqual(recalc_totals(parsed)[0]["subtotal"], "14.000")
+
+
+class ParseIdrTests(SimpleTestCase):
+    """parse_idr: the one parser for stored amount strings."""
+
+    CASES = [
+        ("5.662.397", 5662397),
+        ("1,234,567", 1234567),
+        ("Rp 1.234,00", 1234),  # decimals dropped
+        ("12.345,67", 12345),
+        (" Rp. 2.500 ", 2500),
+        ("IDR 10.000", 10000),
+        ("-1.500", -1500),
+        ("- Rp 750", -750),
+        ("(1.500)", -1500),  # accounting negative
+        ("(Rp 3.000)", -3000),
+        ("Rp 500.000 (transfer)", 500000),  # notes are not part of the amount
+        ("1.000 (2x)", 1000),
+        ("abc", 0),
+        ("", 0),
+        (None, 0),
+        (42, 42),
+    ]
+
+    def test_cases(self):
+        for value, expected in self.CASES:
+            with self.subTest(value=value):
+                self.assertEqual(parse_idr(value), expected)
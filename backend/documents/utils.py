@@ -1,4 +1,5 @@
 # backend/utils.py
+import hashlib
 import secrets
 import string
 import re
@@ -17,10 +18,39 @@ def generate_unique_item_ref_code(used: set[str] | None = None, length: int = 8)
             return code
 
 # ---------- IDR helpers ----------
-def _idr_to_int(text: str) -> int:
-    """'5.662.397' → 5662397 (safe for '' / None)."""
-    nums = re.sub(r"[^0-9]", "", str(text))
-    return int(nums) if nums else 0
+_IDR_DECIMALS_RE = re.compile(r",\s*\d{1,2}\s*$")
+_IDR_NEGATIVE_RE = re.compile(r"^\(\s*[\d.,\s]+\)$")  # accounting negative: the whole value wrapped
+_IDR_NOTE_RE = re.compile(r"\([^)]*\)")             # '(transfer)', '(DP 50%)'
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+
+def parse_idr(value) -> int:
+    """
+    The one parser for Indonesian amount strings; everything stored as an int
+    (ParsedItem.amount_int, RekapEntry.nominal, subtotals / totals) goes
+    through it.
+
+    '5.662.397' → 5662397, 'Rp 1.234,00' → 1234, '(1.500)' / '-1.500' → -1500,
+    'Rp 500.000 (transfer)' → 500000, '' / None → 0.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    s = str(value).strip()
+    if not s:
+        return 0
+    s = s.lower().replace("rp", "").replace("idr", "").strip()
+    wrapped = bool(_IDR_NEGATIVE_RE.match(s))
+    neg = wrapped or s.startswith("-")
+    # Any other parentheses are notes; their digits are not part of the amount
+    s = s[1:-1] if wrapped else _IDR_NOTE_RE.sub(" ", s)
+    s = _IDR_DECIMALS_RE.sub("", s.strip())
+    digits = _NON_DIGIT_RE.sub("", s)
+    if not digits:
+        return 0
+    n = int(digits)
+    return -n if neg else n
 
 
 def _int_to_idr(n: int) -> str:
@@ -28,23 +58,40 @@ def _int_to_idr(n: int) -> str:
     return f"{n:,}".replace(",", ".")
 
 # ---------- Main routine ----------
-def recalc_totals(parsed: list[dict]) -> list[dict]:
+def section_amounts(sec) -> list[int] | None:
+    """Per-row PENGIRIMAN ints for a section (None when it has no such column)."""
+    tbl = sec.get("table") or []
+    if not tbl:
+        return None
+    try:
+        idx = tbl[0].index("PENGIRIMAN")
+    except ValueError:
+        return None
+    return [parse_idr(r[idx]) if len(r) > idx else 0 for r in tbl[1:]]
+
+
+def recalc_totals(parsed: list[dict], sections=None) -> list[dict]:
     """
     • For every section that has a table, sum the **PENGIRIMAN** column  
       and write the subtotal string back into `section["subtotal"]`.  
     • Append / update the trailing object `{ "grand_total": "…" }`.
+
+    `sections` (optional) limits the reparse to those section indexes; the
+    other sections keep their stored subtotal, which only has to be read back
+    for the grand total.
     """
     grand = 0
-    for sec in parsed:
-        tbl = sec.get("table") or []
-        if not tbl:
+    for s_idx, sec in enumerate(parsed):
+        if not isinstance(sec, dict) or "grand_total" in sec:
             continue
-        headers = tbl[0]
-        try:
-            idx = headers.index("PENGIRIMAN")
-        except ValueError:
+        sec.pop("amounts", None)  # no longer stored (per-row ints live in ParsedItem)
+        if sections is not None and s_idx not in sections and "subtotal" in sec:
+            grand += parse_idr(sec["subtotal"])
             continue
-        subtotal = sum(_idr_to_int(r[idx]) for r in tbl[1:] if len(r) > idx)
+        amounts = section_amounts(sec)
+        if amounts is None:
+            continue
+        subtotal = sum(amounts)
         sec["subtotal"] = _int_to_idr(subtotal)
         grand += subtotal
 
@@ -54,3 +101,106 @@ def recalc_totals(parsed: list[dict]) -> list[dict]:
     else:
         parsed.append({"grand_total": gt_str})
     return parsed
+
+
+def summarize_parsed(parsed: list[dict] | None) -> tuple[int, int]:
+    """
+    (row_count, grand_total) for a parsed_json that already went through
+    `recalc_totals`. Blank rows are not counted.
+    """
+    rows = 0
+    grand = 0
+    for sec in parsed or []:
+        if not isinstance(sec, dict):
+            continue
+        if "grand_total" in sec:
+            grand = parse_idr(sec.get("grand_total"))
+            continue
+        for r in (sec.get("table") or [])[1:]:
+            if any(str(v or "").strip() for v in r):
+                rows += 1
+    return rows, grand
+
+
+# ---------- Row-level view of parsed_json (ParsedItem) ----------
+ITEM_COLUMNS = {
+    "ref_code": "REF_CODE",
+    "keterangan": "KETERANGAN",
+    "dibayar_ke": "DIBAYAR KE",
+    "bank": "BANK",
+    "amount": "PENGIRIMAN",
+    "pay_ref": "PAY_REF",
+}
+
+
+def iter_parsed_items(parsed: list[dict] | None, sections=None):
+    """
+    Yield one dict per non-blank table row of parsed_json (only the
+    `sections` indexes, if given): section_index, row_index (0-based, header
+    excluded), ref_code, keterangan, dibayar_ke, bank, amount_int, pay_ref,
+    company (the section title). Missing columns give ''/0.
+    """
+    for s_idx, sec in enumerate(parsed or []):
+        if sections is not None and s_idx not in sections:
+            continue
+        if not isinstance(sec, dict):
+            continue
+        tbl = sec.get("table") or []
+        if len(tbl) < 2:
+            continue
+        headers = [str(h or "").strip().upper() for h in tbl[0]]
+        idx = {
+            key: headers.index(col) if col in headers else None
+            for key, col in ITEM_COLUMNS.items()
+        }
+        company = str(sec.get("company") or "").strip()
+        for r_idx, row in enumerate(tbl[1:]):
+            if not any(str(v or "").strip() for v in row):
+                continue
+
+            def cell(key):
+                i = idx[key]
+                return str(row[i] or "").strip() if i is not None and i < len(row) else ""
+
+            yield {
+                "section_index": s_idx,
+                "row_index": r_idx,
+                "ref_code": cell("ref_code"),
+                "keterangan": cell("keterangan"),
+                "dibayar_ke": cell("dibayar_ke"),
+                "bank": cell("bank"),
+                "amount_int": parse_idr(cell("amount")),
+                "pay_ref": cell("pay_ref"),
+                "company": company,
+            }
+
+
+# ---------- Duplicate-payment fingerprint (ParsedItem.fingerprint) ----------
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Legal forms / honorifics that vary between packets for the same payee
+_PAYEE_NOISE = {"pt", "cv", "ud", "tbk", "persero", "bpk", "bapak", "ibu", "sdr", "an"}
+# Filler words in KETERANGAN that say nothing about which invoice it is
+_KETERANGAN_STOPWORDS = {
+    "dan", "untuk", "dari", "yang", "atas", "dengan", "ke", "di", "no", "nomor",
+    "rp", "bayar", "pembayaran", "biaya", "tagihan", "invoice", "inv", "tgl", "tanggal",
+}
+
+
+def payment_fingerprint(dibayar_ke: str, amount: int, keterangan: str) -> str:
+    """
+    Hash of the normalized (payee, amount, key tokens of keterangan) of a row,
+    equal for the same invoice written slightly differently ("PT. Maju Jaya" /
+    "MAJU JAYA", reordered words, filler words). '' when the row has no
+    amount or nothing else to identify it.
+    """
+    if not amount or amount <= 0:
+        return ""
+    payee = " ".join(t for t in _TOKEN_RE.findall((dibayar_ke or "").lower()) if t not in _PAYEE_NOISE)
+    tokens = sorted({
+        t for t in _TOKEN_RE.findall((keterangan or "").lower())
+        if t not in _KETERANGAN_STOPWORDS and (len(t) >= 3 or t.isdigit())
+    })
+    if not payee and not tokens:
+        return ""
+    raw = f"{payee}|{int(amount)}|{' '.join(tokens)}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
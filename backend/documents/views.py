@@ -2,8 +2,10 @@ import io
 import os
 import re
 import base64
+import glob
 import hashlib
 import tempfile
+import mimetypes
 import logging
 import threading
 import json
@@ -17,7 +19,7 @@ import smtplib
 from email.message import EmailMessage
 
 import fitz
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 from django.conf import settings
 from PIL import ImageOps
 from datetime import datetime, date, timedelta
@@ -28,17 +30,25 @@ from django.core.exceptions import ValidationError
 from django.core.files import File
 from django.http import JsonResponse
 from django.core.cache import cache
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.cache import never_cache
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.db import transaction
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import Case, Count, F, FloatField, Max, Prefetch, Q, Sum, Value, When
+from django.db.models.functions import Greatest, TruncMonth
 from rest_framework import status as drf_status, viewsets
-from rest_framework.decorators import api_view, action, permission_classes
+from rest_framework.decorators import api_view, action, permission_classes, renderer_classes
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import ParseError, PermissionDenied
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
 
 import pandas as pd
 
@@ -48,13 +58,36 @@ from .gpt_parser import (
     gpt_detect_corner_marker,
 )
 from . import gpt_parser as _gptp
-from .models import Document, SupportingDocument, UserSettings, PaymentProof
+from .models import (
+    STATS_VERSION_KEY,
+    Document,
+    ParsedItem,
+    PaymentProof,
+    RekapEntry,
+    SupportingDocument,
+    UserSettings,
+)
 from .serializers import (
     DocumentSerializer,
+    DocumentListSerializer,
     SupportingDocumentSerializer,
     UserSettingsSerializer,
     PaymentProofSerializer,
 )
+from .rendering import (
+    RenderBusy,
+    draw_stamp,
+    encode_preview_file,
+    image_width,
+    preview_file_from_source,
+    render_preview,
+    stamp_pdf_pages,
+    write_stamped_copy,
+)
+from .page_text import clean_text, file_text, needs_ocr, ocr_file_text, page_text
+from .parsed_patch import PatchError, apply_ops
+from .rekap import REKAP_COLUMNS, REKAP_CONFIG, format_date_long_id
+from .streaming import iter_csv, iter_xlsx, iter_zip
 from .utils import generate_unique_item_ref_code, recalc_totals
 
 logger = logging.getLogger(__name__)
@@ -293,20 +326,6 @@ def kebun_blocks_meta_view(request, estate_code):
     except Exception as e:
         return Response({"detail": f"Failed to load blocks meta: {e}"}, status=500)
 
-# --- Rekap configuration ----------------------------------------------------
-REKAP_CONFIG = {
-    "bbm": {
-        "label": "Rekap BBM",
-        # keywords in KETERANGAN / vendor text (lowercased comparisons)
-        "keywords": [
-            "po pembayaran solar",
-            "pembayaran solar",
-            "bbm",
-        ],
-        "doc_types": ["tagihan_pekerjaan"],  # QLOLA transaksi
-    },
-}
-
 def _pkey(job_id: str) -> str:
     return f"progress:{job_id}"
 
@@ -1079,13 +1098,12 @@ def _crop_top_right_b64(image_path: str, w_frac: float = 0.35, h_frac: float = 0
     return base64.b64encode(buf.getvalue()).decode("utf-8")
 
 
-def _detect_marker_on_page(pdf_doc, page_index: int) -> tuple[str | None, int | None]:
-    """Fast text-only detection of ALPHA[-x] or BETA on a page (search entire page text)."""
-    try:
-        page = pdf_doc.load_page(page_index)
-        txt = (page.get_text("text") or "").lower()
-    except Exception:
-        txt = ""
+def _detect_marker_on_page(pdf_doc, page_index: int, text: str | None = None) -> tuple[str | None, int | None]:
+    """
+    Fast text-only detection of ALPHA[-x] or BETA on a page (search entire page
+    text). Pass `text` when the page text was already read.
+    """
+    txt = (page_text(pdf_doc, page_index) if text is None else text).lower()
 
     # Greek letters too
     # Prefer ALPHA-x capture
@@ -1186,181 +1204,6 @@ def _parse_ymd(s: str | None):
         return None
 
 
-_ID_MONTHS = {
-    1: "Januari",
-    2: "Februari",
-    3: "Maret",
-    4: "April",
-    5: "Mei",
-    6: "Juni",
-    7: "Juli",
-    8: "Agustus",
-    9: "September",
-    10: "Oktober",
-    11: "November",
-    12: "Desember",
-}
-
-
-def _format_date_long_id(d):
-    """Format date/datetime as '7 Januari 2026'. Returns '-' for None."""
-    if not d:
-        return "-"
-    if isinstance(d, datetime):
-        d = d.date()
-    if isinstance(d, str):
-        # best-effort: accept ISO strings
-        try:
-            d = datetime.fromisoformat(d).date()
-        except Exception:
-            return d
-    try:
-        return f"{d.day} {_ID_MONTHS.get(d.month, str(d.month))} {d.year}"
-    except Exception:
-        return str(d)
-
-
-def _idr_to_int(value) -> int:
-    """
-    Parse Indonesian currency-ish strings to int.
-    Examples: 'Rp 1.234.567' -> 1234567, '1.234,00' -> 1234.
-    """
-    if value is None:
-        return 0
-    s = str(value).strip()
-    if not s:
-        return 0
-
-    neg = False
-    if "(" in s and ")" in s:
-        neg = True
-    if s.startswith("-"):
-        neg = True
-
-    s = s.lower().replace("rp", "").replace("idr", "").strip()
-
-    # Drop decimal part if it looks like ",00" / ",0" / ",12"
-    if "," in s:
-        left, right = s.rsplit(",", 1)
-        if re.fullmatch(r"\s*\d{1,2}\s*", right or ""):
-            s = left
-
-    digits = re.findall(r"\d+", s)
-    if not digits:
-        return 0
-
-    n = int("".join(digits))
-    return -n if neg else n
-
-
-_MONTH_NAME_MAP = {
-    "jan": 1,
-    "januari": 1,
-    "feb": 2,
-    "februari": 2,
-    "mar": 3,
-    "maret": 3,
-    "apr": 4,
-    "april": 4,
-    "mei": 5,
-    "jun": 6,
-    "juni": 6,
-    "jul": 7,
-    "juli": 7,
-    "agu": 8,
-    "agustus": 8,
-    "sep": 9,
-    "september": 9,
-    "okt": 10,
-    "oktober": 10,
-    "nov": 11,
-    "november": 11,
-    "des": 12,
-    "desember": 12,
-}
-
-
-def _parse_tanggal_masuk_from_keterangan(text: str | None):
-    """Best-effort extract a date from a BBM 'keterangan' string."""
-    s = (text or "").strip()
-    if not s:
-        return None
-
-    # dd/mm/yyyy or dd-mm-yy etc
-    for m in re.finditer(r"(\d{1,2})[\/\-.](\d{1,2})[\/\-.](\d{2,4})", s):
-        dd, mm, yy = m.group(1), m.group(2), m.group(3)
-        try:
-            d = int(dd)
-            mo = int(mm)
-            y = int(yy)
-            if y < 100:
-                y += 2000
-            return date(y, mo, d)
-        except Exception:
-            continue
-
-    # dd <monthname> yyyy (Indonesian)
-    m2 = re.search(r"(\d{1,2})\s*([A-Za-z]{3,10})\s*(\d{2,4})", s)
-    if m2:
-        try:
-            d = int(m2.group(1))
-            mon_raw = m2.group(2).lower()
-            y = int(m2.group(3))
-            if y < 100:
-                y += 2000
-            mo = _MONTH_NAME_MAP.get(mon_raw)
-            if mo:
-                return date(y, mo, d)
-        except Exception:
-            pass
-
-    return None
-
-
-def _parse_liter_from_keterangan(text: str | None) -> int:
-    """Best-effort extract liters from keterangan, returns int (0 if not found)."""
-    s = (text or "").lower()
-    if not s:
-        return 0
-
-    # e.g. "200 l", "200 liter", "200ltr", "1.000 L"
-    m = re.search(r"(\d+(?:[.,]\d+)?)\s*(l|liter|ltr)\b", s)
-    if not m:
-        return 0
-
-    raw = m.group(1)
-
-    # Normalize Indonesian numeric formatting
-    # If "1.000" (thousands) and no comma, treat dots as thousands separators.
-    if raw.count(".") >= 1 and raw.count(",") == 0:
-        parts = raw.split(".")
-        if all(len(p) == 3 for p in parts[1:]):
-            raw = "".join(parts)
-
-    # If "1.234,5" -> "1234.5"
-    if raw.count(",") == 1 and raw.count(".") >= 1:
-        raw = raw.replace(".", "").replace(",", ".")
-    elif raw.count(",") == 1 and raw.count(".") == 0:
-        raw = raw.replace(",", ".")
-
-    try:
-        return int(round(float(raw)))
-    except Exception:
-        return 0
-
-
-def _shorten_keterangan_bbm(text: str | None, max_len: int = 90) -> str:
-    """Compact whitespace + shorten for recap display."""
-    s = re.sub(r"\s+", " ", (text or "")).strip()
-    if not s:
-        return ""
-    # Light normalization (don't over-destroy info)
-    s = re.sub(r"(?i)\b(po\s*)?pembayaran\s+solar\b", "Pembayaran Solar", s)
-    if len(s) > max_len:
-        return s[: max_len - 3].rstrip() + "..."
-    return s
-
-
 def _has_grand_total(parsed) -> bool:
     """True if any dict item contains 'grand_total'."""
     for x in parsed or []:
@@ -1437,26 +1280,7 @@ def _encode_preview(image_path: str, stem: str, max_w: int = 1200):
     Encode a preview image (prefer WEBP, fallback JPEG).
     Returns: (django.core.files.File, ext)
     """
-    img = Image.open(image_path)
-    img = ImageOps.exif_transpose(img)
-    if img.mode not in ("RGB", "L"):
-        img = img.convert("RGB")
-
-    if max_w and img.width > max_w:
-        new_h = max(1, int(img.height * (max_w / float(img.width))))
-        img = img.resize((max_w, new_h), Image.LANCZOS)
-
-    # Try WEBP first
-    buf = io.BytesIO()
-    try:
-        img.save(buf, format="WEBP", quality=78, method=6)
-        buf.seek(0)
-        return File(buf, name=f"{stem}.webp"), ".webp"
-    except Exception:
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=82, optimize=True)
-        buf.seek(0)
-        return File(buf, name=f"{stem}.jpg"), ".jpg"
+    return encode_preview_file(image_path, stem, max_w)
 
 
 @api_view(["POST"])
@@ -1584,6 +1408,7 @@ def parse_and_store_view(request):
         status="draft",
         file=up,
         parsed_json=recalc_totals(parsed) if parsed else parsed,
+        table_pages=table_pages,
     )
 
     attached = 0
@@ -1612,6 +1437,7 @@ def parse_and_store_view(request):
             "attached_pages": attached,
             "table_pages": table_pages,
         }, status=201)
+    ocr_pending: list[int] = []  # attachments without a text layer (scans)
     if pdf and pdf.page_count > table_pages:
         items_ctx = _row_ctx(parsed)
         if items_ctx:
@@ -1644,7 +1470,8 @@ def parse_and_store_view(request):
 
                     if not in_group:
                         # Fast text first; allow a tiny OCR probe window (first two supporting pages)
-                        tag, x = _detect_marker_on_page(pdf, p)
+                        ptxt = page_text(pdf, p)
+                        tag, x = _detect_marker_on_page(pdf, p, ptxt)
                         if tag is None and (p - table_pages) < 2 and ocr_budget > 0:
                             tag, x = _detect_from_existing_png(page_png)
                             if tag:
@@ -1688,12 +1515,15 @@ def parse_and_store_view(request):
                                     ai_auto_attached=True,
                                     ai_confidence=1.0,
                                     ai_low_confidence=False,
+                                    content_text=clean_text(ptxt),
                                 )
                                 sdoc.file.save(
                                     f"{doc.document_code}_S{items_ctx[item_idx]['section_index']+1}R{items_ctx[item_idx]['row_index']+1}_{seq[ref]}.pdf",
                                     File(fp),
                                     save=True,
                                 )
+                            if needs_ocr(ptxt):
+                                ocr_pending.append(sdoc.pk)
                             try:
                                 with open(page_png, "rb") as fp_img:
                                     fileobj_pg, ext_pg = _encode_preview(page_png, f"{doc.document_code}_{ref}_{seq[ref]}")
@@ -1733,6 +1563,7 @@ def parse_and_store_view(request):
 
                                 page_pdf = _save_single_page_pdf(pdf, q)
                                 page_png2 = _save_page_image(pdf, q, dpi=144)
+                                qtxt = page_text(pdf, q)
                                 title_i = f"Lampiran {ref} #{seq[ref]}"
                                 with open(page_pdf, "rb") as fp:
                                     sdoc2 = SupportingDocument(
@@ -1747,12 +1578,15 @@ def parse_and_store_view(request):
                                         ai_auto_attached=True,
                                         ai_confidence=1.0,
                                         ai_low_confidence=False,
+                                        content_text=clean_text(qtxt),
                                     )
                                     sdoc2.file.save(
                                         f"{doc.document_code}_S{items_ctx[item_idx]['section_index']+1}R{items_ctx[item_idx]['row_index']+1}_{seq[ref]}.pdf",
                                         File(fp),
                                         save=True,
                                     )
+                                if needs_ocr(qtxt):
+                                    ocr_pending.append(sdoc2.pk)
                                 try:
                                     with open(page_png2, "rb") as fp_img:
                                         fileobj_pg2, ext_pg2 = _encode_preview(page_png2, f"{doc.document_code}_{ref}_{seq[ref]}")
@@ -1789,7 +1623,8 @@ def parse_and_store_view(request):
                         continue
 
                     # in_group without numeric x → only possible when policy == 'until_beta'
-                    tag, _ = _detect_marker_on_page(pdf, p)
+                    ptxt = page_text(pdf, p)
+                    tag, _ = _detect_marker_on_page(pdf, p, ptxt)
                     if tag is None and (group_pages in (5, 10)) and ocr_budget > 0:
                         t2, _x2 = _detect_from_existing_png(page_png)
                         if t2:
@@ -1816,12 +1651,15 @@ def parse_and_store_view(request):
                             ai_auto_attached=True,
                             ai_confidence=1.0,
                             ai_low_confidence=False,
+                            content_text=clean_text(ptxt),
                         )
                         sdoc.file.save(
                             f"{doc.document_code}_S{items_ctx[item_idx]['section_index']+1}R{items_ctx[item_idx]['row_index']+1}_{seq[ref]}.pdf",
                             File(fp),
                             save=True,
                         )
+                    if needs_ocr(ptxt):
+                        ocr_pending.append(sdoc.pk)
                     try:
                         with open(page_png, "rb") as fp_img:
                             fileobj_pg3, ext_pg3 = _encode_preview(page_png, f"{doc.document_code}_{ref}_{seq[ref]}")
@@ -1852,6 +1690,7 @@ def parse_and_store_view(request):
                 for i, p in enumerate(range(table_pages, pdf.page_count), 1):
                     page_pdf = _save_single_page_pdf(pdf, p)
                     page_png = _save_page_image(pdf, p)
+                    ptxt = page_text(pdf, p)
                     decision = gpt_belongs_to_current(
                         page_png,
                         current_row=items_ctx[ptr],
@@ -1893,12 +1732,15 @@ def parse_and_store_view(request):
                             ai_auto_attached=True,
                             ai_confidence=conf,
                             ai_low_confidence=(conf < LOW),
+                            content_text=clean_text(ptxt),
                         )
                         sdoc.file.save(
                             f"{doc.document_code}_S{cur['section_index']+1}R{cur['row_index']+1}_{seq[ref]}.pdf",
                             File(fp),
                             save=True,
                         )
+                    if needs_ocr(ptxt):
+                        ocr_pending.append(sdoc.pk)
                     try:
                         with open(page_png, "rb") as fp_img:
                             fileobj_pg4, ext_pg4 = _encode_preview(page_png, f"{doc.document_code}_{ref}_{seq[ref]}")
@@ -1916,6 +1758,7 @@ def parse_and_store_view(request):
                     attached += 1
                     # no per-page progress updates
         pdf.close()
+    _enqueue_text_index(ocr_pending)
 
     os.remove(tmp_path)
     progress_update(job_id, 96, "Menyimpan ke basis data")
@@ -1925,6 +1768,7 @@ def parse_and_store_view(request):
         "document_code": doc.document_code,
         "attached_pages": attached,
         "table_pages": table_pages,
+        "possible_duplicates": ParsedItem.find_duplicates(doc),
     }, status=201)
 
 
@@ -1972,10 +1816,80 @@ class UserSettingsView(RetrieveUpdateAPIView):
         return obj
 
 
-class PaymentProofViewSet(viewsets.ModelViewSet):
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for retrieve and list, checked before serializing.
+
+    The validator covers exactly the rows the response would be built from:
+    latest `updated_field` + row count (so deletes show up) + path and media
+    type. For a paginated list that is the page being served (fetched once,
+    reused for the body), never an aggregate over the whole filtered table.
+    A matching If-None-Match / If-Modified-Since gets a bare 304.
+    Cache-Control: no-cache makes browsers revalidate every time.
+    """
+
+    updated_field = "updated_at"
+
+    def _conditional(self, request, state, respond):
+        """`state` is (row count, latest updated_field or None, extra key)."""
+        n, last, extra = state
+        raw = f"{request.get_full_path()}|{request.accepted_media_type}|{n}|{last.isoformat() if last else ''}|{extra}"
+        etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest()[:24])
+        last_modified = int(last.timestamp()) if last else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = respond()
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _queryset_state(self, qs):
+        state = qs.order_by().aggregate(last=Max(self.updated_field), n=Count("pk"))
+        return state["n"], state["last"], ""
+
+    def _page_state(self, page):
+        stamps = [getattr(obj, self.updated_field) for obj in page]
+        # ids too: a row leaving the page and another entering it keep the count
+        ids = ",".join(str(obj.pk) for obj in page)
+        return len(page), max(filter(None, stamps), default=None), ids
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        qs = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self._conditional(
+            request,
+            self._queryset_state(qs),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def list(self, request, *args, **kwargs):
+        qs = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(qs)
+        if page is None:
+            return self._conditional(
+                request,
+                self._queryset_state(qs),
+                lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            )
+        return self._conditional(
+            request,
+            self._page_state(page),
+            lambda: self.get_paginated_response(self.get_serializer(page, many=True).data),
+        )
+
+
+class PaymentProofViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = PaymentProof.objects.all()
     serializer_class = PaymentProofSerializer
     permission_classes = [IsAuthenticated]
+    updated_field = "uploaded_at"  # auto_now: bumped on every save
 
     def get_queryset(self):
         qs = PaymentProof.objects.all()
@@ -2007,44 +1921,51 @@ class PaymentProofViewSet(viewsets.ModelViewSet):
             )
 
     def perform_create(self, serializer):
-        main_doc = serializer.validated_data["main_document"]
-        self._ensure_editable(main_doc)
-
         sec = serializer.validated_data["section_index"]
         idx = serializer.validated_data["item_index"]
 
-        last = (
-            PaymentProof.objects.filter(
-                main_document=main_doc,
-                section_index=sec,
-                item_index=idx,
+        # The PAY_REF mirror below rewrites parsed_json: lock the document so a
+        # concurrent cells / PATCH edit is never overwritten by a stale copy.
+        with transaction.atomic():
+            main_doc = Document.objects.select_for_update().get(
+                pk=serializer.validated_data["main_document"].pk
+            )
+            self._ensure_editable(main_doc)
+
+            last = (
+                PaymentProof.objects.filter(
+                    main_document=main_doc,
+                    section_index=sec,
+                    item_index=idx,
+                )
+                .order_by("-payment_proof_sequence")
+                .values_list("payment_proof_sequence", flat=True)
+                .first()
+                or 0
             )
-            .order_by("-payment_proof_sequence")
-            .values_list("payment_proof_sequence", flat=True)
-            .first()
-            or 0
-        )
 
-        proof: PaymentProof = serializer.save(payment_proof_sequence=int(last) + 1)
-
-        # Mirror identifier into PAY_REF, but DON'T overwrite an existing value
-        pj = main_doc.parsed_json or []
-        if 0 <= proof.section_index < len(pj):
-            tbl = pj[proof.section_index].get("table")
-            if tbl and len(tbl) >= 2 and 0 <= proof.item_index < (len(tbl) - 1):
-                headers = tbl[0]
-                if "PAY_REF" not in headers:
-                    headers.append("PAY_REF")
-                pay_idx = headers.index("PAY_REF")
-                row = tbl[proof.item_index + 1]
-                if len(row) <= pay_idx:
-                    row.extend([""] * (pay_idx + 1 - len(row)))
-
-                # only fill if empty
-                if not row[pay_idx] or not str(row[pay_idx]).strip():
-                    row[pay_idx] = proof.identifier
-                    main_doc.parsed_json = pj
-                    main_doc.save(update_fields=["parsed_json"])
+            proof: PaymentProof = serializer.save(
+                main_document=main_doc, payment_proof_sequence=int(last) + 1
+            )
+
+            # Mirror identifier into PAY_REF, but DON'T overwrite an existing value
+            pj = main_doc.parsed_json or []
+            if 0 <= proof.section_index < len(pj) and isinstance(pj[proof.section_index], dict):
+                tbl = pj[proof.section_index].get("table")
+                if tbl and len(tbl) >= 2 and 0 <= proof.item_index < (len(tbl) - 1):
+                    headers = tbl[0]
+                    if "PAY_REF" not in headers:
+                        headers.append("PAY_REF")
+                    pay_idx = headers.index("PAY_REF")
+                    row = tbl[proof.item_index + 1]
+                    if len(row) <= pay_idx:
+                        row.extend([""] * (pay_idx + 1 - len(row)))
+
+                    # only fill if empty
+                    if not row[pay_idx] or not str(row[pay_idx]).strip():
+                        row[pay_idx] = proof.identifier
+                        main_doc.mark_sections_changed([proof.section_index])
+                        main_doc.save(update_fields=["parsed_json"])
 
     def partial_update(self, request, *args, **kwargs):
         instance: PaymentProof = self.get_object()
@@ -2053,45 +1974,105 @@ class PaymentProofViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         instance: PaymentProof = self.get_object()
-        self._ensure_editable(instance.main_document)
-
-        doc = instance.main_document
         sec = instance.section_index
         idx = instance.item_index
         deleted_ident = instance.identifier
 
-        # delete first
-        resp = super().destroy(request, *args, **kwargs)
+        with transaction.atomic():
+            # Locked copy: PAY_REF is written back to the latest parsed_json
+            doc = Document.objects.select_for_update().get(pk=instance.main_document_id)
+            self._ensure_editable(doc)
+
+            # delete first
+            resp = super().destroy(request, *args, **kwargs)
+
+            # after delete, see if other proofs still exist for the same row
+            remaining = (
+                PaymentProof.objects.filter(main_document=doc, section_index=sec, item_index=idx)
+                .order_by("payment_proof_sequence", "id")
+                .first()
+            )
 
-        # after delete, see if other proofs still exist for the same row
-        remaining = (
-            PaymentProof.objects.filter(main_document=doc, section_index=sec, item_index=idx)
-            .order_by("payment_proof_sequence", "id")
-            .first()
-        )
+            pj = doc.parsed_json or []
+            if 0 <= sec < len(pj) and isinstance(pj[sec], dict):
+                tbl = pj[sec].get("table")
+                if tbl and len(tbl) >= 2 and 0 <= idx < (len(tbl) - 1):
+                    headers = tbl[0]
+                    if "PAY_REF" in headers:
+                        pay_idx = headers.index("PAY_REF")
+                        row = tbl[idx + 1]
+                        if len(row) > pay_idx:
+                            current = str(row[pay_idx] or "").strip()
+
+                            # Only touch PAY_REF if it matches the deleted identifier (auto-written)
+                            if current == deleted_ident:
+                                row[pay_idx] = remaining.identifier if remaining else ""
+                                doc.mark_sections_changed([sec])
+                                doc.save(update_fields=["parsed_json"])
 
-        pj = doc.parsed_json or []
-        if 0 <= sec < len(pj):
-            tbl = pj[sec].get("table")
-            if tbl and len(tbl) >= 2 and 0 <= idx < (len(tbl) - 1):
-                headers = tbl[0]
-                if "PAY_REF" in headers:
-                    pay_idx = headers.index("PAY_REF")
-                    row = tbl[idx + 1]
-                    if len(row) > pay_idx:
-                        current = str(row[pay_idx] or "").strip()
+        return resp
 
-                        # Only touch PAY_REF if it matches the deleted identifier (auto-written)
-                        if current == deleted_ident:
-                            row[pay_idx] = remaining.identifier if remaining else ""
-                            doc.parsed_json = pj
-                            doc.save(update_fields=["parsed_json"])
+REKAP_CHUNK_SIZE = 500  # rows fetched per round-trip while streaming
 
-        return resp
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Lets `?format=csv|xlsx` pass DRF content negotiation. The view streams the
+    file itself; this only renders error payloads (as JSON).
+    """
+
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data, default=str).encode("utf-8")
+
+
+class CSVExportRenderer(_ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class XLSXExportRenderer(_ExportRenderer):
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    format = "xlsx"
+
+
+def _rekap_rows(entries):
+    """(row, meta) per RekapEntry values_list tuple, fetched in chunks."""
+    for (
+        tgl_pengajuan, tgl_masuk, document_code, keterangan, dibayar_ke,
+        liters, nominal, s_idx, r_idx, ref_code,
+    ) in entries.iterator(chunk_size=REKAP_CHUNK_SIZE):
+        row = [
+            format_date_long_id(tgl_pengajuan),  # Tanggal Pembayaran (using created_at)
+            format_date_long_id(tgl_masuk),      # Tanggal Masuk
+            document_code,                       # Kode Dokumen
+            keterangan,                          # Keterangan singkat
+            dibayar_ke,                          # Dibayar ke
+            liters,                              # Jumlah Liter (int)
+            nominal,                             # Nominal (Rp)
+        ]
+        # REF_CODE so the frontend can anchor precisely
+        meta = {
+            "document_code": document_code,
+            "section_index": s_idx,
+            "row_index": r_idx,
+            "ref_code": ref_code or None,
+        }
+        yield row, meta
+
+
+def _rekap_export_rows(entries, total_amount: int):
+    for row, _meta in _rekap_rows(entries):
+        yield row
+    yield ["", "", "", "TOTAL", "", "", total_amount]
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, CSVExportRenderer, XLSXExportRenderer])
 def rekap_view(request, company_code: str, rekap_key: str):
     """
     Return a recap table (e.g. Rekap BBM) built from archived QLOLA documents
@@ -2104,6 +2085,7 @@ def rekap_view(request, company_code: str, rekap_key: str):
     Query params:
       - from: YYYY-MM-DD (inclusive)  → Tanggal Pengajuan (created_at)
       - to:   YYYY-MM-DD (inclusive)
+      - format: csv | xlsx → stream the table as a file download instead
     """
     config = REKAP_CONFIG.get(rekap_key)
     if not config:
@@ -2130,109 +2112,50 @@ def rekap_view(request, company_code: str, rekap_key: str):
 
     company_code = (company_code or "").lower().strip()
 
-    # Base queryset: archived, sudah_dibayar, correct company + doc_type
-    qs = (
-        Document.objects.filter(
-            archived=True,
-            status="sudah_dibayar",
-            company=company_code,
-            doc_type__in=config["doc_types"],
-        )
-        .order_by("created_at")
+    # Facts are maintained on save (Document.sync_rekap) for paid + archived
+    # documents; this is a range scan on (rekap_key, company, tanggal_pengajuan).
+    qs = RekapEntry.objects.filter(rekap_key=rekap_key, company=company_code)
+    if date_from:
+        qs = qs.filter(tanggal_pengajuan__gte=date_from)
+    if date_to:
+        qs = qs.filter(tanggal_pengajuan__lte=date_to)
+
+    total_amount = qs.aggregate(total=Sum("nominal"))["total"] or 0
+
+    entries = qs.order_by(
+        "tanggal_pengajuan", "document__created_at", "section_index", "row_index"
+    ).values_list(
+        "tanggal_pengajuan",
+        "tanggal_masuk",
+        "document__document_code",
+        "keterangan",
+        "dibayar_ke",
+        "liters",
+        "nominal",
+        "section_index",
+        "row_index",
+        "ref_code",
     )
 
+    fmt = request.accepted_renderer.format
+    if fmt in ("csv", "xlsx"):
+        # Streamed straight from the DB cursor; the body never sits in memory.
+        export_rows = _rekap_export_rows(entries, total_amount)
+        if fmt == "csv":
+            body = iter_csv(REKAP_COLUMNS, export_rows)
+        else:
+            body = iter_xlsx(REKAP_COLUMNS, export_rows, sheet_name=config["label"])
+        resp = StreamingHttpResponse(body, content_type=request.accepted_renderer.media_type)
+        span = f"{date_from or 'awal'}-{date_to or 'sekarang'}"
+        resp["Content-Disposition"] = f'attachment; filename="rekap-{rekap_key}-{company_code}-{span}.{fmt}"'
+        resp["X-Accel-Buffering"] = "no"  # let Nginx pass chunks through
+        return resp
+
     rows: list[list] = []
     meta_rows: list[dict] = []
-    total_amount = 0
-    keywords = [k.lower() for k in config["keywords"]]
-
-    for doc in qs:
-        # Gunakan tanggal pengajuan tagihan = created_at sebagai dasar filter
-        if not doc.created_at:
-            continue
-        tgl_pengajuan = doc.created_at.date()
-        if date_from and tgl_pengajuan < date_from:
-            continue
-        if date_to and tgl_pengajuan > date_to:
-            continue
-
-        sections = doc.parsed_json or []
-        for s_idx, sec in enumerate(sections):
-            if not isinstance(sec, dict):
-                continue
-            tbl = sec.get("table") or []
-            if not tbl or len(tbl) < 2:
-                continue
-
-            header = [str(h or "") for h in tbl[0]]
-            header_lower = [h.strip().lower() for h in header]
-
-            try:
-                k_idx = header_lower.index("keterangan")
-            except ValueError:
-                # Without KETERANGAN we can't classify BBM, skip this section
-                continue
-
-            # Lookup REF_CODE column index if present
-            try:
-                ref_idx = header.index("REF_CODE")
-            except ValueError:
-                ref_idx = None
-
-            dby_idx = header_lower.index("dibayar ke") if "dibayar ke" in header_lower else None
-            bank_idx = header_lower.index("bank") if "bank" in header_lower else None
-            ship_idx = header_lower.index("pengiriman") if "pengiriman" in header_lower else None
-
-            for r_idx, row in enumerate(tbl[1:]):
-                # skip rows that are completely empty
-                if not any(str(c or "").strip() for c in row):
-                    continue
-
-                keterangan = str(row[k_idx]) if k_idx < len(row) else ""
-                dibayar_ke = (
-                    str(row[dby_idx]) if dby_idx is not None and dby_idx < len(row) else ""
-                )
-                bank = str(row[bank_idx]) if bank_idx is not None and bank_idx < len(row) else ""
-                pengiriman = (
-                    str(row[ship_idx]) if ship_idx is not None and ship_idx < len(row) else ""
-                )
-
-                haystack = " ".join([keterangan, dibayar_ke, bank]).lower()
-                if not any(kw in haystack for kw in keywords):
-                    continue  # not a BBM row
-
-                nominal = _idr_to_int(pengiriman)
-                total_amount += nominal
-
-                tgl_masuk = _parse_tanggal_masuk_from_keterangan(keterangan)
-                jumlah_liter = _parse_liter_from_keterangan(keterangan)
-                ket_singkat = _shorten_keterangan_bbm(keterangan)
-
-                rows.append(
-                    [
-                        _format_date_long_id(tgl_pengajuan),  # Tanggal Pembayaran (using created_at)
-                        _format_date_long_id(tgl_masuk),      # Tanggal Masuk
-                        doc.document_code,                    # Kode Dokumen
-                        ket_singkat or keterangan,            # Keterangan singkat
-                        dibayar_ke,                           # Dibayar ke
-                        jumlah_liter,                         # Jumlah Liter (int)
-                        nominal,                               # Nominal (Rp)
-                    ]
-                )
-
-                # Grab REF_CODE if available so frontend can anchor precisely
-                ref_code = None
-                if ref_idx is not None and ref_idx < len(row):
-                    ref_code = row[ref_idx]
-
-                meta_rows.append(
-                    {
-                        "document_code": doc.document_code,
-                        "section_index": s_idx,
-                        "row_index": r_idx,
-                        "ref_code": ref_code,
-                    }
-                )
+    for row, meta in _rekap_rows(entries):
+        rows.append(row)
+        meta_rows.append(meta)
 
     result = {
         "company_code": company_code,
@@ -2242,20 +2165,160 @@ def rekap_view(request, company_code: str, rekap_key: str):
         "to": date_to.isoformat() if date_to else None,
         "total_rows": len(rows),
         "total_amount": total_amount,
-        "columns": [
-            "Tanggal Pembayaran",
-            "Tanggal Masuk",
-            "Kode Dokumen",
-            "Keterangan",
-            "Dibayar ke",
-            "Jumlah Liter",
-            "Nominal",
-        ],
+        "columns": REKAP_COLUMNS,
         "rows": rows,
         "meta": meta_rows,
     }
     return Response(result)
 
+
+SEARCH_LIMIT_DEFAULT = 20
+SEARCH_LIMIT_MAX = 100
+SEARCH_ROW_FIELDS = (
+    "id", "document_id", "document__document_code", "document__company",
+    "document__doc_type", "document__status", "section_index", "row_index",
+    "ref_code", "company", "keterangan", "dibayar_ke", "bank", "amount_int",
+)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search_view(request):
+    """
+    Search the whole archive: parsed table rows (KETERANGAN / DIBAYAR KE /
+    BANK / section title) and supporting documents (title, company,
+    identifier, and the text on the attachment itself).
+
+    Query params:
+      - q: text, e.g. "BK 1234" or "PT GIN solar" (min. 2 characters)
+      - company: optional company code filter (ttu, asn, ...)
+      - limit: results per group (default 20, max 100)
+
+    Rows match on the full-text index (websearch syntax) or a REF_CODE
+    prefix ("match": "text"); when those are fewer than `limit`, pg_trgm word
+    similarity adds partial / misspelled matches ("match": "fuzzy").
+    Attachments whose captured page text (text layer / OCR) matches return a
+    short highlighted "excerpt". Every hit carries document_code +
+    section/row anchors for the preview.
+    """
+    q = (request.query_params.get("q") or "").strip()
+    if len(q) < 2:
+        return Response(
+            {"detail": "Kata kunci minimal 2 karakter."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        limit = int(request.query_params.get("limit") or SEARCH_LIMIT_DEFAULT)
+    except ValueError:
+        return Response(
+            {"detail": "Parameter 'limit' harus angka."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    limit = max(1, min(limit, SEARCH_LIMIT_MAX))
+    company = (request.query_params.get("company") or "").lower().strip()
+    code_prefix = q.upper()
+
+    # --- Ledger rows ---
+    # Full-text hits (and REF_CODE prefixes) first; trigram similarity only
+    # fills up what is left, so broad fuzzy matches are not all ranked.
+    query = SearchQuery(q, config="simple", search_type="websearch")
+    items = ParsedItem.objects.all()
+    if company:
+        items = items.filter(document__company=company)
+    exact = list(
+        items.annotate(search=ParsedItem.SEARCH_VECTOR)
+        .filter(Q(search=query) | Q(ref_code__startswith=code_prefix))
+        .annotate(score=SearchRank(F("search"), query))
+        .order_by("-score", "-document__created_at", "section_index", "row_index")
+        .values(*SEARCH_ROW_FIELDS, "score")[:limit]
+    )
+    fuzzy = []
+    if len(exact) < limit:
+        fuzzy = list(
+            items.filter(Q(keterangan__trigram_word_similar=q) | Q(dibayar_ke__trigram_word_similar=q))
+            .exclude(pk__in=[item["id"] for item in exact])
+            .annotate(
+                score=Greatest(
+                    TrigramWordSimilarity(q, "keterangan"),
+                    TrigramWordSimilarity(q, "dibayar_ke"),
+                )
+            )
+            .order_by("-score", "-document__created_at", "section_index", "row_index")
+            .values(*SEARCH_ROW_FIELDS, "score")[: limit - len(exact)]
+        )
+    rows = [
+        {
+            "document_id": item["document_id"],
+            "document_code": item["document__document_code"],
+            "document_company": item["document__company"],
+            "doc_type": item["document__doc_type"],
+            "status": item["document__status"],
+            "section_index": item["section_index"],
+            "row_index": item["row_index"],
+            "ref_code": item["ref_code"] or None,
+            "company": item["company"],
+            "keterangan": item["keterangan"],
+            "dibayar_ke": item["dibayar_ke"],
+            "bank": item["bank"],
+            "amount": item["amount_int"],
+            "match": match,
+            "score": round(item["score"] or 0, 4),
+        }
+        for match, hits in (("text", exact), ("fuzzy", fuzzy))
+        for item in hits
+    ]
+
+    # --- Supporting documents ---
+    sdocs = SupportingDocument.objects.annotate(content=SupportingDocument.SEARCH_VECTOR).filter(
+        Q(content=query)
+        | Q(title__trigram_word_similar=q)
+        | Q(company_name__trigram_word_similar=q)
+        | Q(identifier__startswith=code_prefix)
+        | Q(item_ref_code__startswith=code_prefix)
+    )
+    if company:
+        sdocs = sdocs.filter(main_document__company=company)
+    sdocs = sdocs.annotate(
+        score=Greatest(
+            TrigramWordSimilarity(q, "title"),
+            TrigramWordSimilarity(q, "company_name"),
+            SearchRank(F("content"), query),
+            Case(
+                When(Q(identifier__startswith=code_prefix) | Q(item_ref_code__startswith=code_prefix), then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+    ).order_by("-score", "-id")
+    sdocs = sdocs.annotate(
+        excerpt=SearchHeadline(
+            "content_text", query, config="simple",
+            start_sel="<b>", stop_sel="</b>", max_words=20, min_words=8, max_fragments=1,
+        )
+    )
+    attachments = [
+        {
+            "id": sd["id"],
+            "identifier": sd["identifier"],
+            "title": sd["title"],
+            "company_name": sd["company_name"],
+            "document_id": sd["main_document_id"],
+            "document_code": sd["main_document__document_code"],
+            "section_index": sd["section_index"],
+            "row_index": sd["row_index"],
+            "ref_code": sd["item_ref_code"],
+            "excerpt": sd["excerpt"] if "<b>" in (sd["excerpt"] or "") else None,
+            "score": round(sd["score"] or 0, 4),
+        }
+        for sd in sdocs.values(
+            "id", "identifier", "title", "company_name", "main_document_id",
+            "main_document__document_code", "section_index", "row_index",
+            "item_ref_code", "score", "excerpt",
+        )[:limit]
+    ]
+
+    return Response({"q": q, "rows": rows, "attachments": attachments})
+
 # ---------------------------------------------------------------------------
 # Missing exports required by backend/backend/urls.py
 # ---------------------------------------------------------------------------
@@ -2265,18 +2328,580 @@ def rekap_view(request, company_code: str, rekap_key: str):
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+def _document_export_entries(doc: Document):
+    """
+    Lazy (arcname, source) entries for the document ZIP export.
+    Files are opened one at a time while the archive streams; the manifest
+    (metadata only) is appended last.
+    """
+    root = doc.document_code
+    manifest = {
+        "document_code": doc.document_code,
+        "title": doc.title,
+        "company": doc.company,
+        "doc_type": doc.doc_type,
+        "status": doc.status,
+        "created_at": doc.created_at.isoformat() if doc.created_at else None,
+        "parsed_json": doc.parsed_json,
+        "main_file": None,
+        "supporting_documents": [],
+        "payment_proofs": [],
+    }
+
+    main_path = getattr(doc.file, "path", None) if doc.file else None
+    if main_path and os.path.exists(main_path):
+        arc = f"{root}/{os.path.basename(doc.file.name)}"
+        manifest["main_file"] = arc
+        yield arc, main_path
+
+    sdocs = (
+        SupportingDocument.objects.filter(main_document=doc)
+        .order_by("section_index", "row_index", "supporting_doc_sequence", "id")
+        .iterator(chunk_size=200)
+    )
+    for sdoc, path in _iter_sdoc_download_files(sdocs):
+        ext = os.path.splitext(path)[1].lower()
+        s_no = (sdoc.section_index or 0) + 1
+        r_no = (sdoc.row_index or 0) + 1
+        arc = f"{root}/lampiran/S{s_no}R{r_no}_{sdoc.identifier}{ext}"
+        manifest["supporting_documents"].append({
+            "identifier": sdoc.identifier,
+            "item_ref_code": sdoc.item_ref_code,
+            "section_index": sdoc.section_index,
+            "row_index": sdoc.row_index,
+            "sequence": sdoc.supporting_doc_sequence,
+            "title": sdoc.title,
+            "status": sdoc.status,
+            "approved_at": sdoc.approved_at.isoformat() if sdoc.approved_at else None,
+            "file": arc,
+        })
+        yield arc, path
+
+    proofs = (
+        PaymentProof.objects.filter(main_document=doc)
+        .order_by("section_index", "item_index", "payment_proof_sequence", "id")
+        .iterator(chunk_size=200)
+    )
+    for proof in proofs:
+        path = getattr(proof.file, "path", None)
+        if not path or not os.path.exists(path):
+            continue
+        ext = os.path.splitext(path)[1].lower()
+        arc = f"{root}/bukti_pembayaran/{proof.identifier}{ext}"
+        manifest["payment_proofs"].append({
+            "identifier": proof.identifier,
+            "section_index": proof.section_index,
+            "item_index": proof.item_index,
+            "sequence": proof.payment_proof_sequence,
+            "file": arc,
+        })
+        yield arc, path
+
+    yield f"{root}/manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+# --- Merged "full packet" PDF ------------------------------------------------
+
+PACKET_BUILD_LOCK_TTL = 60 * 30
+
+
+def _packet_sdocs(doc: Document):
+    return SupportingDocument.objects.filter(main_document=doc).order_by(
+        "section_index", "row_index", "supporting_doc_sequence", "id"
+    )
+
+
+def _file_sig(f) -> list:
+    path = getattr(f, "path", None) if f else None
+    if not path or not os.path.exists(path):
+        return [None]
+    st = os.stat(path)
+    return [f.name, st.st_mtime_ns, st.st_size]
+
+
+def _packet_bookmarks(doc: Document) -> dict:
+    """(section_index, row_index) -> bookmark title, from _row_ctx."""
+    marks = {}
+    for c in _row_ctx(doc.parsed_json):
+        headers = [str(h or "").strip().lower() for h in c["headers"]]
+        cells = c["cells"]
+        ket = ""
+        if "keterangan" in headers and headers.index("keterangan") < len(cells):
+            ket = re.sub(r"\s+", " ", str(cells[headers.index("keterangan")] or "")).strip()
+        title = f"S{c['section_index'] + 1}R{c['row_index'] + 1} · {c['ref_code']}"
+        marks[(c["section_index"], c["row_index"])] = f"{title} · {ket[:60]}" if ket else title
+    return marks
+
+
+def _packet_version(doc: Document) -> str:
+    """Hash of everything the merged PDF is built from (attachment set + labels)."""
+    parts = [doc.pk, _file_sig(doc.file), doc.table_pages, sorted(_packet_bookmarks(doc).items())]
+    for sdoc in _packet_sdocs(doc):
+        parts.append([
+            sdoc.pk, sdoc.section_index, sdoc.row_index, sdoc.supporting_doc_sequence,
+            _file_sig(sdoc.file), _stamp_overlay_text(sdoc),
+        ])
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def _packet_path(doc: Document, version: str) -> Path:
+    return Path(settings.PACKET_CACHE_DIR) / f"{doc.document_code}-{version[:16]}.pdf"
+
+
+def _is_packet_of(doc: Document, path: Path) -> bool:
+    """Exactly `<code>-<16 hex>.pdf`: revision packets (`<code>-R1-...`) are not this document's."""
+    return re.fullmatch(re.escape(doc.document_code) + r"-[0-9a-f]{16}\.pdf", path.name) is not None
+
+
+def _insert_as_pdf(out: fitz.Document, path: str, to_page: int | None = None) -> bool:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        with fitz.open(path) as src:
+            last = src.page_count - 1 if to_page is None else min(to_page, src.page_count - 1)
+            out.insert_pdf(src, to_page=last)
+        return True
+    if ext in {".png", ".jpg", ".jpeg"}:
+        with fitz.open(path) as img:
+            with fitz.open("pdf", img.convert_to_pdf()) as src:
+                out.insert_pdf(src)
+        return True
+    return False  # doc/xls attachments have no page representation
+
+
+def _build_document_packet(doc_id: int, job_id: str | None = None) -> str | None:
+    """Build (or reuse) the merged packet PDF for the current attachment set."""
+    doc = Document.objects.filter(pk=doc_id).first()
+    if not doc:
+        return None
+    version = _packet_version(doc)
+    final = _packet_path(doc, version)
+    if final.exists():
+        progress_update(job_id, 100, "Selesai")
+        return str(final)
+
+    try:
+        _write_document_packet(doc, final, job_id)
+    finally:
+        cache.delete(f"packet-build:{doc_id}:{version}")
+    return str(final) if final.exists() else None
+
+
+def _write_document_packet(doc: Document, final: Path, job_id: str | None):
+    progress_update(job_id, 5, "Menyusun paket PDF")
+    marks = _packet_bookmarks(doc)
+    sdocs = list(_packet_sdocs(doc))
+    out = fitz.open()
+    toc = []
+    try:
+        main_path = getattr(doc.file, "path", None) if doc.file else None
+        if main_path and os.path.exists(main_path):
+            recap_pages = doc.table_pages
+            if not recap_pages and main_path.lower().endswith(".pdf"):
+                # Legacy rows: everything that was not split out as an attachment
+                with fitz.open(main_path) as src:
+                    auto = sum(1 for s in sdocs if s.ai_auto_attached)
+                    recap_pages = max(1, src.page_count - auto)
+            if _insert_as_pdf(out, main_path, to_page=(recap_pages or 1) - 1):
+                toc.append([1, "Rekap", 1])
+
+        last_key = None
+        for i, (sdoc, path) in enumerate(_iter_sdoc_download_files(sdocs), 1):
+            start = out.page_count + 1
+            if not _insert_as_pdf(out, path):
+                continue
+            key = (sdoc.section_index, sdoc.row_index)
+            if key != last_key:
+                toc.append([1, marks.get(key) or f"Lampiran {sdoc.item_ref_code}", start])
+                last_key = key
+            progress_update(
+                job_id,
+                5 + int(90 * i / max(1, len(sdocs))),
+                "Menyusun paket PDF",
+                total_items=len(sdocs),
+                current_item=i,
+            )
+
+        if out.page_count == 0:
+            progress_update(job_id, 100, "Selesai (paket kosong)")
+            return
+        out.set_toc(toc)
+
+        final.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".pdf", dir=final.parent)
+        os.close(fd)
+        try:
+            out.save(tmp, garbage=3, deflate=True)
+            os.replace(tmp, final)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    finally:
+        out.close()
+
+    # Drop packets built for older attachment sets of this document.
+    for old in final.parent.glob(f"{glob.escape(doc.document_code)}-*.pdf"):
+        if old != final and _is_packet_of(doc, old):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    progress_update(job_id, 100, "Selesai")
+
+
+def _enqueue_packet_build(doc_id: int, version: str, job_id: str | None) -> bool:
+    """Queue one build per (document, version). Returns True if queued to Celery;
+    without a broker the packet is built inline and False is returned."""
+    from backend.celery import app as celery_app
+    from backend.tasks import build_packet_job
+
+    if celery_app.conf.broker_url:
+        if not cache.add(f"packet-build:{doc_id}:{version}", 1, timeout=PACKET_BUILD_LOCK_TTL):
+            return True  # already building
+        try:
+            build_packet_job.delay(doc_id, job_id)
+            return True
+        except Exception as e:
+            cache.delete(f"packet-build:{doc_id}:{version}")
+            logger.exception("Enqueue packet build failed, building inline: %s", e)
+
+    _build_document_packet(doc_id, job_id)
+    return False
+
+
+def _serve_packet(path: Path, filename: str):
+    """Hand the file to Nginx (X-Accel-Redirect) or stream it in dev."""
+    prefix = settings.PACKET_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        resp = HttpResponse(content_type="application/pdf")
+        resp["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{path.name}"
+        resp["Content-Disposition"] = f'inline; filename="{filename}"'
+        return resp
+    return FileResponse(open(path, "rb"), content_type="application/pdf", filename=filename)
+
+
+class DocumentCursorPagination(CursorPagination):
+    """Stable newest-first pages (`?ordering=created_at` for oldest-first)."""
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-created_at", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get("ordering") == "created_at":
+            return ("created_at", "id")
+        return self.ordering
+
+
+def _csv_param(request, name: str) -> list[str]:
+    raw = request.query_params.get(name) or ""
+    return [v.strip() for v in raw.split(",") if v.strip()]
+
+
+def _day_start(d: date) -> datetime:
+    return timezone.make_aware(datetime.combine(d, datetime.min.time()))
+
+
+def _filter_documents(qs, request):
+    """
+    Query-param filters for the document list (all optional, AND-ed):
+      company, doc_type, status   comma-separated values
+      archived                    true / false
+      from, to                    YYYY-MM-DD, inclusive, on created_at
+      code                        document_code prefix
+      q                           substring of title / document_code / description
+    """
+    params = request.query_params
+
+    for field in ("company", "doc_type", "status"):
+        values = _csv_param(request, field)
+        if len(values) == 1:
+            qs = qs.filter(**{field: values[0]})
+        elif values:
+            qs = qs.filter(**{f"{field}__in": values})
+
+    archived = (params.get("archived") or "").strip().lower()
+    if archived in ("1", "true", "yes"):
+        qs = qs.filter(archived=True)
+    elif archived in ("0", "false", "no"):
+        qs = qs.filter(archived=False)
+    elif archived:
+        raise ParseError("Parameter 'archived' harus true/false.")
+
+    from_str, to_str = params.get("from"), params.get("to")
+    date_from, date_to = _parse_ymd(from_str), _parse_ymd(to_str)
+    if (from_str and not date_from) or (to_str and not date_to):
+        raise ParseError("Parameter tanggal harus format YYYY-MM-DD.")
+    if date_from and date_to and date_from > date_to:
+        raise ParseError("Parameter 'from' tidak boleh lebih besar dari 'to'.")
+    # Half-open datetime range so the (…, created_at) indexes apply.
+    if date_from:
+        qs = qs.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        qs = qs.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+
+    code = (params.get("code") or "").strip().upper()
+    if code:
+        qs = qs.filter(document_code__startswith=code)
+
+    q = (params.get("q") or "").strip()
+    if q:
+        qs = qs.filter(
+            Q(title__icontains=q) | Q(document_code__icontains=q) | Q(description__icontains=q)
+        )
+
+    return qs
+
+
+def _document_stats(qs) -> dict:
+    """Counts and grand_total sums per status / company / doc type / month (SQL only)."""
+    qs = qs.order_by()
+    totals = qs.aggregate(
+        count=Count("id"),
+        grand_total=Sum("grand_total"),
+        pending_count=Count(
+            "id", filter=Q(archived=False, status__in=("draft", "belum_disetujui"))
+        ),
+        unpaid_count=Count("id", filter=Q(archived=False, status="disetujui")),
+        last_created_at=Max("created_at"),
+    )
+    totals["grand_total"] = totals["grand_total"] or 0
+
+    def grouped(*fields, **extra):
+        return [
+            {**row, "grand_total": row["grand_total"] or 0}
+            for row in qs.values(*fields)
+            .annotate(count=Count("id"), grand_total=Sum("grand_total"), **extra)
+            .order_by(*fields)
+        ]
+
+    by_month = [
+        {
+            "month": row["month"].strftime("%Y-%m"),
+            "count": row["count"],
+            "grand_total": row["grand_total"] or 0,
+        }
+        for row in qs.annotate(month=TruncMonth("created_at"))
+        .values("month")
+        .annotate(count=Count("id"), grand_total=Sum("grand_total"))
+        .order_by("month")
+    ]
+
+    return {
+        **totals,
+        "by_status": grouped("status"),
+        # last_archived_at: "last activity" of a company's archive folder
+        "by_company": grouped("company", last_archived_at=Max("archived_at")),
+        "by_doc_type": grouped("doc_type"),
+        "by_company_status": grouped("company", "status"),
+        "by_month": by_month,
+    }
+
+
+def _edit_version(request) -> int | None:
+    """The parsed_version a parsed_json edit was made against (None if missing)."""
+    try:
+        return int(request.data.get("version"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _version_error(doc: Document, version: int | None) -> Response | None:
+    """400 without a version, 409 when `doc` changed since it; None when current."""
+    if version is None:
+        return Response(
+            {"error": "version wajib diisi (angka)."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    if doc.parsed_version != version:
+        return Response(
+            {
+                "error": "Dokumen sudah diubah oleh pengguna lain. Muat ulang data.",
+                "version": doc.parsed_version,
+            },
+            status=drf_status.HTTP_409_CONFLICT,
+        )
+    return None
+
+
+class DocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """CRUD for main documents + a by-code lookup used by DocumentPreviewPage."""
 
     queryset = Document.objects.all().order_by("-created_at")
     serializer_class = DocumentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DocumentCursorPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == "list":
+            # parsed_json can be large; the list only needs the summary columns.
+            qs = _filter_documents(qs.defer("parsed_json"), self.request)
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return DocumentListSerializer
+        return DocumentSerializer
+
+    @action(detail=False, methods=["get"], url_path="stats")
+    def stats(self, request):
+        """
+        Dashboard counts / grand totals per status, company and month. Accepts
+        the same filters as the list; cached until the next Document write.
+        """
+        version = cache.get(STATS_VERSION_KEY) or 0
+        params = sorted((k, v) for k, v in request.query_params.items() if k != "format")
+        key = "documents:stats:%s:%s" % (
+            version,
+            hashlib.sha1(repr(params).encode()).hexdigest()[:16],
+        )
+        data = cache.get(key)
+        if data is None:
+            data = _document_stats(_filter_documents(Document.objects.all(), request))
+            cache.set(key, data, getattr(settings, "DOCUMENT_STATS_TTL", 300))
+        return Response(data)
 
     @action(detail=False, methods=["get"], url_path=r"by-code/(?P<code>[^/.]+)")
     def by_code(self, request, code=None):
-        doc = get_object_or_404(Document, document_code=code)
+        def respond():
+            doc = get_object_or_404(Document, document_code=code)
+            self.check_object_permissions(request, doc)
+            return Response(self.get_serializer(doc).data)
+
+        state = self._queryset_state(Document.objects.filter(document_code=code))
+        return self._conditional(request, state, respond)
+
+    def _bundle_response(self, request, **lookup):
+        # Constant query count however many rows / attachments / proofs the
+        # document has: document, attachments, proofs + find_duplicates.
+        doc = get_object_or_404(
+            Document.objects.prefetch_related(
+                Prefetch(
+                    "supporting_docs",
+                    queryset=SupportingDocument.objects.defer("content_text").order_by("supporting_doc_sequence", "id"),
+                ),
+                Prefetch("payment_proofs", queryset=PaymentProof.objects.order_by("payment_proof_sequence", "id")),
+            ),
+            **lookup,
+        )
         self.check_object_permissions(request, doc)
-        return Response(self.get_serializer(doc).data)
+        context = self.get_serializer_context()
+        return Response({
+            "document": DocumentSerializer(doc, context=context).data,
+            "supporting_docs": SupportingDocumentSerializer(doc.supporting_docs.all(), many=True, context=context).data,
+            "payment_proofs": PaymentProofSerializer(doc.payment_proofs.all(), many=True, context=context).data,
+            "duplicates": ParsedItem.find_duplicates(doc),
+        })
+
+    @action(detail=True, methods=["get"], url_path="bundle")
+    def bundle(self, request, pk=None):
+        """
+        Everything the document pages need in one round trip:
+        {"document", "supporting_docs", "payment_proofs", "duplicates"} (same
+        payloads as the detail / list / duplicates endpoints, ordered by
+        sequence).
+        """
+        return self._bundle_response(request, pk=pk)
+
+    @action(detail=False, methods=["get"], url_path=r"by-code/(?P<code>[^/.]+)/bundle")
+    def bundle_by_code(self, request, code=None):
+        return self._bundle_response(request, document_code=code)
+
+    @action(detail=True, methods=["get"], url_path="packet")
+    def packet(self, request, pk=None):
+        """
+        Merged "full packet" PDF: recap pages, then attachments ordered by
+        section/row/sequence, with one bookmark per item. Built once per
+        attachment-set version by a worker; 202 + job_id while it builds.
+        """
+        doc: Document = self.get_object()
+        version = _packet_version(doc)
+        path = _packet_path(doc, version)
+        if not path.exists():
+            job_id = request.headers.get("X-Job-ID") or f"packet-{doc.pk}-{version[:12]}"
+            if _enqueue_packet_build(doc.pk, version, job_id) or not path.exists():
+                return Response(
+                    {"status": "building", "job_id": job_id, "version": version},
+                    status=drf_status.HTTP_202_ACCEPTED,
+                )
+        return _serve_packet(path, f"{doc.document_code}.pdf")
+
+    @action(detail=True, methods=["get"], url_path="export-zip")
+    def export_zip(self, request, pk=None):
+        """
+        Stream a ZIP packet: main file, supporting documents (section/row/sequence
+        order), payment proofs and a manifest.json. Constant memory; no temp archive.
+        """
+        doc: Document = self.get_object()
+        resp = StreamingHttpResponse(iter_zip(_document_export_entries(doc)), content_type="application/zip")
+        resp["Content-Disposition"] = f'attachment; filename="{doc.document_code}.zip"'
+        resp["X-Accel-Buffering"] = "no"  # let Nginx pass chunks through
+        return resp
+
+    @action(detail=True, methods=["patch"], url_path="cells")
+    def cells(self, request, pk=None):
+        """
+        Cell-level edit of parsed_json (see parsed_patch for the op format):
+
+            {"version": <parsed_version read by the client>,
+             "ops": [{"op": "replace", "path": "/0/3/KETERANGAN", "value": "..."}]}
+
+        409 when the document changed since `version`. Returns only the changed
+        cells plus the touched sections' subtotals, the
+        grand total and the touched sections' possible duplicate payments
+        (see `duplicates`).
+        """
+        ops = request.data.get("ops")
+        version = _edit_version(request)
+
+        self.get_object()  # 404 / permission checks
+        with transaction.atomic():
+            doc = Document.objects.select_for_update().get(pk=pk)
+            if doc.archived or doc.status == "sudah_dibayar":
+                raise PermissionDenied(
+                    "Dokumen sudah diarsipkan/dibayar; tidak dapat diubah lagi."
+                )
+            error = _version_error(doc, version)
+            if error:
+                return error
+
+            parsed = doc.parsed_json or []
+            try:
+                changes, touched = apply_ops(parsed, ops)
+            except PatchError as e:
+                return Response({"error": str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+            if changes:
+                # Edited in place: only the touched sections are recomputed
+                doc.mark_sections_changed(touched)
+                doc.save(update_fields=["parsed_json", "updated_at"])
+
+        parsed = doc.parsed_json or []
+        return Response({
+            "version": doc.parsed_version,
+            "changes": changes,
+            "subtotals": {str(i): parsed[i].get("subtotal", "") for i in sorted(touched)},
+            "grand_total": next(
+                (sec["grand_total"] for sec in reversed(parsed) if "grand_total" in sec), ""
+            ),
+            "duplicates": ParsedItem.find_duplicates(doc, sections=touched) if changes else [],
+        })
+
+    @action(detail=True, methods=["get"], url_path="duplicates")
+    def duplicates(self, request, pk=None):
+        """
+        Rows that look like a payment already made elsewhere: same payee,
+        amount and key KETERANGAN words (ParsedItem.fingerprint) as a row of
+        another (non-rejected) document, or of this one.
+
+            {"rows": [{"section_index", "row_index", "ref_code",
+                       "matches": [{"document_id", "document_code", "status",
+                                    "section_index", "row_index", "ref_code"}]}]}
+        """
+        doc: Document = self.get_object()
+        return Response({"rows": ParsedItem.find_duplicates(doc)})
 
     def partial_update(self, request, *args, **kwargs):
         instance: Document = self.get_object()
@@ -2298,35 +2923,67 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     status=drf_status.HTTP_400_BAD_REQUEST,
                 )
 
-            pj = instance.parsed_json or []
-
-            for ref_code, pay_ref in refs.items():
-                ref_code_s = str(ref_code)
-                pay_ref_s = "" if pay_ref is None else str(pay_ref)
+            refs = {str(k): "" if v is None else str(v) for k, v in refs.items()}
 
-                for sec in pj:
-                    tbl = sec.get("table")
-                    if not tbl or len(tbl) < 2:
+            # Rows are addressed by REF_CODE, so no version is needed; the row
+            # lock keeps a concurrent cells/PATCH edit from being overwritten.
+            with transaction.atomic():
+                instance = Document.objects.select_for_update().get(pk=instance.pk)
+                if instance.archived or instance.status == "sudah_dibayar":
+                    raise PermissionDenied(
+                        "Dokumen sudah diarsipkan/dibayar; tidak dapat diubah lagi."
+                    )
+                pj = instance.parsed_json or []
+
+                # REF_CODE → (section, row) from the ParsedItem index: one pass
+                # over the addressed rows only.
+                locations = ParsedItem.objects.filter(
+                    document=instance, ref_code__in=list(refs)
+                ).values_list("ref_code", "section_index", "row_index")
+
+                touched = set()
+                for ref_code_s, s_idx, r_idx in locations:
+                    tbl = pj[s_idx].get("table") if s_idx < len(pj) and isinstance(pj[s_idx], dict) else None
+                    if not tbl or r_idx + 1 >= len(tbl):
                         continue
                     headers = tbl[0] or []
+                    row = tbl[r_idx + 1]
+                    ref_i = headers.index("REF_CODE") if "REF_CODE" in headers else len(headers) - 1
+                    if ref_i >= len(row) or str(row[ref_i]) != ref_code_s:
+                        continue  # parsed_json moved on; never write a wrong row
+
                     if "PAY_REF" not in headers:
                         headers.append("PAY_REF")
+                        # Pad the section once so r[pay_idx] exists for every row.
+                        for r in tbl[1:]:
+                            while len(r) < len(headers):
+                                r.append("")
                     pay_idx = headers.index("PAY_REF")
-
-                    # Pad all rows so r[pay_idx] exists.
-                    for r in tbl[1:]:
-                        while len(r) <= pay_idx:
-                            r.append("")
-
-                    # REF_CODE is always the last cell.
-                    for r in tbl[1:]:
-                        if r and str(r[-1]) == ref_code_s:
-                            r[pay_idx] = pay_ref_s
-
-            instance.parsed_json = pj
-            instance.save(update_fields=["parsed_json", "updated_at"])
+                    while len(row) <= pay_idx:
+                        row.append("")
+                    row[pay_idx] = refs[ref_code_s]
+                    touched.add(s_idx)
+
+                if touched:
+                    instance.mark_sections_changed(touched)
+                    instance.save(update_fields=["parsed_json", "updated_at"])
             return Response(self.get_serializer(instance).data)
 
+        # Whole parsed_json (section add/remove, subtotal edits): same optimistic
+        # lock as `cells`, so a stale table never overwrites newer edits.
+        if "parsed_json" in request.data:
+            version = _edit_version(request)
+            with transaction.atomic():
+                locked = Document.objects.select_for_update().get(pk=instance.pk)
+                error = _version_error(locked, version)
+                if error:
+                    return error
+                serializer = self.get_serializer(locked, data=request.data, partial=True)
+                serializer.is_valid(raise_exception=True)
+                self.perform_update(serializer)
+            # Rows may have moved between sections: flags for the whole document
+            return Response({**serializer.data, "duplicates": ParsedItem.find_duplicates(locked)})
+
         return super().partial_update(request, *args, **kwargs)
 
     def perform_update(self, serializer):
@@ -2360,8 +3017,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
             obj.save(update_fields=fields)
 
 
-class SupportingDocumentViewSet(viewsets.ModelViewSet):
-    queryset = SupportingDocument.objects.all().order_by("supporting_doc_sequence")
+class SupportingDocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = SupportingDocument.objects.defer("content_text").order_by("supporting_doc_sequence")
     serializer_class = SupportingDocumentSerializer
     permission_classes = [IsAuthenticated]
 
@@ -2390,7 +3047,8 @@ class SupportingDocumentViewSet(viewsets.ModelViewSet):
             .first()
             or 0
         )
-        serializer.save(supporting_doc_sequence=int(last) + 1)
+        obj = serializer.save(supporting_doc_sequence=int(last) + 1)
+        transaction.on_commit(lambda: _enqueue_text_index([obj.pk]))
 
     def perform_update(self, serializer):
         instance: SupportingDocument = serializer.instance
@@ -2402,15 +3060,67 @@ class SupportingDocumentViewSet(viewsets.ModelViewSet):
         with transaction.atomic():
             obj: SupportingDocument = serializer.save()
 
-            # On transition -> approved: stamp file bytes, then set approved_at
+            # On transition -> approved: record approved_at now; the stamp is
+            # burned into the file after commit (file I/O outside the txn).
             if prev_status != obj.status and obj.status == "disetujui":
+                obj.approved_at = timezone.now()
+                obj.save(update_fields=["approved_at"])
+                transaction.on_commit(lambda: _enqueue_stamping([obj.pk]))
+
+    @action(detail=False, methods=["post"], url_path="bulk-approve")
+    def bulk_approve(self, request):
+        """
+        Approve many supporting documents in one transaction.
+
+        Body: { ids: [<sdoc id>, ...] }   (optional X-Job-ID header for progress)
+        Stamping runs after commit in the Celery `stamp` queue; poll
+        /api/progress/<job_id>/ for "Menstempel dokumen pendukung" ticks.
+        """
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {"error": "ids harus berupa list id dokumen pendukung."},
+                status=drf_status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            ids = sorted({int(i) for i in ids})
+        except (TypeError, ValueError):
+            return Response({"error": "ids harus berupa angka."}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        job_id = request.headers.get("X-Job-ID") or request.data.get("job_id")
+
+        with transaction.atomic():
+            sdocs = list(
+                SupportingDocument.objects.select_for_update(of=("self",))
+                .select_related("main_document")
+                .filter(pk__in=ids)
+            )
+            found = {s.pk for s in sdocs}
+            missing = [i for i in ids if i not in found]
+            if missing:
+                return Response(
+                    {"error": "Dokumen pendukung tidak ditemukan.", "missing": missing},
+                    status=drf_status.HTTP_404_NOT_FOUND,
+                )
+            for s in sdocs:
+                self._ensure_editable(s.main_document)
+
+            to_approve = sorted(s.pk for s in sdocs if s.status != "disetujui")
+            already = sorted(s.pk for s in sdocs if s.status == "disetujui")
+            if to_approve:
                 now = timezone.now()
+                SupportingDocument.objects.filter(pk__in=to_approve).update(
+                    status="disetujui", approved_at=now, updated_at=now
+                )
+                transaction.on_commit(lambda: _enqueue_stamping(to_approve, job_id))
 
-                # Embed the approval stamp into the stored PDF/image
-                _stamp_supporting_doc_file_in_place(obj, now)
+        if not to_approve:
+            progress_update(job_id, 100, "Selesai", total_items=0, current_item=0)
 
-                obj.approved_at = now
-                obj.save(update_fields=["approved_at"])
+        return Response(
+            {"approved": to_approve, "already_approved": already, "job_id": job_id},
+            status=drf_status.HTTP_202_ACCEPTED,
+        )
 
     def destroy(self, request, *args, **kwargs):
         instance: SupportingDocument = self.get_object()
@@ -2422,14 +3132,6 @@ class SupportingDocumentViewSet(viewsets.ModelViewSet):
 
 # --- Supporting document stamping (embed stamp into stored PDF/image) -------
 
-STAMP_TEXT = "DISETUJUI"
-STAMP_COLOR_IMG = (0, 160, 0)  # RGB for Pillow
-STAMP_COLOR_PDF = (0, 0.62, 0)  # RGB floats 0..1 for PyMuPDF
-
-FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-FONT_REG = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-
-
 def _stamp_dt(dt):
     # dd-mm-YYYY HH:MM
     return timezone.localtime(dt).strftime("%d-%m-%Y %H:%M")
@@ -2437,37 +3139,7 @@ def _stamp_dt(dt):
 
 def _stamp_image_in_place(path: str, approved_at):
     with Image.open(path) as im:
-        im = ImageOps.exif_transpose(im)
-
-        # work in RGB
-        if im.mode not in ("RGB", "L"):
-            im = im.convert("RGB")
-        elif im.mode == "L":
-            im = im.convert("RGB")
-
-        draw = ImageDraw.Draw(im)
-
-        # scale font sizes with image width
-        big = max(24, int(im.width * 0.06))
-        small = max(14, int(big * 0.45))
-
-        try:
-            f_big = ImageFont.truetype(FONT_BOLD, big)
-            f_small = ImageFont.truetype(FONT_REG, small)
-        except Exception:
-            f_big = ImageFont.load_default()
-            f_small = ImageFont.load_default()
-
-        x = max(12, im.width // 80)
-        y = x
-
-        draw.text((x, y), STAMP_TEXT, fill=STAMP_COLOR_IMG, font=f_big)
-        draw.text(
-            (x, y + big + (x // 2)),
-            _stamp_dt(approved_at),
-            fill=STAMP_COLOR_IMG,
-            font=f_small,
-        )
+        im = draw_stamp(ImageOps.exif_transpose(im), _stamp_dt(approved_at))
 
         ext = os.path.splitext(path)[1].lower()
         fd, tmp = tempfile.mkstemp(suffix=ext)
@@ -2488,24 +3160,15 @@ def _stamp_image_in_place(path: str, approved_at):
 
 
 def _stamp_pdf_in_place(path: str, approved_at):
-    dt_str = _stamp_dt(approved_at)
-
     pdf = fitz.open(path)
     try:
-        for page in pdf:
-            w = float(page.rect.width)
-            fs_big = max(18.0, w * 0.05)  # roughly scales with page size
-            fs_small = max(10.0, fs_big * 0.45)
-
-            x = 36
-            y = 36
-            page.insert_text((x, y), STAMP_TEXT, fontsize=fs_big, color=STAMP_COLOR_PDF)
-            page.insert_text(
-                (x, y + fs_big + 2),
-                dt_str,
-                fontsize=fs_small,
-                color=STAMP_COLOR_PDF,
-            )
+        stamp_pdf_pages(pdf, _stamp_dt(approved_at))
+
+        # Incremental save only appends the changed objects instead of
+        # rewriting (and garbage-collecting) the whole file.
+        if pdf.can_save_incrementally():
+            pdf.save(path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            return
 
         fd, tmp = tempfile.mkstemp(suffix=".pdf")
         os.close(fd)
@@ -2540,6 +3203,193 @@ def _stamp_supporting_doc_file_in_place(sdoc: SupportingDocument, approved_at):
     return False
 
 
+# --- Render-time stamp overlay (STAMP_MODE=overlay) -------------------------
+
+PREVIEW_VARIANT_TTL = 60 * 60 * 24  # 1d
+STAMPED_VARIANT_DIR = "stamped"
+STAMPABLE_EXTS = {".pdf", ".png", ".jpg", ".jpeg"}
+
+
+def _stamp_overlay_text(sdoc: SupportingDocument) -> str | None:
+    """Stamp text to composite at render time, or None if not approved / already burned in."""
+    if sdoc.status != "disetujui" or not sdoc.approved_at or sdoc.stamped_at:
+        return None
+    return _stamp_dt(sdoc.approved_at)
+
+
+def _sdoc_download_path(sdoc: SupportingDocument) -> str:
+    """
+    Path to serve for a supporting document: the stored file, or a lazily built
+    stamped copy under MEDIA_ROOT/stamped/ (one per file version + stamp).
+    """
+    path = getattr(sdoc.file, "path", None)
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Supporting document file not found on disk.")
+
+    stamp = _stamp_overlay_text(sdoc)
+    ext = os.path.splitext(path)[1].lower()
+    if not stamp or ext not in STAMPABLE_EXTS:
+        return path
+
+    st = os.stat(path)
+    tag = hashlib.sha1(f"{st.st_mtime_ns}-{st.st_size}-{stamp}".encode()).hexdigest()[:16]
+    out_dir = Path(settings.MEDIA_ROOT) / STAMPED_VARIANT_DIR
+    out = out_dir / f"{sdoc.pk}-{tag}{ext}"
+    if not out.exists():
+        out_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=ext, dir=out_dir)
+        os.close(fd)
+        try:
+            write_stamped_copy(path, tmp, stamp)
+            os.replace(tmp, out)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return str(out)
+
+
+def _iter_sdoc_download_files(sdocs):
+    """Yield (sdoc, path) pairs; stamped variants are built only as the consumer
+    reaches them, so a batch download streams instead of stamping up front."""
+    for sdoc in sdocs:
+        try:
+            yield sdoc, _sdoc_download_path(sdoc)
+        except FileNotFoundError:
+            logger.warning("sdoc=%s file missing; skipped", sdoc.pk)
+
+
+def _stamp_approved_supporting_doc(sdoc_id: int) -> bool:
+    """
+    Burn the approval stamp into an approved attachment (idempotent).
+    Runs in the Celery `stamp` queue (or inline when no broker is configured).
+    """
+    lock_key = f"stamp-lock:{sdoc_id}"
+    if not cache.add(lock_key, 1, timeout=600):
+        return False
+    try:
+        sdoc = SupportingDocument.objects.filter(pk=sdoc_id).first()
+        if not sdoc or sdoc.status != "disetujui" or sdoc.stamped_at:
+            return False
+        approved_at = sdoc.approved_at or timezone.now()
+        if _stamp_supporting_doc_file_in_place(sdoc, approved_at):
+            _refresh_sdoc_preview(sdoc)
+        now = timezone.now()
+        SupportingDocument.objects.filter(pk=sdoc_id).update(stamped_at=now, updated_at=now)
+        return True
+    finally:
+        cache.delete(lock_key)
+
+
+def _stamp_done_key(job_id: str) -> str:
+    return f"{_pkey(job_id)}:stamped"
+
+
+def _stamp_progress_tick(job_id: str | None, total: int):
+    if not job_id:
+        return
+    try:
+        done = cache.incr(_stamp_done_key(job_id))
+    except ValueError:
+        done = total
+    if done >= total:
+        progress_update(job_id, 100, "Selesai", total_items=total, current_item=total)
+    else:
+        progress_update(
+            job_id,
+            int(100 * done / max(1, total)),
+            "Menstempel dokumen pendukung",
+            total_items=total,
+            current_item=done,
+        )
+
+
+def _enqueue_stamping(sdoc_ids: list[int], job_id: str | None = None):
+    """Fan stamping out to the Celery `stamp` queue; inline if no broker is set.
+
+    With STAMP_MODE=overlay nothing is written: approval stays metadata-only and
+    previews/downloads composite the stamp at render time.
+    """
+    from backend.celery import app as celery_app
+    from backend.tasks import stamp_supporting_doc_job
+
+    total = len(sdoc_ids)
+    if not total:
+        return
+    if settings.STAMP_MODE == "overlay":
+        progress_update(job_id, 100, "Selesai", total_items=total, current_item=total)
+        return
+    if job_id:
+        cache.set(_stamp_done_key(job_id), 0, timeout=PROGRESS_TTL)
+        progress_update(job_id, 0, "Menstempel dokumen pendukung", total_items=total, current_item=0)
+
+    if celery_app.conf.broker_url:
+        try:
+            from celery import group
+
+            group(stamp_supporting_doc_job.s(pk, job_id, total) for pk in sdoc_ids).apply_async()
+            return
+        except Exception as e:
+            logger.exception("Enqueue stamping failed, stamping inline: %s", e)
+
+    for pk in sdoc_ids:
+        try:
+            _stamp_approved_supporting_doc(pk)
+        except Exception as e:
+            logger.exception("Stamping sdoc=%s failed: %s", pk, e)
+        _stamp_progress_tick(job_id, total)
+
+
+def _index_supporting_doc_text(sdoc_id: int, ocr: bool = True) -> bool:
+    """
+    Fill SupportingDocument.content_text from the stored file: the PDF text
+    layer, else local OCR (when `ocr`). No-op when enough text was already
+    captured.
+    """
+    sdoc = SupportingDocument.objects.filter(pk=sdoc_id).only("id", "file", "content_text").first()
+    if not sdoc or not sdoc.file or not needs_ocr(sdoc.content_text):
+        return False
+    try:
+        path = sdoc.file.path
+        text = file_text(path)
+        if ocr and needs_ocr(text):
+            text = ocr_file_text(path) or text
+    except Exception as e:
+        logger.warning("Text index sdoc=%s failed: %s", sdoc_id, e)
+        return False
+    if not text or text == sdoc.content_text:
+        return False
+    SupportingDocument.objects.filter(pk=sdoc_id).update(content_text=text)
+    return True
+
+
+def _enqueue_text_index(sdoc_ids: list[int], ocr_inline: bool = False):
+    """
+    OCR / text capture for attachments in the Celery `parse` queue. Without a
+    broker only the text layer is read inline: OCR takes seconds per page and
+    must not run inside an upload request (the index_attachment_text command
+    passes `ocr_inline` to OCR what is left).
+    """
+    from backend.celery import app as celery_app
+    from backend.tasks import index_supporting_doc_text_job
+
+    if not sdoc_ids:
+        return
+    if celery_app.conf.broker_url:
+        try:
+            from celery import group
+
+            group(index_supporting_doc_text_job.s(pk) for pk in sdoc_ids).apply_async()
+            return
+        except Exception as e:
+            logger.exception("Enqueue text index failed, indexing inline: %s", e)
+
+    for pk in sdoc_ids:
+        try:
+            _index_supporting_doc_text(pk, ocr=ocr_inline)
+        except Exception as e:
+            logger.exception("Text index sdoc=%s failed: %s", pk, e)
+
+
 def _clamp_int(v, default: int, lo: int, hi: int) -> int:
     try:
         i = int(v)
@@ -2548,6 +3398,110 @@ def _clamp_int(v, default: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, i))
 
 
+def _preview_params(request) -> tuple[int, str]:
+    """Parse ?w= and ?fmt= (falls back to Accept negotiation)."""
+    w = _clamp_int(request.GET.get("w"), default=640, lo=120, hi=1600)
+    fmt = (request.GET.get("fmt") or "").strip().lower()
+    if fmt not in {"webp", "jpeg", "jpg"}:
+        accept = (request.headers.get("Accept") or "").lower()
+        fmt = "webp" if "image/webp" in accept else "jpeg"
+    if fmt == "jpg":
+        fmt = "jpeg"
+    return w, fmt
+
+
+def _preview_response(
+    request,
+    path: str,
+    *,
+    etag_prefix: str = "",
+    log_name: str = "preview",
+    passthrough: str | None = None,
+    stamp: str | None = None,
+):
+    """Shared body of the preview endpoints: ETag check + pooled render.
+
+    `passthrough` is a content type: the file at `path` is already encoded at
+    (about) the requested size/format and is returned byte-for-byte.
+    `stamp` composites the approval stamp at render time; those variants are
+    cached (keyed by ETag) so the overlay is only drawn once per size/format.
+    """
+    w, fmt = _preview_params(request)
+
+    # Cheap ETag based on file stat + requested transform.
+    st = os.stat(path)
+    variant = f"{etag_prefix}{st.st_mtime_ns}-{st.st_size}-{w}-{fmt}"
+    if stamp:
+        variant += f"-stamp:{stamp}"
+    etag = hashlib.sha1(variant.encode()).hexdigest()
+    if (request.headers.get("If-None-Match") or "") == etag:
+        resp = HttpResponse(status=304)
+        resp["ETag"] = etag
+        return resp
+
+    cache_key = f"preview:{etag}" if stamp else None
+    cached = cache.get(cache_key) if cache_key else None
+
+    try:
+        if cached:
+            data, content_type = cached
+        elif passthrough and not stamp:
+            with open(path, "rb") as fh:
+                data, content_type = fh.read(), passthrough
+        else:
+            data, content_type = render_preview(path, w, fmt, stamp=stamp)
+            if cache_key:
+                cache.set(cache_key, (data, content_type), timeout=PREVIEW_VARIANT_TTL)
+    except RenderBusy as e:
+        resp = HttpResponse(status=503)
+        resp["Retry-After"] = str(e.retry_after)
+        return resp
+    except Exception as e:
+        logger.exception("%s failed: %s", log_name, e)
+        return HttpResponse(status=500)
+
+    resp = HttpResponse(data, content_type=content_type)
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "public, max-age=86400"
+    return resp
+
+
+# Stored previews may be slightly narrower than the requested width (144dpi A4
+# renders ~1190px); serve them as long as they are within this ratio.
+STORED_PREVIEW_MIN_RATIO = 0.9
+
+
+def _usable_stored_preview(sdoc: SupportingDocument, src_path: str, w: int):
+    """(path, width) of sdoc.preview_image if it is fresh and wide enough, else None."""
+    pv = sdoc.preview_image
+    pv_path = getattr(pv, "path", None) if pv else None
+    if not pv_path or not os.path.exists(pv_path):
+        return None
+    # Stale: the source was rewritten (e.g. stamped) after the preview was made.
+    if os.stat(pv_path).st_mtime_ns < os.stat(src_path).st_mtime_ns:
+        return None
+    try:
+        pv_width = image_width(pv_path)
+    except Exception:
+        return None
+    if pv_width < w * STORED_PREVIEW_MIN_RATIO:
+        return None
+    return pv_path, pv_width
+
+
+def _refresh_sdoc_preview(sdoc: SupportingDocument):
+    """Re-render sdoc.preview_image from the (changed) source file."""
+    path = getattr(sdoc.file, "path", None)
+    if not path or not os.path.exists(path):
+        return
+    stem = os.path.splitext(os.path.basename(path))[0]
+    fileobj, ext = preview_file_from_source(path, stem, settings.PREVIEW_IMAGE_MAX_WIDTH)
+    if sdoc.preview_image:
+        sdoc.preview_image.delete(save=False)
+    sdoc.preview_image.save(f"{stem}{ext}", fileobj, save=False)
+    sdoc.save(update_fields=["preview_image"])
+
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def sdoc_preview(request, pk: int):
@@ -2566,63 +3520,48 @@ def sdoc_preview(request, pk: int):
     if not path or not os.path.exists(path):
         return HttpResponse(status=404)
 
-    w = _clamp_int(request.GET.get("w"), default=640, lo=120, hi=1600)
-    fmt = (request.GET.get("fmt") or "").strip().lower()
-    if fmt not in {"webp", "jpeg", "jpg"}:
-        accept = (request.headers.get("Accept") or "").lower()
-        fmt = "webp" if "image/webp" in accept else "jpeg"
-    if fmt == "jpg":
-        fmt = "jpeg"
+    # Prefer the ingestion-time preview_image: decoding a ~1200px WEBP is far
+    # cheaper than rasterizing the PDF again.
+    w, fmt = _preview_params(request)
+    stamp = _stamp_overlay_text(sdoc)
+    stored = _usable_stored_preview(sdoc, path, w)
+    if stored:
+        pv_path, pv_width = stored
+        pv_fmt = "webp" if pv_path.lower().endswith(".webp") else "jpeg"
+        passthrough = f"image/{pv_fmt}" if pv_fmt == fmt and pv_width <= w else None
+        return _preview_response(
+            request,
+            pv_path,
+            etag_prefix="pv-",
+            log_name="sdoc_preview",
+            passthrough=passthrough,
+            stamp=stamp,
+        )
 
-    # Cheap ETag based on file stat + requested transform.
-    st = os.stat(path)
-    etag = hashlib.sha1(f"{st.st_mtime_ns}-{st.st_size}-{w}-{fmt}".encode()).hexdigest()
-    if (request.headers.get("If-None-Match") or "") == etag:
-        resp = HttpResponse(status=304)
-        resp["ETag"] = etag
-        return resp
+    return _preview_response(request, path, log_name="sdoc_preview", stamp=stamp)
 
-    ext = os.path.splitext(path)[1].lower()
-    try:
-        if ext == ".pdf":
-            pdf = fitz.open(path)
-            page = pdf.load_page(0)
-            zoom = w / max(1.0, float(page.rect.width))
-            zoom = max(0.2, min(6.0, zoom))
-            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            pdf.close()
-        else:
-            img = Image.open(path)
-            img = ImageOps.exif_transpose(img)
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-            # Resize only if larger.
-            if img.width > w:
-                h = int(img.height * (w / img.width))
-                img = img.resize((w, max(1, h)), Image.LANCZOS)
-
-        buf = io.BytesIO()
-        if fmt == "webp":
-            try:
-                img.save(buf, format="WEBP", quality=78, method=6)
-                content_type = "image/webp"
-            except Exception:
-                buf = io.BytesIO()
-                img.save(buf, format="JPEG", quality=80, optimize=True)
-                content_type = "image/jpeg"
-        else:
-            img.save(buf, format="JPEG", quality=80, optimize=True)
-            content_type = "image/jpeg"
 
-        data = buf.getvalue()
-        resp = HttpResponse(data, content_type=content_type)
-        resp["ETag"] = etag
-        resp["Cache-Control"] = "public, max-age=86400"
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def sdoc_download(request, pk: int):
+    """Serve a supporting document file, with the approval stamp composited
+    when it has not been burned into the stored file (STAMP_MODE=overlay).
+    Both the stored file and the stamped copy live under MEDIA_ROOT, so Nginx
+    sends the bytes when MEDIA_ACCEL_REDIRECT_PREFIX is set."""
+    sdoc = get_object_or_404(SupportingDocument, pk=pk)
+    try:
+        path = _sdoc_download_path(sdoc)
+    except FileNotFoundError:
+        return HttpResponse(status=404)
+    filename = os.path.basename(sdoc.file.name)
+    prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        rel = Path(path).resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+        resp = HttpResponse(content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        resp["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{rel.as_posix()}"
+        resp["Content-Disposition"] = f'inline; filename="{filename}"'
         return resp
-    except Exception as e:
-        logger.exception("sdoc_preview failed: %s", e)
-        return HttpResponse(status=500)
+    return FileResponse(open(path, "rb"), filename=filename)
 
 
 @api_view(["GET"])
@@ -2639,62 +3578,7 @@ def payment_proof_preview(request, pk: int):
     if not path or not os.path.exists(path):
         return HttpResponse(status=404)
 
-    w = _clamp_int(request.GET.get("w"), default=640, lo=120, hi=1600)
-
-    fmt = (request.GET.get("fmt") or "").strip().lower()
-    if fmt not in {"webp", "jpeg", "jpg"}:
-        accept = (request.headers.get("Accept") or "").lower()
-        fmt = "webp" if "image/webp" in accept else "jpeg"
-    if fmt == "jpg":
-        fmt = "jpeg"
-
-    st = os.stat(path)
-    etag = hashlib.sha1(f"pp-{st.st_mtime_ns}-{st.st_size}-{w}-{fmt}".encode()).hexdigest()
-    if (request.headers.get("If-None-Match") or "") == etag:
-        resp = HttpResponse(status=304)
-        resp["ETag"] = etag
-        return resp
-
-    ext = os.path.splitext(path)[1].lower()
-    try:
-        if ext == ".pdf":
-            pdf = fitz.open(path)
-            page = pdf.load_page(0)
-            zoom = w / max(1.0, float(page.rect.width))
-            zoom = max(0.2, min(6.0, zoom))
-            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            pdf.close()
-        else:
-            img = Image.open(path)
-            img = ImageOps.exif_transpose(img)
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-            if img.width > w:
-                h = int(img.height * (w / img.width))
-                img = img.resize((w, max(1, h)), Image.LANCZOS)
-
-        buf = io.BytesIO()
-        if fmt == "webp":
-            try:
-                img.save(buf, format="WEBP", quality=78, method=6)
-                content_type = "image/webp"
-            except Exception:
-                buf = io.BytesIO()
-                img.save(buf, format="JPEG", quality=80, optimize=True)
-                content_type = "image/jpeg"
-        else:
-            img.save(buf, format="JPEG", quality=80, optimize=True)
-            content_type = "image/jpeg"
-
-        data = buf.getvalue()
-        resp = HttpResponse(data, content_type=content_type)
-        resp["ETag"] = etag
-        resp["Cache-Control"] = "public, max-age=86400"
-        return resp
-    except Exception as e:
-        logger.exception("payment_proof_preview failed: %s", e)
-        return HttpResponse(status=500)
+    return _preview_response(request, path, etag_prefix="pp-", log_name="payment_proof_preview")
 
 
 @api_view(["GET"])
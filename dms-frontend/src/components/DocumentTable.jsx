@@ -1,9 +1,11 @@
 // File: src/components/DocumentTable.jsx
-import React, { useState, useCallback, useEffect } from 'react';
+import React, { useState, useCallback, useEffect, useRef } from 'react';
 import {Paper,Table,TableBody,TableCell,TableContainer,TableHead,TableRow,IconButton,Collapse,Box,Typography,Dialog,DialogTitle,DialogContent,DialogContentText,
   DialogActions,
   Button,
   TextField,
+  Snackbar,
+  Alert,
 } from '@mui/material';
 
 import {
@@ -30,6 +32,7 @@ import PendingActionsOutlinedIcon from '@mui/icons-material/PendingActionsOutlin
 import TaskAltOutlinedIcon from '@mui/icons-material/TaskAltOutlined';
 import HighlightOffOutlinedIcon from '@mui/icons-material/HighlightOffOutlined';
 import PaidOutlinedIcon from '@mui/icons-material/PaidOutlined';
+import WarningAmberIcon from '@mui/icons-material/WarningAmber';
 import { Tooltip } from '@mui/material';
 import API from '../services/api';
 import {
@@ -48,6 +51,41 @@ import {
 import MissingDocsDialog from './MissingDocsDialog';
 import { useTheme } from '@mui/material/styles';
 
+// Apply a /documents/:id/cells/ response ({ changes, subtotals,
+// grand_total }) to a local parsed_json copy.
+function applyCellChanges(sections, data) {
+  const next = JSON.parse(JSON.stringify(sections || []));
+  for (const ch of data.changes || []) {
+    const tbl = next[ch.section]?.table;
+    if (!tbl) continue;
+    if (ch.op === 'replace') {
+      const row = tbl[ch.row + 1];
+      const col = tbl[0].indexOf(ch.column);
+      if (row && col !== -1) row[col] = ch.value;
+    } else if (ch.op === 'add') {
+      tbl.splice(ch.row + 1, 0, ch.value);
+    } else if (ch.op === 'remove') {
+      tbl.splice(ch.row + 1, 1);
+    }
+  }
+  Object.entries(data.subtotals || {}).forEach(([idx, val]) => {
+    if (next[idx]) next[idx].subtotal = val;
+  });
+  const gt = next.find((sec) => sec.hasOwnProperty('grand_total'));
+  if (gt && data.grand_total !== undefined) gt.grand_total = data.grand_total;
+  return next;
+}
+
+// { "<section>-<row>": { matches, match_count } } from a /duplicates/ (or
+// cells / PATCH) row list; matches holds only the newest few.
+function duplicatesByRow(rows) {
+  const out = {};
+  for (const r of rows || []) {
+    out[`${r.section_index}-${r.row_index}`] = { matches: r.matches, match_count: r.match_count };
+  }
+  return out;
+}
+
 function DocumentTable({ documents, refreshDocuments }) {
   const theme = useTheme();
   const isDark = theme.palette.mode === 'dark';
@@ -55,6 +93,12 @@ function DocumentTable({ documents, refreshDocuments }) {
   const [itemDocsExpandedMap, setItemDocsExpandedMap] = useState({});
   const [supportingDocs, setSupportingDocs] = useState({});
   const [parsedSectionsMap, setParsedSectionsMap] = useState({});
+  // parsed_version per document, read when an edit is sent (not when it was
+  // queued) so edits queued behind each other carry the latest version.
+  const parsedVersionsRef = useRef({});
+  const editQueueRef = useRef({});
+  const [editNotice, setEditNotice] = useState(null); // { severity, message }
+  const [duplicatesMap, setDuplicatesMap] = useState({});
   const [editDocId, setEditDocId] = useState(null);
   // Dialog states
   const [confirmDialogOpen, setConfirmDialogOpen] = useState(false);
@@ -201,22 +245,15 @@ function DocumentTable({ documents, refreshDocuments }) {
         return newState;
       });
     } else {
-      if (!supportingDocs[docId]) {
-        API.get('/supporting-docs/', { params: { main_document: docId } })
-          .then((res) => setSupportingDocs((old) => ({ ...old, [docId]: res.data })))
-          .catch(console.error);
-      }
-      if (!parsedSectionsMap[docId]) {
-        API.get(`/documents/${docId}/`)
-          .then((res) =>
-            setParsedSectionsMap((old) => ({ ...old, [docId]: res.data.parsed_json || [] }))
-          )
-          .catch(console.error);
-      }
-      // --- fetch payment proofs if needed ---
-      if (!paymentProofs[docId]) {
-        API.get('/payment-proofs/', { params: { main_document: docId } })
-          .then((res) => setPaymentProofs((old) => ({ ...old, [docId]: res.data })))
+      // Document, attachments and payment proofs in one round trip
+      if (!supportingDocs[docId] || !parsedSectionsMap[docId] || !paymentProofs[docId]) {
+        API.get(`/documents/${docId}/bundle/`)
+          .then((res) => {
+            rememberParsed(docId, res.data.document);
+            setSupportingDocs((old) => ({ ...old, [docId]: res.data.supporting_docs }));
+            setPaymentProofs((old) => ({ ...old, [docId]: res.data.payment_proofs }));
+            setDuplicatesMap((old) => ({ ...old, [docId]: duplicatesByRow(res.data.duplicates) }));
+          })
           .catch(console.error);
       }
       setExpandedRows((prev) => [...prev, docId]);
@@ -225,6 +262,68 @@ function DocumentTable({ documents, refreshDocuments }) {
   }
   
 
+  function rememberParsed(docId, data) {
+    setParsedSectionsMap((old) => ({ ...old, [docId]: data.parsed_json || [] }));
+    parsedVersionsRef.current[docId] = data.parsed_version;
+  }
+
+  async function reloadParsed(docId) {
+    const res = await API.get(`/documents/${docId}/`);
+    rememberParsed(docId, res.data);
+  }
+
+  // parsed_json writes of one document run one at a time, each with the
+  // version the previous one returned. A failed edit reloads the server copy
+  // and tells the user it was not saved.
+  function queueParsedEdit(docId, send) {
+    const prev = editQueueRef.current[docId] || Promise.resolve();
+    const next = prev.then(async () => {
+      try {
+        await send(parsedVersionsRef.current[docId]);
+      } catch (error) {
+        console.error(error);
+        const conflict = error?.response?.status === 409;
+        setEditNotice({
+          severity: conflict ? 'warning' : 'error',
+          message: conflict
+            ? 'Dokumen sudah diubah oleh pengguna lain; perubahan Anda tidak tersimpan. Data terbaru sudah dimuat ulang.'
+            : error?.response?.data?.error ||
+              error?.response?.data?.detail ||
+              'Gagal menyimpan perubahan; data dimuat ulang.',
+        });
+        await reloadParsed(docId).catch(console.error);
+      }
+    });
+    editQueueRef.current[docId] = next;
+    return next;
+  }
+
+  // Cell-level edit
+  function patchCells(docId, ops) {
+    return queueParsedEdit(docId, async (version) => {
+      const res = await API.patch(`/documents/${docId}/cells/`, { version, ops });
+      setParsedSectionsMap((old) => ({ ...old, [docId]: applyCellChanges(old[docId], res.data) }));
+      parsedVersionsRef.current[docId] = res.data.version;
+      // Duplicates come back for the touched sections only
+      const touched = Object.keys(res.data.subtotals || {});
+      setDuplicatesMap((old) => {
+        const kept = Object.fromEntries(
+          Object.entries(old[docId] || {}).filter(([key]) => !touched.includes(key.split('-')[0]))
+        );
+        return { ...old, [docId]: { ...kept, ...duplicatesByRow(res.data.duplicates) } };
+      });
+    });
+  }
+
+  // Whole-parsed_json edit (sections, subtotals); same version check as cells.
+  function patchParsed(docId, newSections) {
+    return queueParsedEdit(docId, async (version) => {
+      const res = await API.patch(`/documents/${docId}/`, { version, parsed_json: newSections });
+      rememberParsed(docId, res.data);
+      setDuplicatesMap((old) => ({ ...old, [docId]: duplicatesByRow(res.data.duplicates) }));
+    });
+  }
+
   function handleToggleItemDocs(docId, sectionIndex, rowIndex) {
     const key = `${docId}-${sectionIndex}-${rowIndex}`;
     setItemDocsExpandedMap((prev) => ({ ...prev, [key]: !prev[key] }));
@@ -258,21 +357,7 @@ function DocumentTable({ documents, refreshDocuments }) {
     const section = oldSections[sectionIndex];
     if (!section || !Array.isArray(section.table)) return;
     const newRow = ['-', '-', '-', '-', '-'];
-    const newTable = [...section.table, newRow];
-    const newSection = { ...section, table: newTable };
-    const newSections = [
-      ...oldSections.slice(0, sectionIndex),
-      newSection,
-      ...oldSections.slice(sectionIndex + 1),
-    ];
-    try {
-      const res = await API.patch(`/documents/${editDocId}/`, { parsed_json: newSections });
-      const updated = res.data.parsed_json || [];
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: updated }));
-    } catch (error) {
-      console.error(error);
-      // alert('Gagal menambahkan baris baru.');
-    }
+    await patchCells(editDocId, [{ op: 'add', path: `/${sectionIndex}/-`, value: newRow }]);
   }
 
   async function handleRemoveSectionRow(sectionIndex, rowIndex) {
@@ -280,21 +365,7 @@ function DocumentTable({ documents, refreshDocuments }) {
     const oldSections = parsedSectionsMap[editDocId];
     const section = oldSections[sectionIndex];
     if (!section || !Array.isArray(section.table)) return;
-    const newTable = section.table.filter((_, idx) => idx !== rowIndex + 1);
-    const newSection = { ...section, table: newTable };
-    const newSections = [
-      ...oldSections.slice(0, sectionIndex),
-      newSection,
-      ...oldSections.slice(sectionIndex + 1),
-    ];
-    try {
-      const res = await API.patch(`/documents/${editDocId}/`, { parsed_json: newSections });
-      const updated = res.data.parsed_json || [];
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: updated }));
-    } catch (error) {
-      console.error(error);
-      // alert('Gagal menghapus baris.');
-    }
+    await patchCells(editDocId, [{ op: 'remove', path: `/${sectionIndex}/${rowIndex}` }]);
   }
 
   async function handleAddSectionConfirm() {
@@ -312,29 +383,14 @@ function DocumentTable({ documents, refreshDocuments }) {
     } else {
       newSections.push(newSection);
     }
-    try {
-      const res = await API.patch(`/documents/${editDocId}/`, { parsed_json: newSections });
-      const updated = res.data.parsed_json || [];
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: updated }));
-      // alert('Section baru ditambahkan.');
-    } catch (error) {
-      console.error(error);
-      // alert('Gagal menambahkan section baru.');
-    }
+    await patchParsed(editDocId, newSections);
   }
 
   async function handleRemoveSection(sectionIndex) {
     if (!editDocId || !parsedSectionsMap[editDocId]) return;
     const oldSections = parsedSectionsMap[editDocId];
     const newSections = oldSections.filter((_, idx) => idx !== sectionIndex);
-    try {
-      const res = await API.patch(`/documents/${editDocId}/`, { parsed_json: newSections });
-      const updated = res.data.parsed_json || [];
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: updated }));
-    } catch (error) {
-      console.error(error);
-      // alert('Gagal menghapus section.');
-    }
+    await patchParsed(editDocId, newSections);
   }
 
   async function handleUpdateCell(sectionIndex, rowIndex, cellIndex, newValue) {
@@ -362,16 +418,10 @@ function DocumentTable({ documents, refreshDocuments }) {
     const recalcedSections = recalcTotals(JSON.parse(JSON.stringify(newSections)));
     setParsedSectionsMap((old) => ({ ...old, [editDocId]: recalcedSections }));
 
-    // Step 3: Send PATCH to backend using recalculated values
-    try {
-      const res = await API.patch(`/documents/${editDocId}/`, { parsed_json: recalcedSections });
-      const updated = res.data.parsed_json || [];
-      // Step 4: After backend responds, update state with backend’s "true" result
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: updated }));
-    } catch (error) {
-      console.error(error);
-      // (Optional) Could add a toast/error popup here and revert the UI if PATCH fails
-    }
+    // Step 3: Send only this cell; the response carries the server's totals
+    await patchCells(editDocId, [
+      { op: 'replace', path: `/${sectionIndex}/${rowIndex}/${cellIndex}`, value: newValue },
+    ]);
   }
 
   function hasMissingPaymentProof(docId, parsedSections) {
@@ -407,13 +457,7 @@ function DocumentTable({ documents, refreshDocuments }) {
       newSection,
       ...oldSections.slice(sectionIndex + 1),
     ];
-    try {
-      await API.patch(`/documents/${editDocId}/`, { parsed_json: newSections });
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: newSections }));
-    } catch (error) {
-      console.error(error);
-      // alert('Gagal mengupdate subtotal.');
-    }
+    await patchParsed(editDocId, newSections);
   }
 
   async function handleUpdateGrandTotal(sectionIndex, newVal) {
@@ -427,13 +471,7 @@ function DocumentTable({ documents, refreshDocuments }) {
       newSection,
       ...oldSections.slice(sectionIndex + 1),
     ];
-    try {
-      await API.patch(`/documents/${editDocId}/`, { parsed_json: newSections });
-      setParsedSectionsMap((old) => ({ ...old, [editDocId]: newSections }));
-    } catch (error) {
-      console.error(error);
-      // alert('Gagal mengupdate grand total.');
-    }
+    await patchParsed(editDocId, newSections);
   }
 
   // Attach / delete supporting docs
@@ -620,7 +658,7 @@ function DocumentTable({ documents, refreshDocuments }) {
       try {
         const res = await API.get(`/documents/${doc.id}/`);
         parsed = res.data.parsed_json || [];
-        setParsedSectionsMap((old) => ({ ...old, [doc.id]: parsed }));
+        rememberParsed(doc.id, res.data);
       } catch (err) {
         console.error('Error fetching parsed_json', err);
         parsed = [];
@@ -694,13 +732,17 @@ function DocumentTable({ documents, refreshDocuments }) {
     }
   }, []);
 
-  // helper: reload proofs for one document ID
-  const refreshPaymentProofs = (docId) =>
+  // helper: reload proofs for one document ID. Adding / deleting a proof
+  // rewrites PAY_REF server-side (new parsed_version), so the table is reloaded
+  // too, queued behind any edit still in flight.
+  const refreshPaymentProofs = (docId) => {
     API.get('/payment-proofs/', { params: { main_document: docId } })
       .then((res) =>
         setPaymentProofs((old) => ({ ...old, [docId]: res.data }))
       )
       .catch(console.error);
+    return queueParsedEdit(docId, () => reloadParsed(docId));
+  };
 
   // Helpers for formatting
   function formatIndoDateTime(dateString) {
@@ -738,46 +780,16 @@ function DocumentTable({ documents, refreshDocuments }) {
   async function handleSavePayRef(newRef) {
     if (!payCtx) return;
   
-    const { docId, refCode, sectionIndex, rowIndex } = payCtx;
+    const { docId, refCode } = payCtx;
   
     try {
-      /* ───── 1️⃣  Persist to backend ───── */
-      await API.patch(`/documents/${docId}/`, {
-        item_payment_refs: { [refCode]: newRef },
-      });
-  
-      /* ───── 2️⃣  Update local cache ───── */
-      setParsedSectionsMap((old) => {
-        const sections = [...(old[docId] || [])];
-        const section  = sections[sectionIndex];
-        if (!section) return old;
-  
-        const headers = section.table[0];
-        let payIdx    = headers.indexOf('PAY_REF');
-  
-        /* — add PAY_REF column if it didn’t exist — */
-        if (payIdx === -1) {
-          headers.push('PAY_REF');
-          payIdx = headers.length - 1;
-  
-          /* pad **all** existing rows so r[payIdx] is defined */
-          section.table.slice(1).forEach((r) => {
-            while (r.length <= payIdx) r.push('');
-          });
-        }
-  
-        /* ensure the specific row is long enough, then write the value */
-        const row = section.table[rowIndex + 1];
-        while (row.length <= payIdx) row.push('');
-        row[payIdx] = newRef;
-  
-        return { ...old, [docId]: sections };
+      // Addressed by REF_CODE (no version needed), but queued behind cell edits
+      await queueParsedEdit(docId, async () => {
+        const res = await API.patch(`/documents/${docId}/`, {
+          item_payment_refs: { [refCode]: newRef },
+        });
+        rememberParsed(docId, res.data);
       });
-  
-      // alert('Referensi pembayaran tersimpan.');
-    } catch (err) {
-      console.error(err);
-      // alert('Gagal menyimpan referensi pembayaran.');
     } finally {
       setPayDlgOpen(false);
       setPayCtx(null);
@@ -986,6 +998,7 @@ function DocumentTable({ documents, refreshDocuments }) {
                   const role = localStorage.getItem('role');
                   const docStatus = docObj.status;
                   const canRowToggle = ['owner', 'higher-up', 'employee'].includes(role) && !['draft', 'rejected'].includes(docStatus);
+                  const duplicates = duplicatesMap[docId]?.[`${sectionIndex}-${rowIndex}`];
 
                   return (
                     <React.Fragment key={rowIndex}>
@@ -1011,6 +1024,19 @@ function DocumentTable({ documents, refreshDocuments }) {
                         })}
                         <TableCell>
                           <Box sx={{ display: 'inline-flex', gap: 1, alignItems: 'center' }}>
+                            {duplicates && (
+                              <Tooltip
+                                title={`Kemungkinan pembayaran ganda: ${duplicates.matches
+                                  .map((m) => `${m.document_code} baris ${m.row_index + 1}`)
+                                  .join(', ')}${
+                                  duplicates.match_count > duplicates.matches.length
+                                    ? ` (+${duplicates.match_count - duplicates.matches.length} lainnya)`
+                                    : ''
+                                }`}
+                              >
+                                <WarningAmberIcon color="warning" fontSize="small" />
+                              </Tooltip>
+                            )}
                             {canEditMainDocument(userRole, docStatus) && (
                               <Button
                                 variant="outlined"
@@ -1139,10 +1165,20 @@ function DocumentTable({ documents, refreshDocuments }) {
     });
   }
 
-  // Helper to turn '5.200.000' → 5200000 (supports empty/null)
+  // Same rules as backend utils.parse_idr: '5.200.000' → 5200000,
+  // 'Rp 1.234,00' → 1234, '(1.500)' / '-1.500' → -1500, 'Rp 500.000 (transfer)'
+  // → 500000. Only used for the optimistic update; the server's subtotals are
+  // the canonical values.
   function idrToInt(text) {
-    if (!text) return 0;
-    return parseInt(String(text).replace(/[^\d]/g, ''), 10) || 0;
+    let s = String(text ?? '').toLowerCase().replace(/rp|idr/g, '').trim();
+    if (!s) return 0;
+    // Negative only when the whole value is wrapped; other (...) are notes
+    const wrapped = /^\(\s*[\d.,\s]+\)$/.test(s);
+    const neg = wrapped || s.startsWith('-');
+    s = wrapped ? s.slice(1, -1) : s.replace(/\([^)]*\)/g, ' ');
+    const digits = s.trim().replace(/,\s*\d{1,2}\s*$/, '').replace(/\D/g, '');
+    const n = parseInt(digits, 10) || 0;
+    return neg ? -n : n;
   }
 
   // Helper to turn 5200000 → '5.200.000'
@@ -1528,6 +1564,17 @@ function DocumentTable({ documents, refreshDocuments }) {
           }
         }}
       />
+
+      <Snackbar
+        open={Boolean(editNotice)}
+        autoHideDuration={6000}
+        onClose={() => setEditNotice(null)}
+        anchorOrigin={{ vertical: 'bottom', horizontal: 'center' }}
+      >
+        <Alert onClose={() => setEditNotice(null)} severity={editNotice?.severity || 'info'} sx={{ width: '100%' }}>
+          {editNotice?.message}
+        </Alert>
+      </Snackbar>
     </>
     </>
   );
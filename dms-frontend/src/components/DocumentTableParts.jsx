@@ -120,6 +120,27 @@ export function ItemDocsPreview({
     setActiveIdx(currentIndex);
   }, [currentIndex]);
 
+  // Overlay-stamped copy needs the JWT, so fetch it as a blob (not a plain link)
+  const stampedUrl = docs[currentIndex]?.download_url || null;
+  const [stampedBlob, setStampedBlob] = useState(null);
+  useEffect(() => {
+    setStampedBlob(null);
+    if (!stampedUrl) return undefined;
+    let objectUrl = null;
+    let cancelled = false;
+    API.get(stampedUrl, { responseType: 'blob' })
+      .then((res) => {
+        if (cancelled) return;
+        objectUrl = URL.createObjectURL(res.data);
+        setStampedBlob({ src: stampedUrl, url: objectUrl });
+      })
+      .catch(() => {});
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [stampedUrl]);
+
   const handleOpenApproveDialog = (doc) => {
     setDocToApprove(doc);
     setApprovalDialogOpen(true);
@@ -153,7 +174,11 @@ export function ItemDocsPreview({
     };
 
     const v = doc?.approved_at ? new Date(doc.approved_at).getTime() : null;
-    const fullFile = doc?.file ? withV(doc.file, v) : doc?.file;
+    // download_url (overlay stamp) is fetched with auth above; until it arrives
+    // fall back to the stored file, which Nginx serves from /media/
+    const stamped =
+      doc?.download_url && stampedBlob?.src === doc.download_url ? stampedBlob.url : null;
+    const fullFile = stamped || (doc?.file ? withV(doc.file, v) : doc?.file);
 
     const ext = getExt(url);
     const isImg = ['png', 'jpg', 'jpeg', 'webp'].includes(ext);
@@ -66,6 +66,12 @@ const directories = [
 ];
 
 // Files inside the Rekap folder
+const DOCS_PAGE_SIZE = 50; // archive cards per "Muat lagi"
+
+// Cursor of a DRF cursor-pagination `next` link (null at the end).
+const nextCursor = (next) =>
+  next ? new URL(next, window.location.origin).searchParams.get('cursor') : null;
+
 const REKAP_FILES = [
   {
     key: 'bbm',
@@ -230,74 +236,111 @@ export default function CompanyDirectoryPage() {
   const fullName = companyFullNames[slug] || slug.toUpperCase();
   const selectedDir = directories.find((d) => d.key === dirKey) || null;
 
-  const [allDocs, setAllDocs] = useState([]);
+  const [archiveStats, setArchiveStats] = useState(null); // whole company archive
+  const [docs, setDocs] = useState([]); // pages loaded so far
+  const [pageQuery, setPageQuery] = useState(null); // { params, cursor } of the next page
+  const [resultCount, setResultCount] = useState(0);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [docSearch, setDocSearch] = useState('');
+  const [searchTerm, setSearchTerm] = useState(''); // docSearch, debounced
   const [docSort, setDocSort] = useState('newest'); // 'newest' | 'oldest'
 
+  const companyCode = slug.replace(/^pt-/, '').replace(/^cv-/, '');
+  const docTypeFilter = selectedDir?.docTypeFilter || null;
+
   useEffect(() => {
-    const fetchDocs = async () => {
-      setLoading(true);
-      try {
-        const res = await API.get('/documents/');
-        const companyCode = slug.replace(/^pt-/, '').replace(/^cv-/, '');
-        const filtered = (res.data || []).filter(
-          (d) => d.archived && d.status === 'sudah_dibayar' && d.company === companyCode
-        );
-        setAllDocs(filtered);
-      } catch (err) {
-        console.error(err);
-        setAllDocs([]);
-      } finally {
-        setLoading(false);
-      }
-    };
-    if (slug) fetchDocs();
-  }, [slug]);
+    const t = setTimeout(() => setSearchTerm(docSearch.trim()), 300);
+    return () => clearTimeout(t);
+  }, [docSearch]);
 
-  const companyCode = slug.replace(/^pt-/, '').replace(/^cv-/, '');
+  // Folder counts: one cached aggregate, no document rows
+  useEffect(() => {
+    if (!slug) return;
+    API.get('/documents/stats/', {
+      params: { archived: true, status: 'sudah_dibayar', company: companyCode },
+    })
+      .then((res) => setArchiveStats(res.data))
+      .catch((err) => {
+        console.error(err);
+        setArchiveStats(null);
+      });
+  }, [slug, companyCode]);
 
-  const docsToDisplay = useMemo(() => {
-    if (!selectedDir || !selectedDir.docTypeFilter) return [];
-    return allDocs.filter((d) => d.doc_type === selectedDir.docTypeFilter);
-  }, [allDocs, selectedDir]);
+  // Filtering, search and sort run server-side; one page at a time
+  useEffect(() => {
+    if (!slug || !docTypeFilter) {
+      setDocs([]);
+      setPageQuery(null);
+      setLoading(false);
+      return undefined;
+    }
+    let cancelled = false;
+    const params = {
+      archived: true,
+      status: 'sudah_dibayar',
+      company: companyCode,
+      doc_type: docTypeFilter,
+      ordering: docSort === 'oldest' ? 'created_at' : undefined,
+      q: searchTerm || undefined,
+      page_size: DOCS_PAGE_SIZE,
+    };
+    setLoading(true);
+    Promise.all([
+      API.get('/documents/', { params }),
+      API.get('/documents/stats/', { params: { ...params, ordering: undefined, page_size: undefined } }),
+    ])
+      .then(([page, stats]) => {
+        if (cancelled) return;
+        setDocs(page.data.results || []);
+        const cursor = nextCursor(page.data.next);
+        setPageQuery(cursor ? { params, cursor } : null);
+        setResultCount(stats.data.count || 0);
+      })
+      .catch((err) => {
+        console.error(err);
+        if (!cancelled) {
+          setDocs([]);
+          setPageQuery(null);
+          setResultCount(0);
+        }
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [slug, companyCode, docTypeFilter, searchTerm, docSort]);
+
+  const handleLoadMore = async () => {
+    if (!pageQuery) return;
+    setLoadingMore(true);
+    try {
+      const { params, cursor } = pageQuery;
+      const res = await API.get('/documents/', { params: { ...params, cursor } });
+      setDocs((old) => [...old, ...(res.data.results || [])]);
+      const next = nextCursor(res.data.next);
+      setPageQuery(next ? { params, cursor: next } : null);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const directoryCounts = useMemo(() => {
+    const byType = Object.fromEntries(
+      (archiveStats?.by_doc_type || []).map((row) => [row.doc_type, row.count])
+    );
     const counts = {};
     directories.forEach((dir) => {
-      if (dir.docTypeFilter) {
-        counts[dir.key] = allDocs.filter((d) => d.doc_type === dir.docTypeFilter).length;
-      } else {
-        counts[dir.key] = 0;
-      }
+      counts[dir.key] = dir.docTypeFilter ? byType[dir.docTypeFilter] || 0 : 0;
     });
     return counts;
-  }, [allDocs]);
-
-  const visibleDocs = useMemo(() => {
-    if (!selectedDir || !selectedDir.docTypeFilter) return [];
+  }, [archiveStats]);
 
-    const term = docSearch.trim().toLowerCase();
-    let docs = docsToDisplay;
-
-    if (term) {
-      docs = docs.filter((doc) => {
-        const code = (doc.document_code || '').toLowerCase();
-        const title = (doc.title || '').toLowerCase();
-        const desc = (doc.description || '').toLowerCase();
-        return code.includes(term) || title.includes(term) || desc.includes(term);
-      });
-    }
-
-    docs = [...docs].sort((a, b) => {
-      const aTime = a.created_at ? new Date(a.created_at).getTime() : 0;
-      const bTime = b.created_at ? new Date(b.created_at).getTime() : 0;
-      if (docSort === 'oldest') return aTime - bTime;
-      return bTime - aTime;
-    });
-
-    return docs;
-  }, [docsToDisplay, docSearch, docSort, selectedDir]);
+  const archivedTotal = archiveStats?.count ?? 0;
 
   const handleDirectoryClick = (dir) => {
     navigate(`/directory/${slug}/${dir.key}`);
@@ -326,8 +369,8 @@ export default function CompanyDirectoryPage() {
     : selectedDir
     ? selectedDir.key === 'rekap'
       ? `${REKAP_FILES.length} jenis rekap`
-      : `${visibleDocs.length} dokumen`
-    : `${allDocs.length} dokumen diarsip`;
+      : `${resultCount} dokumen`
+    : `${archivedTotal} dokumen diarsip`;
 
   return (
     <Box
@@ -447,14 +490,14 @@ export default function CompanyDirectoryPage() {
               {selectedDir && selectedDir.key !== 'rekap' && (
                 <Chip
                   size="small"
-                  label={loading ? 'Memuat…' : `${allDocs.length} total diarsip`}
+                  label={loading ? 'Memuat…' : `${archivedTotal} total diarsip`}
                   sx={{ borderRadius: 999 }}
                 />
               )}
               {selectedDir && selectedDir.key === 'rekap' && (
                 <Chip
                   size="small"
-                  label={loading ? 'Memuat…' : `${allDocs.length} dokumen sumber`}
+                  label={loading ? 'Memuat…' : `${archivedTotal} dokumen sumber`}
                   sx={{ borderRadius: 999 }}
                 />
               )}
@@ -577,7 +620,7 @@ export default function CompanyDirectoryPage() {
                 >
                   Hasil
                 </Typography>
-                <Chip size="small" label={loading ? 'Memuat…' : `${visibleDocs.length} dokumen`} sx={{ borderRadius: 999 }} />
+                <Chip size="small" label={loading ? 'Memuat…' : `${resultCount} dokumen`} sx={{ borderRadius: 999 }} />
               </Grid>
             </Grid>
           </Paper>
@@ -617,7 +660,7 @@ export default function CompanyDirectoryPage() {
               </Button>
 
               {selectedDir.key !== 'rekap' && (
-                <Chip size="small" label={loading ? 'Memuat…' : `${visibleDocs.length} dokumen`} sx={{ borderRadius: 999 }} />
+                <Chip size="small" label={loading ? 'Memuat…' : `${resultCount} dokumen`} sx={{ borderRadius: 999 }} />
               )}
             </Box>
 
@@ -704,7 +747,7 @@ export default function CompanyDirectoryPage() {
                   </Typography>
                 </Box>
               </Paper>
-            ) : visibleDocs.length === 0 ? (
+            ) : docs.length === 0 ? (
               <Paper
                 elevation={0}
                 sx={{
@@ -728,7 +771,7 @@ export default function CompanyDirectoryPage() {
               </Paper>
             ) : (
               <Grid container spacing={2.25}>
-                {visibleDocs.map((doc) => (
+                {docs.map((doc) => (
                   <Grid item xs={12} md={6} key={doc.id}>
                     <Paper
                       elevation={0}
@@ -799,6 +842,19 @@ export default function CompanyDirectoryPage() {
                     </Paper>
                   </Grid>
                 ))}
+                {pageQuery && (
+                  <Grid item xs={12} sx={{ display: 'flex', justifyContent: 'center' }}>
+                    <Button
+                      variant="outlined"
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
+                      startIcon={loadingMore ? <CircularProgress size={16} /> : null}
+                      sx={{ borderRadius: 999, fontWeight: 650 }}
+                    >
+                      {`Muat lagi (${docs.length} dari ${resultCount})`}
+                    </Button>
+                  </Grid>
+                )}
               </Grid>
             )}
           </Box>
@@ -26,7 +26,7 @@ import ArrowForwardIcon from '@mui/icons-material/ArrowForward';
 import { motion } from 'framer-motion';
 import { useNavigate } from 'react-router-dom';
 import { useTheme } from '@mui/material/styles';
-import API from '../services/api'; // NEW: use live data 
+import API from '../services/api';
 
 // Static company metadata (UI-only; stats are filled dynamically)
 const BASE_COMPANIES = [
@@ -111,51 +111,24 @@ function DirectoryPage() {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const res = await API.get('/documents/'); // includes archived + status etc. 
-        const docs = Array.isArray(res.data) ? res.data : [];
-
-        // Only count docs that are archived + already paid (same as CompanyDirectoryPage) 
-        const archivedDocs = docs.filter(
-          (d) => d.archived && d.status === 'sudah_dibayar'
-        );
-
-        const statsByCompany = {};
-
-        archivedDocs.forEach((doc) => {
-          const code = (doc.company || '').toLowerCase(); // 'asn', 'ttu', etc. 
-          if (!code) return;
-
-          if (!statsByCompany[code]) {
-            statsByCompany[code] = { count: 0, lastDate: null };
-          }
-          statsByCompany[code].count += 1;
-
-          const ts =
-            doc.archived_at ||
-            doc.paid_at ||
-            doc.updated_at ||
-            doc.created_at;
-          if (!ts) return;
-
-          const dt = new Date(ts);
-          if (!statsByCompany[code].lastDate || dt > statsByCompany[code].lastDate) {
-            statsByCompany[code].lastDate = dt;
-          }
+        // Archived + already paid (same as CompanyDirectoryPage); counted in SQL
+        const res = await API.get('/documents/stats/', {
+          params: { archived: true, status: 'sudah_dibayar' },
         });
+        const statsByCompany = Object.fromEntries(
+          (res.data.by_company || []).map((row) => [(row.company || '').toLowerCase(), row])
+        );
 
         setCompanies(
           BASE_COMPANIES.map((base) => {
-            const stat = statsByCompany[base.code] || {
-              count: 0,
-              lastDate: null,
-            };
+            const stat = statsByCompany[base.code] || { count: 0, last_archived_at: null };
             return {
               ...base,
               documentsCount: stat.count,
               lastActivity:
                 stat.count === 0
                   ? 'Belum ada dokumen'
-                  : formatLastActivity(stat.lastDate),
+                  : formatLastActivity(stat.last_archived_at ? new Date(stat.last_archived_at) : null),
             };
           })
         );
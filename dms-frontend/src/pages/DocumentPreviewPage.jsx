@@ -384,22 +384,16 @@ export default function DocumentPreviewPage() {
     setLoading(true);
     setError(null);
 
-    const docReq = byCode
-      ? API.get(`/documents/by-code/${docCode}/`)
-      : API.get(`/documents/${id}/`);
+    // Document + attachments in one round trip
+    const bundleReq = byCode
+      ? API.get(`/documents/by-code/${docCode}/bundle/`)
+      : API.get(`/documents/${id}/bundle/`);
 
-    docReq
+    bundleReq
       .then((res) => {
-        if (cancelled) return null;
-        const document = res.data;
-        setDoc(document);
-        return API.get('/supporting-docs/', {
-          params: { main_document: document.id },
-        });
-      })
-      .then((res) => {
-        if (!res || cancelled) return;
-        setSupport(sortBySeq(res.data || []));
+        if (cancelled) return;
+        setDoc(res.data.document);
+        setSupport(sortBySeq(res.data.supporting_docs || []));
       })
       .catch((err) => {
         if (cancelled) return;
@@ -2,7 +2,7 @@
 
 import React, { useEffect, useLayoutEffect, useState, lazy, Suspense } from 'react';
 import { Box, Paper, Divider } from '@mui/material';
-import API from '../services/api';
+import API, { fetchAllPages } from '../services/api';
 import DocumentTable from '../components/DocumentTable';
 import SubHeaderTabs from '../components/SubHeaderTabs';
 import { useTheme } from '@mui/material/styles';
@@ -11,8 +11,16 @@ import { motion } from "framer-motion";
 // Lazy-load the map panel so it doesn't bloat the initial bundle.
 const FarmMapPanel = lazy(() => import('../components/FarmMapPanel.withBlocks.jsx'));
 
+// Statuses listed on each tab (the map tab lists none); filtered server-side
+// so only the open documents of the active tab are fetched.
+const TAB_STATUSES = {
+  0: 'draft,belum_disetujui,rejected',
+  1: 'disetujui',
+};
+
 function HomePage() {
   const [documents, setDocuments] = useState([]);
+  const [stats, setStats] = useState(null);
   const [tabValue, setTabValue] = useState(0);
   const theme = useTheme();
 
@@ -23,45 +31,30 @@ function HomePage() {
   }, []);
 
   useEffect(() => {
-    fetchAllDocuments();
-  }, []);
-
-  const fetchAllDocuments = async () => {
+    setDocuments([]); // never show the previous tab's rows under this one
+    fetchDocuments();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [tabValue]);
+
+  // Tab badges come from /stats/; the list holds only the active tab's rows.
+  const fetchDocuments = async () => {
+    const status = TAB_STATUSES[tabValue];
     try {
-      const res = await API.get('/documents/');
-      setDocuments(res.data);
+      const [docs, statsRes] = await Promise.all([
+        status ? fetchAllPages('/documents/', { archived: false, status }) : [],
+        API.get('/documents/stats/', { params: { archived: false } }),
+      ]);
+      setDocuments(docs);
+      setStats(statsRes.data);
     } catch (err) {
       console.error('Error fetching documents:', err);
     }
   };
 
-  const getFilteredDocuments = () => {
-    if (tabValue === 0) {
-      return documents.filter(
-        (doc) => !doc.archived && doc.status !== 'disetujui' && doc.status !== 'sudah_dibayar'
-      );
-    } else if (tabValue === 1) {
-      return documents.filter((doc) => !doc.archived && doc.status === 'disetujui');
-    } else if (tabValue === 2) {
-      // Map tab
-      return [];
-    }
-    return [];
-  };
-
   const handleTabChange = (event, newValue) => setTabValue(newValue);
 
-  const pendingCount = documents.filter(
-    (d) =>
-      !d.archived &&
-      (d.status === 'belum_disetujui' || d.status === 'draft')
-  ).length;
-
-  const unpaidCount = documents.filter(
-    (d) =>
-      !d.archived &&
-      d.status === 'disetujui'
-  ).length;
+  const pendingCount = stats?.pending_count ?? 0;
+  const unpaidCount = stats?.unpaid_count ?? 0;
 
   // Background gradient (adapts to dark mode)
   const bgGradient =
@@ -165,8 +158,8 @@ function HomePage() {
               </Suspense>
             ) : (
               <DocumentTable
-                documents={getFilteredDocuments()}
-                refreshDocuments={fetchAllDocuments}
+                documents={documents}
+                refreshDocuments={fetchDocuments}
               />
             )}
           </Paper>
@@ -258,6 +258,34 @@ function RekapPage() {
     doc.save(fileName);
   };
 
+  // CSV / XLSX are streamed by the backend (full range, not just what is rendered)
+  const handleDownloadFile = async (format) => {
+    if (!rekap || !rekap.rows || !rekap.rows.length) return;
+    try {
+      const params = { format };
+      if (query?.from) params.from = query.from;
+      if (query?.to) params.to = query.to;
+
+      const res = await API.get(`/rekap/${companyCode}/${rekapKey}/`, {
+        params,
+        responseType: 'blob',
+      });
+      const safeFrom = rekap.from || 'awal';
+      const safeTo = rekap.to || 'sekarang';
+      const url = window.URL.createObjectURL(res.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `rekap-${rekap.rekap_key || rekapKey}-${companyCode}-${safeFrom}-${safeTo}.${format}`;
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      window.URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error(err);
+      setError('Gagal mengunduh file rekap. Silakan coba lagi.');
+    }
+  };
+
   return (
     <Box
       sx={{
@@ -353,6 +381,34 @@ function RekapPage() {
           >
             Download PDF
           </Button>
+          <Button
+            variant="outlined"
+            color="primary"
+            startIcon={<DownloadIcon />}
+            onClick={() => handleDownloadFile('xlsx')}
+            disabled={!rekap || !rekap.rows || !rekap.rows.length || loading}
+            sx={{
+              borderRadius: 999,
+              fontWeight: 600,
+              textTransform: 'none',
+            }}
+          >
+            Download Excel
+          </Button>
+          <Button
+            variant="outlined"
+            color="primary"
+            startIcon={<DownloadIcon />}
+            onClick={() => handleDownloadFile('csv')}
+            disabled={!rekap || !rekap.rows || !rekap.rows.length || loading}
+            sx={{
+              borderRadius: 999,
+              fontWeight: 600,
+              textTransform: 'none',
+            }}
+          >
+            Download CSV
+          </Button>
         </Stack>
       </Box>
 
@@ -31,13 +31,12 @@ function TagihanDetailPage() {
   const userRole = localStorage.getItem('role'); // "employee" | "higher-up" | "owner"
 
   useEffect(() => {
-    API.get(`/documents/${id}/`).then((res) => setDocument(res.data));
-    API.get('/supporting-docs/', { params: { main_document: id } })
-      .then((res) =>
-        setSupportingDocs(
-          [...res.data].sort((a, b) => a.supporting_doc_sequence - b.supporting_doc_sequence)
-        )
+    API.get(`/documents/${id}/bundle/`).then((res) => {
+      setDocument(res.data.document);
+      setSupportingDocs(
+        [...res.data.supporting_docs].sort((a, b) => a.supporting_doc_sequence - b.supporting_doc_sequence)
       );
+    });
   }, [id]);
 
   const handleFinishDraft = async () => {
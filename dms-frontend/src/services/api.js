@@ -56,5 +56,21 @@ export const getPaymentProofs = (main_document) =>
   API.get(`/payment-proofs/?main_document=${main_document}`);
 export const getProgress = (jobId) => API.get(`/progress/${jobId}/`);
 
+// Follow cursor-paginated list endpoints ({ next, results }) to the end.
+// Plain array responses are returned as-is.
+export const fetchAllPages = async (url, params = {}) => {
+  const out = [];
+  let cursor = null;
+  for (;;) {
+    const res = await API.get(url, { params: cursor ? { ...params, cursor } : params });
+    const data = res.data;
+    if (Array.isArray(data)) return data;
+    out.push(...(data?.results || []));
+    if (!data?.next) return out;
+    cursor = new URL(data.next, window.location.origin).searchParams.get('cursor');
+    if (!cursor) return out;
+  }
+};
+
 export default API;
 